@@ -0,0 +1,283 @@
+"""
+Análisis posterior de series de población (conejos, zorros, comida) exportadas por
+`cli run --export`, grabaciones de trayectorias (.traj) o bandas de ensemble (.csv).
+
+Todas las funciones aceptan una serie (T,) o un lote de series (corridas, T) y
+trabajan sobre el lote entero con NumPy:
+
+- periodo dominante de oscilación (pico del espectro de potencia, vía FFT)
+- autocorrelación y desfase presa-depredador (correlación cruzada vía FFT)
+- tiempos de extinción
+- ajuste por mínimos cuadrados de Lotka-Volterra:
+      d ln R / dt = a - b F        d ln F / dt = c R - d
+
+`analyze_directory` procesa todos los archivos de un barrido en paralelo.
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SPECIES = ("rabbits", "foxes", "food")
+SERIES_EXTENSIONS = (".csv", ".npz", ".traj")
+
+
+def _batch(series):
+    x = np.asarray(series, dtype=np.float64)
+    return (x[None, :], True) if x.ndim == 1 else (x, False)
+
+
+def _fft_size(n):
+    """Potencia de dos >= 2n (relleno para que la correlación no sea circular)"""
+    return 1 << (2 * n - 1).bit_length()
+
+
+def autocorrelation(series):
+    """Autocorrelación normalizada (lag 0 = 1) de cada serie"""
+    x, single = _batch(series)
+    x = x - x.mean(axis=1, keepdims=True)
+    n = x.shape[1]
+    spectrum = np.fft.rfft(x, _fft_size(n))
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), _fft_size(n))[:, :n]
+    zero_lag = acf[:, :1]
+    acf = acf / np.where(zero_lag > 0, zero_lag, 1)
+    return acf[0] if single else acf
+
+
+def dominant_period(series, dt=1.0):
+    """
+    Periodo (en ticks) del pico del espectro de potencia, refinado con una parábola
+    sobre los bins vecinos. Solo se consideran periodos con al menos dos ciclos en
+    la serie; NaN si la serie es constante.
+    """
+    x, single = _batch(series)
+    runs, n = x.shape
+    x = x - x.mean(axis=1, keepdims=True)
+    power = np.abs(np.fft.rfft(x, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(n, dt)
+    usable = freqs >= 2.0 / (n * dt)
+    usable[-1] = False  # Sin vecino a la derecha para interpolar
+    masked = np.where(usable, power, -1.0)
+    k = masked.argmax(axis=1)
+
+    rows = np.arange(runs)
+    left = np.log(power[rows, np.maximum(k - 1, 0)] + 1e-300)
+    centre = np.log(power[rows, k] + 1e-300)
+    right = np.log(power[rows, np.minimum(k + 1, len(freqs) - 1)] + 1e-300)
+    denominator = left - 2 * centre + right
+    shift = np.where(denominator != 0, 0.5 * (left - right) / np.where(denominator != 0, denominator, 1), 0)
+    freq = (k + np.clip(shift, -0.5, 0.5)) * (freqs[1] if len(freqs) > 1 else 0)
+
+    valid = (masked[rows, k] > 0) & (freq > 0)
+    period = np.where(valid, 1.0 / np.where(valid, freq, 1), np.nan)
+    return period[0] if single else period
+
+
+def phase_lag(prey, predator, dt=1.0, period=None):
+    """
+    Retraso (en ticks) del depredador respecto de la presa: el lag k en [0, periodo)
+    que maximiza la correlación cruzada prey[t] · predator[t + k].
+    """
+    x, single = _batch(prey)
+    y, _ = _batch(predator)
+    n = x.shape[1]
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    size = _fft_size(n)
+    cross = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)[:, :n]
+
+    if period is None:
+        period = dominant_period(x, dt)
+    limit = np.atleast_1d(np.asarray(period, dtype=np.float64)) / dt
+    limit = np.where(np.isfinite(limit), np.minimum(limit, n // 2), n // 2)
+    lags = np.arange(n)
+    cross = np.where(lags[None, :] < limit[:, None], cross, -np.inf)
+    lag = cross.argmax(axis=1) * dt
+    return lag[0] if single else lag
+
+
+def extinction_time(series, ticks=None):
+    """Tick en el que la población llegó a cero para siempre (NaN si sobrevive)"""
+    x, single = _batch(series)
+    n = x.shape[1]
+    alive = x > 0
+    last_alive = n - 1 - alive[:, ::-1].argmax(axis=1)
+    last_alive = np.where(alive.any(axis=1), last_alive, -1)
+    extinct = ~alive[:, -1]
+    index = np.minimum(last_alive + 1, n - 1)
+    tick_values = np.arange(n) if ticks is None else np.asarray(ticks)
+    result = np.where(extinct, tick_values[index].astype(np.float64), np.nan)
+    return result[0] if single else result
+
+
+def _moving_average(x, window):
+    if window <= 1:
+        return x
+    kernel_sum = np.cumsum(np.pad(x, ((0, 0), (window // 2, window - 1 - window // 2)), mode="edge"), axis=1)
+    kernel_sum = np.concatenate([np.zeros((x.shape[0], 1)), kernel_sum], axis=1)
+    return (kernel_sum[:, window:] - kernel_sum[:, :-window]) / window
+
+
+def _masked_line_fit(X1, X2, y, mask):
+    """Mínimos cuadrados y ≈ p·X1 + q·X2 por fila, solo donde `mask`; devuelve (p, q, R²)"""
+    m = mask.astype(np.float64)
+    s11 = (m * X1 * X1).sum(axis=1)
+    s12 = (m * X1 * X2).sum(axis=1)
+    s22 = (m * X2 * X2).sum(axis=1)
+    s1y = (m * X1 * y).sum(axis=1)
+    s2y = (m * X2 * y).sum(axis=1)
+    det = s11 * s22 - s12 ** 2
+    ok = np.abs(det) > 1e-12
+    safe = np.where(ok, det, 1)
+    p = np.where(ok, (s1y * s22 - s2y * s12) / safe, np.nan)
+    q = np.where(ok, (s2y * s11 - s1y * s12) / safe, np.nan)
+
+    count = np.maximum(m.sum(axis=1), 1)
+    mean_y = (m * y).sum(axis=1) / count
+    residual = (m * (y - p[:, None] * X1 - q[:, None] * X2) ** 2).sum(axis=1)
+    total = (m * (y - mean_y[:, None]) ** 2).sum(axis=1)
+    r2 = np.where(total > 0, 1 - residual / np.where(total > 0, total, 1), np.nan)
+    return p, q, r2
+
+
+def fit_lotka_volterra(prey, predator, dt=1.0, smooth=5):
+    """
+    Ajuste de a, b, c, d sobre las tasas de crecimiento logarítmicas (series suavizadas
+    con media móvil de `smooth` muestras). Devuelve un dict de arreglos (o escalares
+    para una sola serie) con los parámetros y el R² de cada ecuación.
+    """
+    R, single = _batch(prey)
+    F, _ = _batch(predator)
+    R = _moving_average(R, smooth)
+    F = _moving_average(F, smooth)
+    positive = (R > 0) & (F > 0)
+    log_R = np.log(np.where(R > 0, R, 1))
+    log_F = np.log(np.where(F > 0, F, 1))
+    growth_R = np.gradient(log_R, dt, axis=1)
+    growth_F = np.gradient(log_F, dt, axis=1)
+    # El gradiente central usa los vecinos: los tres puntos deben ser positivos
+    mask = positive.copy()
+    mask[:, 1:] &= positive[:, :-1]
+    mask[:, :-1] &= positive[:, 1:]
+
+    ones = np.ones_like(R)
+    a, minus_b, r2_prey = _masked_line_fit(ones, F, growth_R, mask)
+    c, minus_d, r2_predator = _masked_line_fit(R, ones, growth_F, mask)
+    result = {"a": a, "b": -minus_b, "c": c, "d": -minus_d,
+              "r2_prey": r2_prey, "r2_predator": r2_predator}
+    if single:
+        result = {name: float(value[0]) for name, value in result.items()}
+    return result
+
+
+def analyze_series(ticks, populations, smooth=5):
+    """Resumen de una corrida: populations tiene forma (T, 3) en el orden de SPECIES"""
+    ticks = np.asarray(ticks)
+    populations = np.asarray(populations, dtype=np.float64)
+    dt = float(np.median(np.diff(ticks))) if len(ticks) > 1 else 1.0
+    rabbits, foxes = populations[:, 0], populations[:, 1]
+
+    # Las métricas de oscilación solo tienen sentido mientras conviven ambas especies
+    both = np.flatnonzero((rabbits > 0) & (foxes > 0))
+    coexist = both[-1] + 1 if len(both) else 0
+    summary = {
+        "ticks": int(ticks[-1]) if len(ticks) else 0,
+        "coexistence_ticks": float(ticks[coexist - 1]) if coexist else 0.0,
+        "rabbits_mean": float(rabbits.mean()) if len(rabbits) else np.nan,
+        "foxes_mean": float(foxes.mean()) if len(foxes) else np.nan,
+        "rabbits_extinction": float(extinction_time(rabbits, ticks)),
+        "foxes_extinction": float(extinction_time(foxes, ticks)),
+    }
+    if coexist >= 16:
+        periods = dominant_period(populations[:coexist, :2].T, dt)
+        summary["rabbits_period"] = float(periods[0])
+        summary["foxes_period"] = float(periods[1])
+        summary["phase_lag"] = float(phase_lag(rabbits[:coexist], foxes[:coexist], dt, periods[0]))
+        summary.update(fit_lotka_volterra(rabbits[:coexist], foxes[:coexist], dt, smooth))
+    else:
+        for name in ("rabbits_period", "foxes_period", "phase_lag", "a", "b", "c", "d",
+                     "r2_prey", "r2_predator"):
+            summary[name] = np.nan
+    return summary
+
+
+def load_series(path):
+    """(ticks, populations (T, 3)) de un CSV exportado, un .npz o una grabación .traj"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return data["ticks"], data["populations"]
+    if path.endswith(".traj") or path.endswith(".traj.idx"):
+        from trajectory import TrajectoryReader
+        reader = TrajectoryReader(path[:-4] if path.endswith(".idx") else path)
+        return np.asarray(reader.ticks), reader.populations()
+
+    data = np.genfromtxt(path, delimiter=",", names=True)
+    names = data.dtype.names
+    columns = []
+    for species in SPECIES:
+        # Exportación de `cli run` (rabbits) o bandas de ensemble (rabbits_mean)
+        name = species if species in names else f"{species}_mean"
+        columns.append(data[name] if name in names else np.zeros(len(data)))
+    ticks = data["tick"] if "tick" in names else np.arange(len(data))
+    return ticks.astype(np.int64), np.stack(columns, axis=1)
+
+
+def write_series(path, ticks, populations):
+    """Exporta una serie de población como CSV (tick, rabbits, foxes, food)"""
+    if path.endswith(".npz"):
+        np.savez_compressed(path, ticks=np.asarray(ticks), populations=np.asarray(populations))
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("tick",) + SPECIES)
+        for tick, row in zip(ticks, populations):
+            writer.writerow((int(tick), *(int(v) for v in row)))
+
+
+def analyze_file(path):
+    ticks, populations = load_series(path)
+    summary = analyze_series(ticks, populations)
+    summary["file"] = os.path.basename(path)
+    return summary
+
+
+def find_series(directory):
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(SERIES_EXTENSIONS) and not name.startswith("summary"):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def analyze_directory(paths, workers=None):
+    """Analiza en paralelo todos los archivos de series (un directorio o una lista de rutas)"""
+    if isinstance(paths, str):
+        paths = find_series(paths) if os.path.isdir(paths) else [paths]
+    if not paths:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [analyze_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def write_summary(path, summaries):
+    if not summaries:
+        return
+    fields = ["file"] + [name for name in summaries[0] if name != "file"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow({name: (f"{value:.6g}" if isinstance(value, float) else value)
+                             for name, value in summary.items()})
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+
+    main(["analyze", *sys.argv[1:]])
@@ -0,0 +1,313 @@
+"""
+Motor de comportamiento por lotes. En lugar de llamar a Rabbit.update y Fox.update
+animal por animal, se copian los atributos de cada especie a arreglos de NumPy, la
+decisión (aparearse, comer, huir, cazar...) se calcula con máscaras booleanas y cada
+comportamiento se ejecuta de una vez sobre su grupo de animales.
+
+Las reglas son las mismas que en los métodos de Rabbit y Fox, pero dentro de una
+especie todos deciden a partir del estado al inicio de su fase (los conejos no ven
+el movimiento de los conejos que se actualizaron antes en el mismo tick). Por eso
+los resultados coinciden en distribución con el motor por objetos, no tick a tick.
+"""
+
+import numpy as np
+
+from events import DISEASE, STARVATION
+from simulation import Behaviour
+from spatial import neighbour_pairs
+
+# Comportamiento elegido por cada animal en el tick (arreglo `behaviour`, valores de Behaviour)
+RANDOM, SEEK_MATE, SEEK_FOOD, FLEE, HUNT, HUNT_WEAK = (b.value for b in Behaviour)
+BEHAVIOUR_NAMES = tuple(b.name.lower() for b in Behaviour)
+_BEHAVIOURS = tuple(Behaviour)  # Índice = valor
+
+
+class AgentArrays:
+    """Copia en arreglos del estado de un grupo de animales (en el orden del grupo)"""
+    FIELDS = ("energy", "health", "fear", "age", "reproduction_cooldown", "time_since_food",
+              "change_dir_timer", "maturity_age")
+    FLOAT_FIELDS = ("energy", "health", "fear")
+    INT_FIELDS = ("age", "reproduction_cooldown", "time_since_food", "change_dir_timer")
+
+    def __init__(self, animals):
+        self.animals = animals
+        n = len(animals)
+        self.x = np.fromiter((a.rect.centerx for a in animals), np.int64, n)
+        self.y = np.fromiter((a.rect.centery for a in animals), np.int64, n)
+        self.w = np.fromiter((a.rect.width for a in animals), np.int64, n)
+        self.h = np.fromiter((a.rect.height for a in animals), np.int64, n)
+        self.dx = np.fromiter((a.direction[0] for a in animals), np.float64, n)
+        self.dy = np.fromiter((a.direction[1] for a in animals), np.float64, n)
+        self.base_speed = np.fromiter((a.base_speed for a in animals), np.float64, n)
+        self.male = np.fromiter((a.gender.value == 1 for a in animals), bool, n)
+        self.sick = np.fromiter((a.sick for a in animals), bool, n)
+        for field in self.FIELDS:
+            setattr(self, field, np.fromiter((getattr(a, field) for a in animals), np.float64, n))
+        self.behaviour = np.full(n, RANDOM, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.animals)
+
+    def speed(self):
+        """Misma tabla que Animal.speed"""
+        h = self.health
+        factor = np.select([h <= 30, h <= 50, h <= 80], [0.9, 0.93, 0.95], 1.0)
+        return self.base_speed * factor
+
+    def write_back(self, alive):
+        """Vuelca el estado en los sprites vivos (la imagen se rota al dibujar)"""
+        fields = self.FLOAT_FIELDS + self.INT_FIELDS
+        columns = ([getattr(self, field).tolist() for field in self.FLOAT_FIELDS] +
+                   [getattr(self, field).astype(np.int64).tolist() for field in self.INT_FIELDS])
+        x, y, sick = self.x.tolist(), self.y.tolist(), self.sick.tolist()
+        behaviours = self.behaviour.tolist()
+        dxs, dys = self.dx.tolist(), self.dy.tolist()
+        for i in np.flatnonzero(alive).tolist():
+            animal = self.animals[i]
+            for field, column in zip(fields, columns):
+                setattr(animal, field, column[i])
+            animal.sick = sick[i]
+            animal.behaviour = _BEHAVIOURS[behaviours[i]]
+            animal.direction[0], animal.direction[1] = dxs[i], dys[i]
+            animal.rect.center = (x[i], y[i])
+
+
+def nearest(qi, tj, score, n_queries):
+    """
+    Para cada consulta, el objetivo de menor `score` (empates: el primero del grupo,
+    como el `<` estricto de los bucles originales). -1 si no tiene candidatos.
+    """
+    best = np.full(n_queries, -1, dtype=np.int64)
+    if len(qi):
+        order = np.lexsort((tj, score, qi))
+        q_sorted = qi[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = q_sorted[1:] != q_sorted[:-1]
+        best[q_sorted[first]] = tj[order][first]
+    return best
+
+
+class BatchedBehaviour:
+    """Ejecuta la fase de conejos y la de zorros de Simulation.step por lotes"""
+    def __init__(self, params, seed=None):
+        self.params = params
+        self.rng = np.random.default_rng(seed)
+        self.counts = {name: 0 for name in BEHAVIOUR_NAMES}
+
+    # --- Mantenimiento: Animal.update_energy + Animal.update_health ---
+    def _upkeep(self, agents):
+        agents.energy -= 0.1 * np.where(agents.sick, 1.5, 1.0)
+        agents.time_since_food += 1
+        alive = agents.energy > 0
+
+        sick = alive & agents.sick
+        agents.health[sick] -= 0.5
+        cured = sick & (self.rng.random(len(agents)) < 0.2)
+        agents.sick[cured] = False
+        hungry = alive & (agents.time_since_food > self.params.day_length // 8)
+        agents.health[hungry] -= 0.1
+        fed = alive & (agents.time_since_food == 0)
+        agents.health[fed] = np.minimum(100, agents.health[fed] + 2)
+        alive &= agents.health > 0
+
+        agents.age[alive] += 1
+        agents.reproduction_cooldown[alive] = np.maximum(0, agents.reproduction_cooldown[alive] - 1)
+        return alive
+
+    def _kill(self, agents, alive):
+        for i in np.flatnonzero(~alive).tolist():
+            agents.animals[i].die(STARVATION if agents.energy[i] <= 0 else DISEASE)
+
+    # --- Núcleos de movimiento ---
+    def _move_towards(self, agents, idx, tx, ty):
+        if not len(idx):
+            return
+        dx, dy = tx - agents.x[idx], ty - agents.y[idx]
+        dist = np.maximum(np.sqrt(dx ** 2 + dy ** 2), 1)
+        ux = agents.dx[idx] * 0.7 + (dx / dist) * 0.3
+        uy = agents.dy[idx] * 0.7 + (dy / dist) * 0.3
+        length = np.sqrt(ux ** 2 + uy ** 2)
+        length = np.where(length > 0, length, 1)
+        ux, uy = ux / length, uy / length
+        speed = agents.speed()[idx]
+        agents.dx[idx], agents.dy[idx] = ux, uy
+        agents.x[idx] += np.trunc(ux * speed).astype(np.int64)
+        agents.y[idx] += np.trunc(uy * speed).astype(np.int64)
+
+    def _flee(self, agents, idx, sum_x, sum_y, count):
+        """Animal.avoid: alejarse del promedio de las amenazas cercanas"""
+        if not len(idx):
+            return
+        avg_x, avg_y = sum_x / count, sum_y / count
+        length = np.maximum(np.sqrt(avg_x ** 2 + avg_y ** 2), 1)
+        ux, uy = avg_x / length, avg_y / length
+        speed = agents.speed()[idx] * 1.5
+        agents.dx[idx], agents.dy[idx] = ux, uy
+        agents.x[idx] += np.trunc(ux * speed).astype(np.int64)
+        agents.y[idx] += np.trunc(uy * speed).astype(np.int64)
+
+    def _move_randomly(self, agents, idx):
+        if not len(idx):
+            return
+        n = len(idx)
+        u = self.rng.random((4, n))
+        agents.change_dir_timer[idx] += 1
+        turn = (agents.change_dir_timer[idx] > 30) | (u[0] < 0.05)
+        dx, dy = agents.dx[idx], agents.dy[idx]
+        dx = np.where(turn, dx + u[1] - 0.5, dx)
+        dy = np.where(turn, dy + u[2] - 0.5, dy)
+        length = np.sqrt(dx ** 2 + dy ** 2)
+        normalize = turn & (length > 0)
+        dx = np.where(normalize, dx / np.where(length > 0, length, 1), dx)
+        dy = np.where(normalize, dy / np.where(length > 0, length, 1), dy)
+        agents.change_dir_timer[idx] = np.where(turn, 0, agents.change_dir_timer[idx])
+
+        step = agents.speed()[idx] * (1 + 0.5 * u[3])
+        x = agents.x[idx] + np.trunc(dx * step).astype(np.int64)
+        y = agents.y[idx] + np.trunc(dy * step).astype(np.int64)
+
+        # Rebote y recorte al mundo con el rect actual (como clamp_ip)
+        w, h = agents.w[idx], agents.h[idx]
+        world_width, world_height = self.params.world_width, self.params.world_height
+        left, top = x - w // 2, y - h // 2
+        dx = np.where((left < 0) | (left + w > world_width), -dx, dx)
+        dy = np.where((top < 0) | (top + h > world_height), -dy, dy)
+        left = np.clip(left, 0, np.maximum(world_width - w, 0))
+        top = np.clip(top, 0, np.maximum(world_height - h, 0))
+        agents.x[idx], agents.y[idx] = left + w // 2, top + h // 2
+        agents.dx[idx], agents.dy[idx] = dx, dy
+
+    def _chase(self, agents, idx, targets, tx, ty):
+        """Moverse hacia el objetivo elegido o al azar si no hay ninguno"""
+        found = targets >= 0
+        self._move_towards(agents, idx[found], tx[targets[found]], ty[targets[found]])
+        self._move_randomly(agents, idx[~found])
+
+    def _count(self, agents, alive):
+        for code in np.unique(agents.behaviour[alive]).tolist():
+            self.counts[BEHAVIOUR_NAMES[code]] += int(np.count_nonzero(agents.behaviour[alive] == code))
+
+    def _mates(self, agents, idx, alive, radius):
+        """Pareja elegible más cercana (sexo opuesto, madura, sin cooldown y sana)"""
+        eligible = (alive & (agents.age >= agents.maturity_age) &
+                    (agents.reproduction_cooldown == 0) & (agents.health > 50))
+        candidates = np.flatnonzero(eligible)
+        qi, tj, d2 = neighbour_pairs(agents.x[idx], agents.y[idx],
+                                     agents.x[candidates], agents.y[candidates], radius)
+        tj = candidates[tj]
+        opposite = agents.male[idx[qi]] != agents.male[tj]
+        return nearest(qi[opposite], tj[opposite], d2[opposite], len(idx))
+
+    # --- Fases ---
+    def update_rabbits(self, rabbits, foxes, foods):
+        agents = AgentArrays(list(rabbits))
+        if not len(agents):
+            return
+        alive = self._upkeep(agents)
+        agents.fear[alive] = np.maximum(0, agents.fear[alive] - 0.5)
+
+        health = agents.health
+        mate = alive & (health > 70) & (agents.age >= agents.maturity_age) & (agents.reproduction_cooldown == 0)
+        food = alive & ~mate & (health > 30)
+        weak = alive & ~mate & ~food
+        x0, y0 = agents.x.copy(), agents.y.copy()
+
+        # Aparearse
+        idx = np.flatnonzero(mate)
+        agents.behaviour[idx] = SEEK_MATE
+        self._chase(agents, idx, self._mates(agents, idx, alive, self.params.vision_radius), x0, y0)
+
+        # Peligro (Rabbit.avoid_danger) para los que buscan comida y los débiles
+        vision = type(self.params).vision_radius
+        fox_list = list(foxes)
+        fox_x = np.fromiter((f.rect.centerx for f in fox_list), np.int64, len(fox_list))
+        fox_y = np.fromiter((f.rect.centery for f in fox_list), np.int64, len(fox_list))
+        idx = np.flatnonzero(food | weak)
+        qi, tj, d2 = neighbour_pairs(x0[idx], y0[idx], fox_x, fox_y, vision)
+        fear = np.bincount(qi, weights=30 * (1 - d2 / vision ** 2), minlength=len(idx))
+        agents.fear[idx] = np.minimum(100, agents.fear[idx] + fear)
+        frightened = idx[agents.fear[idx] > 30]
+        qi, tj, d2 = neighbour_pairs(x0[frightened], y0[frightened], fox_x, fox_y, vision * 1.5)
+        count = np.bincount(qi, minlength=len(frightened))
+        sum_x = np.bincount(qi, weights=x0[frightened][qi] - fox_x[tj], minlength=len(frightened))
+        sum_y = np.bincount(qi, weights=y0[frightened][qi] - fox_y[tj], minlength=len(frightened))
+        fleeing = count > 0
+        self._flee(agents, frightened[fleeing], sum_x[fleeing], sum_y[fleeing], count[fleeing])
+        agents.behaviour[frightened[fleeing]] = FLEE
+
+        # Comer: comida más cercana
+        idx = np.flatnonzero(food & (agents.behaviour != FLEE))
+        agents.behaviour[idx] = SEEK_FOOD
+        food_list = list(foods)
+        food_x = np.fromiter((f.rect.centerx for f in food_list), np.int64, len(food_list))
+        food_y = np.fromiter((f.rect.centery for f in food_list), np.int64, len(food_list))
+        qi, tj, d2 = neighbour_pairs(x0[idx], y0[idx], food_x, food_y, vision)
+        self._chase(agents, idx, nearest(qi, tj, d2, len(idx)), food_x, food_y)
+
+        # Débiles sin amenaza: al azar
+        self._move_randomly(agents, np.flatnonzero(weak & (agents.behaviour != FLEE)))
+
+        self._count(agents, alive)
+        self._kill(agents, alive)
+        agents.write_back(alive)
+
+    def update_foxes(self, rabbits, foxes):
+        agents = AgentArrays(list(foxes))
+        if not len(agents):
+            return
+        alive = self._upkeep(agents)
+        health = agents.health
+        vision = self.params.vision_radius
+        mate = alive & (health > 70) & (agents.age >= agents.maturity_age) & (agents.reproduction_cooldown == 0)
+        hunt = alive & ~mate & (health > 40)
+        weak = alive & ~mate & ~hunt
+        x0, y0 = agents.x.copy(), agents.y.copy()
+
+        idx = np.flatnonzero(mate)
+        agents.behaviour[idx] = SEEK_MATE
+        self._chase(agents, idx, self._mates(agents, idx, alive, vision), x0, y0)
+
+        rabbit_list = list(rabbits)
+        rabbit_x = np.fromiter((r.rect.centerx for r in rabbit_list), np.int64, len(rabbit_list))
+        rabbit_y = np.fromiter((r.rect.centery for r in rabbit_list), np.int64, len(rabbit_list))
+        rabbit_health = np.fromiter((r.health for r in rabbit_list), np.float64, len(rabbit_list))
+
+        # Cazar: el conejo más cercano
+        idx = np.flatnonzero(hunt)
+        agents.behaviour[idx] = HUNT
+        qi, tj, d2 = neighbour_pairs(x0[idx], y0[idx], rabbit_x, rabbit_y, vision)
+        self._chase(agents, idx, nearest(qi, tj, d2, len(idx)), rabbit_x, rabbit_y)
+
+        # Presas débiles: menor salud * distancia (Fox.hunt_weak_prey)
+        idx = np.flatnonzero(weak)
+        agents.behaviour[idx] = HUNT_WEAK
+        qi, tj, d2 = neighbour_pairs(x0[idx], y0[idx], rabbit_x, rabbit_y, vision)
+        score = rabbit_health[tj] * np.sqrt(d2) / 100
+        self._chase(agents, idx, nearest(qi, tj, score, len(idx)), rabbit_x, rabbit_y)
+
+        self._count(agents, alive)
+        self._kill(agents, alive)
+        agents.write_back(alive)
+
+    def behaviour_counts(self):
+        """Número acumulado de veces que se eligió cada comportamiento"""
+        return dict(self.counts)
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import time
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from simulation import Simulation
+
+    # Comparación rápida de los dos motores con la misma configuración
+    params = {"initial_rabbits": 600, "initial_foxes": 60, "initial_food": 300, "max_rabbits": 1500}
+    for engine in ("objects", "batched"):
+        random.seed(0)
+        sim = Simulation(dict(params, behaviour_engine=engine), headless=True, seed=1)
+        start = time.perf_counter()
+        sim.run_headless(300)
+        elapsed = time.perf_counter() - start
+        print(f"{engine}: {300 / elapsed:.1f} ticks/s - conejos: {len(sim.rabbits)}, zorros: {len(sim.foxes)}")
@@ -0,0 +1,88 @@
+"""
+Actualización con doble búfer: todos los animales leen el estado del tick anterior.
+
+Al empezar el tick se toma una instantánea (AgentView) de cada conejo y zorro con
+los campos que leen los demás (posición, sexo, edad, salud, espera para reproducirse).
+Las listas de vecinos de todas las filas de la tabla de interacciones se calculan
+de una vez sobre esa instantánea (interactions.InteractionPass), ordenadas por
+posición en el grupo. Luego cada animal se actualiza leyendo solo la instantánea
+y escribiendo su propio estado (el búfer siguiente), así que el resultado no
+depende del orden en que se recorren ni de cómo se repartan en bloques: los
+bloques pueden ejecutarse en un pool de hilos.
+
+Para que el orden tampoco cambie los números aleatorios, cada animal usa su propio
+subflujo (rng_substreams) y las muertes se aplican al terminar la fase.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from interactions import InteractionPass
+
+
+class AgentView:
+    """Estado de un animal al inicio del tick (lo que Rabbit/Fox leen de los demás)"""
+    __slots__ = ("rect", "gender", "age", "maturity_age", "reproduction_cooldown", "health")
+
+    def __init__(self, animal):
+        self.rect = animal.rect.copy()
+        self.gender = animal.gender
+        self.age = animal.age
+        self.maturity_age = animal.maturity_age
+        self.reproduction_cooldown = animal.reproduction_cooldown
+        self.health = animal.health
+
+
+class DoubleBufferedUpdate:
+    def __init__(self, params, workers=1):
+        self.params = params
+        self.interactions = InteractionPass(params)
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="agents") if self.workers > 1 else None
+        self.pending_kills = []
+        self._rabbit_jobs = []
+        self._fox_jobs = []
+
+    def prepare(self, rabbits, foxes, foods):
+        """Instantánea del tick y argumentos de update de cada animal (una pasada para toda la tabla)"""
+        rabbits, foxes = list(rabbits), list(foxes)
+        views = {'rabbit': [AgentView(r) for r in rabbits], 'fox': [AgentView(f) for f in foxes],
+                 'food': list(foods)}
+        # Las posiciones de los actores son las de su instantánea
+        targets = self.interactions.run(views, views)
+        self._rabbit_jobs = list(zip(rabbits, targets['rabbit']))
+        self._fox_jobs = list(zip(foxes, targets['fox']))
+
+    @staticmethod
+    def _run_chunk(jobs):
+        for animal, args in jobs:
+            animal.update(*args)
+
+    def _run(self, jobs):
+        from simulation import Animal
+        Animal.pending_kills = self.pending_kills
+        try:
+            if self.executor is None or len(jobs) < 2 * self.workers:
+                self._run_chunk(jobs)
+            else:
+                size = -(-len(jobs) // self.workers)
+                chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+                list(self.executor.map(self._run_chunk, chunks))
+        finally:
+            Animal.pending_kills = None
+        # El swap-remove de SpeciesStore mueve el último al hueco, así que el orden en que
+        # se sacan cambia el de los demás; los hilos las añaden en cualquier orden: por uid
+        self.pending_kills.sort(key=lambda animal: animal.uid)
+        for animal in self.pending_kills:
+            animal.kill()
+        self.pending_kills.clear()
+
+    def update_rabbits(self):
+        self._run(self._rabbit_jobs)
+        self._rabbit_jobs = []
+
+    def update_foxes(self):
+        self._run(self._fox_jobs)
+        self._fox_jobs = []
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
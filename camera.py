@@ -0,0 +1,148 @@
+import pygame
+
+
+class Camera:
+    """
+    Cámara 2D con desplazamiento y zoom sobre un mundo más grande que la ventana.
+    Convierte coordenadas de mundo a pantalla y permite descartar (culling)
+    los sprites que quedan fuera del área visible.
+    """
+    def __init__(self, viewport_width, viewport_height, world_width, world_height,
+                 min_zoom=None, max_zoom=4.0):
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.world_width = world_width
+        self.world_height = world_height
+        # Zoom mínimo: el mundo completo cabe en la ventana
+        self.min_zoom = min_zoom or min(1.0, viewport_width / world_width, viewport_height / world_height)
+        self.max_zoom = max_zoom
+        self.zoom = 1.0
+        self.x = 0.0  # Esquina superior izquierda visible (coordenadas de mundo)
+        self.y = 0.0
+        self._scaled_cache = {}
+        self._cache_zoom = self.zoom
+
+    @property
+    def view_width(self):
+        return self.viewport_width / self.zoom
+
+    @property
+    def view_height(self):
+        return self.viewport_height / self.zoom
+
+    def view_rect(self):
+        """Rectángulo del mundo que está visible en la ventana"""
+        return pygame.Rect(int(self.x), int(self.y),
+                           int(self.view_width) + 1, int(self.view_height) + 1)
+
+    def clamp(self):
+        """Evita que la cámara se salga de los límites del mundo"""
+        max_x = self.world_width - self.view_width
+        max_y = self.world_height - self.view_height
+        # Si el mundo es más pequeño que la vista se centra
+        self.x = min(max(self.x, 0), max_x) if max_x > 0 else max_x / 2
+        self.y = min(max(self.y, 0), max_y) if max_y > 0 else max_y / 2
+
+    def pan(self, dx, dy):
+        """Desplaza la cámara en píxeles de pantalla"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, screen_pos):
+        """Aplica zoom manteniendo fijo el punto del mundo bajo el cursor"""
+        world_x, world_y = self.screen_to_world(screen_pos)
+        self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        self.x = world_x - screen_pos[0] / self.zoom
+        self.y = world_y - screen_pos[1] / self.zoom
+        self.clamp()
+
+    def fit_world(self):
+        """Ajusta el zoom para ver el mundo completo"""
+        self.zoom = self.min_zoom
+        self.x = self.y = 0
+        self.clamp()
+
+    def center_on(self, world_x, world_y):
+        self.x = world_x - self.view_width / 2
+        self.y = world_y - self.view_height / 2
+        self.clamp()
+
+    def world_to_screen(self, pos):
+        return (int((pos[0] - self.x) * self.zoom), int((pos[1] - self.y) * self.zoom))
+
+    def screen_to_world(self, pos):
+        return (int(pos[0] / self.zoom + self.x), int(pos[1] / self.zoom + self.y))
+
+    def _scaled(self, image):
+        """Imagen escalada al zoom actual, cacheada mientras no cambie el zoom"""
+        if self._cache_zoom != self.zoom:
+            self._scaled_cache.clear()
+            self._cache_zoom = self.zoom
+        key = id(image)
+        cached = self._scaled_cache.get(key)
+        if cached is None or cached[0] is not image:
+            size = (max(1, int(image.get_width() * self.zoom)), max(1, int(image.get_height() * self.zoom)))
+            cached = (image, pygame.transform.scale(image, size))
+            # Las imágenes rotadas se regeneran cada frame; limitar el tamaño de la caché
+            if len(self._scaled_cache) > 4096:
+                self._scaled_cache.clear()
+            self._scaled_cache[key] = cached
+        return cached[1]
+
+    def draw(self, surface, sprites, image=None):
+        """
+        Dibuja solo los sprites que intersectan la vista. Devuelve cuántos se dibujaron.
+        Con `image(sprite)` se dibuja esa imagen centrada en el rect (p. ej. rotada) en
+        lugar de sprite.image.
+        """
+        view = self.view_rect()
+        colliderect = view.colliderect
+        blit = surface.blit
+        drawn = 0
+        if self.zoom == 1.0:
+            offset_x, offset_y = int(self.x), int(self.y)
+            for sprite in sprites:
+                rect = sprite.rect
+                if colliderect(rect):
+                    if image is None:
+                        blit(sprite.image, (rect.x - offset_x, rect.y - offset_y))
+                    else:
+                        picture = image(sprite)
+                        blit(picture, (rect.centerx - picture.get_width() // 2 - offset_x,
+                                       rect.centery - picture.get_height() // 2 - offset_y))
+                    drawn += 1
+        else:
+            for sprite in sprites:
+                rect = sprite.rect
+                if colliderect(rect):
+                    if image is None:
+                        blit(self._scaled(sprite.image), self.world_to_screen(rect.topleft))
+                    else:
+                        picture = self._scaled(image(sprite))
+                        x, y = self.world_to_screen(rect.center)
+                        blit(picture, (x - picture.get_width() // 2, y - picture.get_height() // 2))
+                    drawn += 1
+        return drawn
+
+    def draw_rects(self, surface, sprites):
+        """Versión barata de draw: un rectángulo del color de cada sprite (atributo `color`)"""
+        view = self.view_rect()
+        colliderect = view.colliderect
+        fill = surface.fill
+        zoom = self.zoom
+        drawn = 0
+        for sprite in sprites:
+            rect = sprite.rect
+            if colliderect(rect):
+                x, y = self.world_to_screen(rect.topleft)
+                fill(sprite.color, (x, y, max(1, int(rect.width * zoom)), max(1, int(rect.height * zoom))))
+                drawn += 1
+        return drawn
+
+    def draw_world_border(self, surface, color, width=2):
+        top_left = self.world_to_screen((0, 0))
+        bottom_right = self.world_to_screen((self.world_width, self.world_height))
+        pygame.draw.rect(surface, color, (top_left[0], top_left[1],
+                                          bottom_right[0] - top_left[0],
+                                          bottom_right[1] - top_left[1]), width)
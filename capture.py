@@ -0,0 +1,127 @@
+"""
+Captura de frames fuera del hilo principal. Cada N ticks se copia el frame dibujado
+(pygame.image.tobytes) a una cola acotada y un hilo escritor lo guarda como
+secuencia PNG o como un único archivo de video crudo (RGB24). Si la cola está
+llena el frame se descarta: la simulación nunca espera al disco.
+
+Funciona sin ventana (SDL_VIDEODRIVER=dummy): Simulation dibuja en una superficie
+fuera de pantalla. El video crudo se puede convertir con, por ejemplo:
+
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s 1200x800 -r 30 -i frames.rgb video.mp4
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import pygame
+
+FORMATS = ("png", "raw")
+
+
+def encode_png(data, width, height, level=1):
+    """PNG RGB de 8 bits sin filtros; zlib libera el GIL mientras comprime"""
+    stride = width * 3
+    rows = b"".join(b"\x00" + data[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(kind, payload):
+        return (struct.pack(">I", len(payload)) + kind + payload +
+                struct.pack(">I", zlib.crc32(kind + payload) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(rows, level)) + chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    """
+    `capture(surface, tick)` se llama en cada frame dibujado; solo copia uno de cada
+    `every` ticks. Los contadores `captured`, `written` y `dropped` permiten ver si
+    el disco no da abasto.
+    """
+    def __init__(self, path, every=1, fmt="png", queue_size=32, fps=30, compression=1):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de captura desconocido: {fmt} (opciones: {', '.join(FORMATS)})")
+        self.path = path
+        self.every = max(1, every)
+        self.fmt = fmt
+        self.fps = fps
+        self.compression = compression
+        self.size = None
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        os.makedirs(path, exist_ok=True)
+        self._raw_file = None
+        self._thread = threading.Thread(target=self._writer, name="frame-capture", daemon=True)
+        self._thread.start()
+
+    def capture(self, surface, tick):
+        if tick % self.every:
+            return False
+        if self.size is None:
+            self.size = surface.get_size()
+        elif surface.get_size() != self.size:
+            surface = pygame.transform.scale(surface, self.size)
+        if self._queue.full():
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((tick, pygame.image.tobytes(surface, "RGB")))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.captured += 1
+        return True
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue  # Se vacía la cola sin escribir para no bloquear a close()
+            tick, data = item
+            try:
+                self._write(tick, data)
+                self.written += 1
+            except OSError as e:
+                self.error = e
+        if self._raw_file is not None:
+            self._raw_file.close()
+
+    def _write(self, tick, data):
+        width, height = self.size
+        if self.fmt == "png":
+            with open(os.path.join(self.path, f"frame_{tick:08d}.png"), "wb") as f:
+                f.write(encode_png(data, width, height, self.compression))
+        else:
+            if self._raw_file is None:
+                self._raw_file = open(os.path.join(self.path, "frames.rgb"), "wb")
+            self._raw_file.write(data)
+
+    def close(self):
+        """Espera a que se escriban los frames pendientes y deja un resumen en capture.json"""
+        self._queue.put(None)
+        self._thread.join()
+        width, height = self.size or (0, 0)
+        info = {
+            "format": self.fmt,
+            "pixel_format": "rgb24",
+            "width": width,
+            "height": height,
+            "fps": self.fps,
+            "every": self.every,
+            "captured": self.captured,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+        with open(os.path.join(self.path, "capture.json"), "w") as f:
+            json.dump(info, f, indent=2)
+        if self.error is not None:
+            raise self.error
+        return info
@@ -0,0 +1,310 @@
+"""
+Punto de entrada por línea de comandos. Este módulo no importa nada pesado: cada
+subcomando importa sus módulos al ejecutarse. `run`, `replay` y los que simulan
+cargan simulation.py y con él pygame y numpy; tkinter solo con --gui-config, y
+`period` no necesita ninguno.
+
+    python -m cli run --rabbits 300 --ticks 100000 --headless
+    python -m cli run --gui-config
+    python -m cli run --headless --ticks 20000 --record runs/partida
+    python -m cli replay runs/partida
+    python -m cli run --headless --ticks 20000 --events runs/eventos.bin
+    python -m cli run --headless --ticks 50000 --export runs/poblacion.csv
+    python -m cli analyze runs/ --out runs/summary.csv
+    python -m cli ensemble --replicas 16 --ticks 5000
+    python -m cli golden check --engine batched
+    python -m cli battery lcg --count 100000000
+    python -m cli period --a 5 --c 7 --m 991
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+CONFIG_FILE = "simulation_config.json"
+
+# Opciones de la línea de comandos -> nombre del parámetro de SimulationParams
+PARAM_FLAGS = {
+    "rabbits": "initial_rabbits",
+    "foxes": "initial_foxes",
+    "food": "initial_food",
+    "rabbit_speed": "rabbit_speed",
+    "fox_speed": "fox_speed",
+    "food_rate": "food_respawn_rate",
+    "max_rabbits": "max_rabbits",
+    "max_foxes": "max_foxes",
+    "world_width": "world_width",
+    "world_height": "world_height",
+    "engine": "behaviour_engine",
+    "update_mode": "update_mode",
+    "update_workers": "update_workers",
+}
+
+
+def load_params(args):
+    """Parámetros del archivo de configuración, sobrescritos por las opciones dadas"""
+    params = {}
+    if args.config and os.path.exists(args.config):
+        with open(args.config) as f:
+            params = json.load(f)
+    for flag, param in PARAM_FLAGS.items():
+        value = getattr(args, flag, None)
+        if value is not None:
+            params[param] = value
+    return params
+
+
+def positive_int(text):
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que cero: {text}")
+    return value
+
+
+def add_param_flags(parser):
+    parser.add_argument("--config", default=CONFIG_FILE, help="archivo JSON de parámetros")
+    parser.add_argument("--rabbits", type=int)
+    parser.add_argument("--foxes", type=int)
+    parser.add_argument("--food", type=int)
+    parser.add_argument("--rabbit-speed", dest="rabbit_speed", type=float)
+    parser.add_argument("--fox-speed", dest="fox_speed", type=float)
+    parser.add_argument("--food-rate", dest="food_rate", type=int)
+    parser.add_argument("--max-rabbits", dest="max_rabbits", type=int)
+    parser.add_argument("--max-foxes", dest="max_foxes", type=int)
+    parser.add_argument("--world-width", dest="world_width", type=positive_int)
+    parser.add_argument("--world-height", dest="world_height", type=positive_int)
+    parser.add_argument("--engine", choices=("objects", "batched"), help="motor de comportamiento")
+    parser.add_argument("--update-mode", dest="update_mode", choices=("sequential", "double_buffered"),
+                        help="actualizar en el lugar o leyendo la instantánea del tick anterior")
+    parser.add_argument("--update-workers", dest="update_workers", type=int,
+                        help="hilos para los bloques de animales (double_buffered)")
+    parser.add_argument("--seed", type=int)
+
+
+def command_run(args):
+    params = load_params(args)
+    if args.gui_config and not args.headless:
+        from simulation import show_start_screen
+        params = show_start_screen()
+
+    if args.headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    start = time.perf_counter()
+
+    if args.headless and args.workers and args.workers > 1:
+        from parallel import ParallelSimulation
+        with ParallelSimulation(params, workers=args.workers, seed=args.seed or 0) as sim:
+            history = sim.run(args.ticks)
+        print("Eventos: " + json.dumps(sim.events.totals()))
+        rabbits, foxes, food = history[-1] if history else (0, 0, 0)
+        ticks = len(history)
+        if args.export:
+            from analysis import write_series
+            write_series(args.export, range(1, ticks + 1), history)
+    else:
+        from simulation import Simulation
+        sim = Simulation(params, headless=args.headless, seed=args.seed)
+        if args.telemetry is not None:
+            sim.enable_telemetry(port=args.telemetry)
+        if args.record:
+            sim.enable_recording(args.record, args.record_stride)
+        if args.heatmap:
+            sim.enable_heatmap()
+        if args.events:
+            sim.enable_event_log(args.events)
+        if args.capture:
+            sim.enable_capture(args.capture, args.capture_every, args.capture_format)
+        if args.headless and args.export:
+            series = []
+            for _ in range(args.ticks):
+                sim.run_headless(1)
+                series.append((len(sim.rabbits), len(sim.foxes), len(sim.foods)))
+            from analysis import write_series
+            write_series(args.export, range(sim.tick - len(series) + 1, sim.tick + 1), series)
+        elif args.headless:
+            sim.run_headless(args.ticks)
+        else:
+            sim.run(max_ticks=args.ticks)
+        if sim.telemetry is not None:
+            sim.telemetry.stop()
+        if sim.recorder is not None:
+            sim.recorder.close()
+            print(f"Trayectorias en {sim.recorder.path}: {sim.recorder.samples} muestras, "
+                  f"{sim.recorder.count} registros")
+        if sim.events.log is not None:
+            sim.events.close()
+            print(f"Eventos en {args.events}: {sim.events.log.total} registros")
+        if args.headless:
+            print("Eventos: " + json.dumps(sim.events.totals()))
+        if sim.capture is not None:
+            info = sim.capture.close()
+            print(f"Captura en {args.capture}: {info['written']} frames escritos, "
+                  f"{info['dropped']} descartados")
+        rabbits, foxes, food = len(sim.rabbits), len(sim.foxes), len(sim.foods)
+        ticks = sim.tick
+
+    elapsed = time.perf_counter() - start
+    if args.headless:
+        rate = ticks / elapsed if elapsed > 0 else 0.0
+        print(f"{ticks} ticks en {elapsed:.2f}s ({rate:.1f} ticks/s) - "
+              f"conejos: {rabbits}, zorros: {foxes}, comida: {food}")
+
+
+def command_replay(args):
+    from replay import Replay
+    Replay(args.path, speed=args.speed).run()
+
+
+def command_analyze(args):
+    from analysis import analyze_directory, write_summary
+    paths = args.paths[0] if len(args.paths) == 1 else args.paths
+    summaries = analyze_directory(paths, workers=args.workers)
+    if not summaries:
+        sys.exit("No se encontraron series de población (.csv, .npz o .traj)")
+    columns = ("rabbits_period", "foxes_period", "phase_lag", "rabbits_extinction", "foxes_extinction")
+    print("archivo".ljust(28) + "".join(name.rjust(20) for name in columns))
+    for summary in summaries:
+        print(summary["file"][:27].ljust(28) + "".join(f"{summary[name]:20.1f}" for name in columns))
+    if args.out:
+        write_summary(args.out, summaries)
+        print(f"Resumen escrito en {args.out}")
+
+
+def command_ensemble(args):
+    from ensemble import EnsembleRunner
+    runner = EnsembleRunner(load_params(args), args.replicas, args.ticks, args.seed or 0, args.workers)
+    runner.run(on_progress=lambda done, total: print(f"\r{done}/{total} ticks", end="", flush=True))
+    runner.write_csv(args.out)
+    print(f"\nBandas escritas en {args.out}")
+
+
+def command_golden(args):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import golden
+    if args.action == "record":
+        try:
+            golden.record(args.scenarios, args.replicas, args.workers, reason=args.reason)
+        except ValueError as e:
+            sys.exit(str(e))
+    elif not golden.check(args.engines, args.scenarios, args.replicas, args.workers):
+        sys.exit(1)
+
+
+def command_battery(args):
+    from rng_battery import format_report, generator_chunks, run_battery
+    for generator in args.generators or ("lcg", "middlesquare"):
+        if generator not in ("lcg", "middlesquare"):
+            sys.exit(f"Generador desconocido: {generator}")
+        title, chunks = generator_chunks(generator, args.count, args.chunk, args.seed)
+        total, results = run_battery(chunks, confidence=args.confidence)
+        print(format_report(title, total, results))
+        print()
+
+
+def command_period(args):
+    from random_generator import period_analysis
+    result = period_analysis(args.a, args.c, args.m, args.x0)
+    print(f"LCG a={args.a} c={args.c} m={args.m} x0={args.x0}")
+    for name, ok in result["conditions"].items():
+        print(f"  {name}: {'sí' if ok else 'no'}")
+    print(f"  Periodo completo (Hull-Dobell): {'sí' if result['full_period'] else 'no'}")
+    if result["period"] is None:
+        print("  Periodo: no se pudo calcular (a no invertible y m demasiado grande)")
+    else:
+        print(f"  Periodo: {result['period']:,}  Cola: {result['tail']:,}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli", description="Simulación zorros-conejos-pasto")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="ejecutar una simulación")
+    add_param_flags(run)
+    run.add_argument("--ticks", type=int, help="número de ticks (sin límite en modo ventana)")
+    run.add_argument("--headless", action="store_true", help="sin ventana ni límite de FPS")
+    run.add_argument("--workers", type=int,
+                     help="procesos para el modo headless por teselas (sin --record, --capture, --telemetry ni --events)")
+    run.add_argument("--telemetry", type=int, metavar="PORT", help="servidor de telemetría local")
+    run.add_argument("--record", metavar="PATH", help="grabar trayectorias en PATH.traj")
+    run.add_argument("--record-stride", dest="record_stride", type=int, default=1, metavar="N",
+                     help="grabar uno de cada N ticks")
+    run.add_argument("--capture", metavar="DIR", help="guardar frames en este directorio")
+    run.add_argument("--capture-every", dest="capture_every", type=int, default=1, metavar="N",
+                     help="capturar uno de cada N ticks")
+    run.add_argument("--capture-format", dest="capture_format", choices=("png", "raw"), default="png")
+    run.add_argument("--events", metavar="PATH",
+                     help="registrar cada nacimiento y muerte en PATH (registros binarios de events.py)")
+    run.add_argument("--heatmap", action="store_true", help="mostrar el mapa de calor de densidad desde el inicio")
+    run.add_argument("--export", metavar="FILE", help="exportar la serie de población (.csv o .npz, headless)")
+    run.add_argument("--gui-config", action="store_true", help="mostrar la ventana de configuración Tk")
+    run.set_defaults(func=command_run)
+
+    replay = subparsers.add_parser("replay", help="ver una grabación de trayectorias (--record)")
+    replay.add_argument("path", help="ruta de la grabación (con o sin .traj)")
+    replay.add_argument("--speed", type=int, default=1, help="velocidad inicial (1 a 1000)")
+    replay.set_defaults(func=command_replay)
+
+    analyze = subparsers.add_parser("analyze", help="periodos, desfase, extinciones y ajuste Lotka-Volterra")
+    analyze.add_argument("paths", nargs="+", help="series exportadas, grabaciones .traj o un directorio de barrido")
+    analyze.add_argument("--workers", type=int, help="procesos (por defecto, uno por CPU)")
+    analyze.add_argument("--out", help="CSV con el resumen de cada corrida")
+    analyze.set_defaults(func=command_analyze)
+
+    ensemble = subparsers.add_parser("ensemble", help="ensamble Monte Carlo con bandas de confianza")
+    add_param_flags(ensemble)
+    ensemble.add_argument("--replicas", type=int, default=8)
+    ensemble.add_argument("--ticks", type=int, default=2000)
+    ensemble.add_argument("--workers", type=int)
+    ensemble.add_argument("--out", default="ensemble_bands.csv")
+    ensemble.set_defaults(func=command_ensemble)
+
+    golden = subparsers.add_parser("golden", help="trazas doradas: grabar la referencia o comprobar los motores")
+    golden.add_argument("action", choices=("record", "check"))
+    golden.add_argument("--scenario", dest="scenarios", action="append",
+                        choices=("base", "crowded", "large_world"), help="escenario (por defecto todos)")
+    golden.add_argument("--engine", dest="engines", action="append",
+                        choices=("neighbour_lists", "batched", "double_buffered", "parallel"), help="motor a comprobar (por defecto todos)")
+    golden.add_argument("--replicas", type=int, default=12, help="réplicas de los ensambles")
+    golden.add_argument("--reason", help="motivo de volver a grabar (el cambio de ecología)")
+    golden.add_argument("--workers", type=int)
+    golden.set_defaults(func=command_golden)
+
+    battery = subparsers.add_parser("battery", help="batería de pruebas de los generadores")
+    battery.add_argument("generators", nargs="*", metavar="{lcg,middlesquare}",
+                         help="generadores a probar (por defecto ambos)")
+    battery.add_argument("--count", type=int, default=10_000_000)
+    battery.add_argument("--chunk", type=int, default=1_000_000)
+    battery.add_argument("--seed", type=int)
+    battery.add_argument("--confidence", type=float, default=0.95)
+    battery.set_defaults(func=command_battery)
+
+    period = subparsers.add_parser("period", help="análisis del periodo de un LCG")
+    period.add_argument("--a", type=int, default=1664525)
+    period.add_argument("--c", type=int, default=1013904223)
+    period.add_argument("--m", type=int, default=2 ** 32)
+    period.add_argument("--x0", type=int, default=0)
+    period.set_defaults(func=command_period)
+    return parser
+
+
+def main(argv=None):
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.workers and args.workers > 1:
+        # Las teselas de parallel.py solo devuelven poblaciones y contadores
+        if not args.headless:
+            parser.error("--workers solo funciona con --headless")
+        unsupported = [flag for flag, value in (("--record", args.record), ("--capture", args.capture),
+                                                ("--telemetry", args.telemetry), ("--events", args.events))
+                       if value is not None]
+        if unsupported:
+            parser.error(f"--workers no admite {', '.join(unsupported)}")
+    if args.command == "run" and args.headless and args.ticks is None:
+        args.ticks = 1000
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
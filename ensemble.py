@@ -0,0 +1,142 @@
+import csv
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from random_generator import MiddleSquare
+
+SPECIES = ("rabbits", "foxes", "food")
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def replica_seeds(seed, replicas):
+    """Semillas independientes para cada réplica (LCG y módulo random)"""
+    return [int(s) for s in np.random.SeedSequence(seed).generate_state(replicas)]
+
+
+def middle_square_seed(seed, digits=8, count=10000, tail=2000):
+    """
+    Semilla del MiddleSquare de una réplica, derivada de su semilla. Muchas semillas
+    del cuadrado medio caen en cero o en un punto fijo (toda la comida en el mismo
+    sitio), así que se prueban candidatas hasta una sin ceros cuyos últimos `tail`
+    números (los primeros que se sacan) tengan al menos tanta variedad como la
+    semilla por defecto.
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        number = int(rng.integers(10 ** (digits - 1), 10 ** digits))
+        values = MiddleSquare(number, digits, count).list
+        if 0 not in values and len(set(values[-tail:])) >= 100:
+            return number
+
+
+def replica_params(params, seed):
+    """Parámetros de una réplica: también la comida sale de un flujo propio"""
+    return dict(params, middle_square_seed=middle_square_seed(seed))
+
+
+def _run_replica(args):
+    """Ejecuta una réplica headless escribiendo su población de cada tick en memoria compartida"""
+    index, seed, params, ticks, pop_name, progress_name, replicas = args
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from simulation import Simulation
+
+    pop_shm = shared_memory.SharedMemory(name=pop_name)
+    progress_shm = shared_memory.SharedMemory(name=progress_name)
+    try:
+        populations = np.ndarray((replicas, ticks, len(SPECIES)), dtype=np.int32, buffer=pop_shm.buf)
+        progress = np.ndarray((replicas,), dtype=np.int64, buffer=progress_shm.buf)
+        sim = Simulation(replica_params(params, seed), headless=True, seed=seed)
+        row = populations[index]
+        for tick in range(ticks):
+            sim.step()
+            row[tick] = (len(sim.rabbits), len(sim.foxes), len(sim.foods))
+            progress[index] = tick + 1  # Se publica después de escribir la fila
+        del row, populations, progress
+    finally:
+        pop_shm.close()
+        progress_shm.close()
+    return index
+
+
+class EnsembleRunner:
+    """
+    Ejecuta K réplicas de la simulación en procesos paralelos. Cada réplica escribe
+    sus poblaciones en un bloque de memoria compartida y el proceso principal va
+    calculando media y cuantiles de los ticks que ya completaron todas las réplicas.
+    """
+    def __init__(self, params=None, replicas=8, ticks=1000, seed=0, workers=None):
+        self.params = dict(params or {})
+        self.replicas = replicas
+        self.ticks = ticks
+        self.seeds = replica_seeds(seed, replicas)
+        self.workers = workers or os.cpu_count() or 1
+        self.bands = {name: np.zeros((ticks, 1 + len(QUANTILES))) for name in SPECIES}
+        self.completed_ticks = 0
+
+    def _aggregate(self, populations, start, stop):
+        """Media y cuantiles de los ticks [start, stop) sobre todas las réplicas"""
+        block = populations[:, start:stop, :].astype(np.float64)
+        means = block.mean(axis=0)
+        quantiles = np.quantile(block, QUANTILES, axis=0)
+        for i, name in enumerate(SPECIES):
+            self.bands[name][start:stop, 0] = means[:, i]
+            self.bands[name][start:stop, 1:] = quantiles[:, :, i].T
+
+    def run(self, on_progress=None, poll_interval=0.2):
+        shape = (self.replicas, self.ticks, len(SPECIES))
+        pop_shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+        progress_shm = shared_memory.SharedMemory(create=True, size=self.replicas * 8)
+        try:
+            populations = np.ndarray(shape, dtype=np.int32, buffer=pop_shm.buf)
+            progress = np.ndarray((self.replicas,), dtype=np.int64, buffer=progress_shm.buf)
+            progress[:] = 0
+            jobs = [(i, seed, self.params, self.ticks, pop_shm.name, progress_shm.name, self.replicas)
+                    for i, seed in enumerate(self.seeds)]
+            with mp.Pool(min(self.workers, self.replicas)) as pool:
+                result = pool.map_async(_run_replica, jobs)
+                while True:
+                    finished = result.ready()
+                    ready = int(progress.min())
+                    if ready > self.completed_ticks:
+                        self._aggregate(populations, self.completed_ticks, ready)
+                        self.completed_ticks = ready
+                        if on_progress:
+                            on_progress(self.completed_ticks, self.ticks)
+                    if finished:
+                        result.get()  # Propaga errores de las réplicas
+                        break
+                    time.sleep(poll_interval)
+            self.final_populations = populations[:, -1, :].copy()
+            del populations, progress
+        finally:
+            pop_shm.close()
+            pop_shm.unlink()
+            progress_shm.close()
+            progress_shm.unlink()
+        return self.bands
+
+    def write_csv(self, path):
+        """Escribe las bandas de confianza: una fila por tick, media y cuantiles por especie"""
+        header = ["tick"]
+        for name in SPECIES:
+            header.append(f"{name}_mean")
+            header.extend(f"{name}_q{int(q * 100):02d}" for q in QUANTILES)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for tick in range(self.completed_ticks):
+                row = [tick + 1]
+                for name in SPECIES:
+                    row.extend(f"{v:.3f}" for v in self.bands[name][tick])
+                writer.writerow(row)
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+
+    main(["ensemble", *sys.argv[1:]])
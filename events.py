@@ -0,0 +1,124 @@
+"""
+Contadores demográficos y registro de eventos.
+
+Cada nacimiento, muerte (por hambre en update_energy, por salud en update_health o
+por caza en handle_feeding) y cada comida consumida o caducada suma uno a un contador
+por causa y especie; eso cuesta un incremento de lista y está siempre activo.
+
+El registro detallado (tick, evento, especie, id, posición) es opcional: los eventos
+se acumulan en una lista y cada `batch` se pasan a la vez a un anillo de NumPy con
+los últimos `capacity` y, si hay ruta, se escriben al archivo como registros binarios
+EVENT_DTYPE (legibles con `read_events`). Desactivado, no cuesta nada más que los
+contadores.
+"""
+import json
+
+import numpy as np
+
+BIRTH, STARVATION, DISEASE, PREDATION, EATEN, EXPIRED = range(6)
+EVENT_NAMES = ("birth", "starvation", "disease", "predation", "eaten", "expired")
+# Mismos códigos de especie que trajectory.py
+SPECIES_NAMES = ("rabbit", "fox", "food")
+
+EVENT_DTYPE = np.dtype([
+    ("tick", "<u4"),
+    ("event", "u1"),
+    ("species", "u1"),
+    ("id", "<u4"),
+    ("x", "<i4"),
+    ("y", "<i4"),
+])
+
+
+class EventLog:
+    def __init__(self, path=None, capacity=1 << 16, batch=4096):
+        self.path = path
+        self.capacity = capacity
+        self.batch = batch
+        self.ring = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.total = 0  # Eventos que ya pasaron al anillo
+        self._buffer = []
+        self._file = open(path, "wb") if path else None
+
+    def append(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        block = np.array(self._buffer, dtype=EVENT_DTYPE)
+        self._buffer = []
+        if self._file is not None:
+            self._file.write(block.tobytes())
+        tail = block[-self.capacity:]
+        start = (self.total + len(block) - len(tail)) % self.capacity
+        first = min(len(tail), self.capacity - start)
+        self.ring[start:start + first] = tail[:first]
+        self.ring[:len(tail) - first] = tail[first:]
+        self.total += len(block)
+
+    def recent(self, n=None):
+        """Los últimos `n` eventos (todos los del anillo si es None) en orden cronológico"""
+        self.flush()
+        kept = min(self.total, self.capacity)
+        n = kept if n is None else min(n, kept)
+        slots = np.arange(self.total - n, self.total) % self.capacity
+        return self.ring[slots]
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            with open(self.path + ".json", "w") as f:
+                json.dump({"events": self.total, "dtype": EVENT_DTYPE.descr,
+                           "event_names": list(EVENT_NAMES), "species": list(SPECIES_NAMES)}, f, indent=2)
+
+
+def read_events(path):
+    """Registros de un archivo escrito por EventLog (memory-mapped)"""
+    return np.memmap(path, dtype=EVENT_DTYPE, mode="r")
+
+
+class DemographicEvents:
+    """
+    `record(event, species, entity)` desde la simulación. `uid` asigna el identificador
+    estable de cada entidad (el mismo que usa la grabación de trayectorias).
+    """
+    def __init__(self, uid=None):
+        self.counts = [[0] * len(SPECIES_NAMES) for _ in EVENT_NAMES]
+        self.tick = 0
+        self.uid = uid
+        self.log = None
+
+    def record(self, event, species, entity):
+        self.counts[event][species] += 1
+        if self.log is not None:
+            rect = entity.rect
+            uid = self.uid(entity) if self.uid is not None else 0
+            self.log.append((self.tick, event, species, uid, rect.centerx, rect.centery))
+
+    def enable_log(self, path=None, capacity=1 << 16, batch=4096):
+        self.log = EventLog(path, capacity, batch)
+        return self.log
+
+    def reset(self):
+        self.counts = [[0] * len(SPECIES_NAMES) for _ in EVENT_NAMES]
+
+    def totals(self):
+        """{especie: {evento: cuenta}} sin los pares que no pueden ocurrir"""
+        return {species: {event: self.counts[e][s] for e, event in enumerate(EVENT_NAMES)
+                          if (e < EATEN) == (s != 2)}
+                for s, species in enumerate(SPECIES_NAMES)}
+
+    def summary(self):
+        """Texto corto para el panel: nacimientos y muertes por causa (conejos/zorros)"""
+        c = self.counts
+        return (f"Nac. {c[BIRTH][0]}/{c[BIRTH][1]}  Hambre {c[STARVATION][0]}/{c[STARVATION][1]}  "
+                f"Salud {c[DISEASE][0]}/{c[DISEASE][1]}  Caza {c[PREDATION][0]}")
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
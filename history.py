@@ -0,0 +1,154 @@
+"""
+Historial de población multirresolución para el gráfico de draw_stats.
+
+El nivel 0 guarda cada tick; cada nivel siguiente resume `ratio` entradas del
+anterior con su mínimo, máximo y media (1x, 16x, 256x, ...). Los niveles son anillos
+de `capacity` entradas, salvo el último, que cubre la corrida entera: cuando se
+llena, une sus entradas de dos en dos y duplica su decimación. La memoria queda
+acotada a niveles × capacidad sin importar cuánto dure la corrida.
+
+`window(span, points)` elige el nivel más fino que cubre los últimos `span` ticks
+con a lo sumo `capacity` entradas y lo reduce a `points` columnas, así que dibujar
+los últimos segundos o la corrida completa cuesta lo mismo.
+"""
+import numpy as np
+
+# Rangos del gráfico en ticks (None = toda la corrida)
+GRAPH_SPANS = (500, 2000, 10000, 50000, 250000, None)
+
+MIN, MAX, MEAN = 0, 1, 2
+
+
+def reduce_columns(mins, maxs, means, points):
+    """Agrupa las filas en a lo sumo `points` columnas (mínimo, máximo y media de cada grupo)"""
+    n = len(means)
+    if n <= points:
+        return mins, maxs, means
+    starts = (np.arange(points) * n) // points
+    sizes = np.diff(np.append(starts, n))[:, None]
+    return (np.minimum.reduceat(mins, starts, axis=0),
+            np.maximum.reduceat(maxs, starts, axis=0),
+            np.add.reduceat(means, starts, axis=0) / sizes)
+
+
+class PopulationHistory:
+    def __init__(self, series=3, capacity=4096, ratio=16, levels=4):
+        self.series = series
+        self.capacity = capacity - capacity % 2  # El último nivel se compacta de a pares
+        self.ratio = ratio
+        self.levels = levels
+        self.decimation = [ratio ** level for level in range(levels)]
+        # (nivel, mínimo/máximo/media, entrada, serie)
+        self.data = np.zeros((levels, 3, self.capacity, series), dtype=np.float32)
+        self.count = [0] * levels  # Entradas escritas en cada nivel
+        self._pending = [None] * levels  # [mínimos, máximos, suma de medias, n] del nivel l >= 1
+        self.samples = 0
+
+    def __len__(self):
+        return self.samples
+
+    def clear(self):
+        self.data[:] = 0
+        self.count = [0] * self.levels
+        self._pending = [None] * self.levels
+        self.decimation = [self.ratio ** level for level in range(self.levels)]
+        self.samples = 0
+
+    def append(self, values):
+        """Añade la muestra de un tick (una tupla con un valor por serie)"""
+        self.samples += 1
+        self._push(0, values, values, values)
+
+    def _push(self, level, mins, maxs, means):
+        top = level == self.levels - 1
+        if top and self.count[level] == self.capacity:
+            self._compact()
+        slot = self.count[level] if top else self.count[level] % self.capacity
+        entry = self.data[level, :, slot]
+        entry[MIN] = mins
+        entry[MAX] = maxs
+        entry[MEAN] = means
+        self.count[level] += 1
+        if top:
+            return
+
+        pending = self._pending[level + 1]
+        if pending is None:
+            self._pending[level + 1] = [list(mins), list(maxs), list(means), 1]
+            pending = self._pending[level + 1]
+        else:
+            pending[0] = list(map(min, pending[0], mins))
+            pending[1] = list(map(max, pending[1], maxs))
+            pending[2] = [a + b for a, b in zip(pending[2], means)]
+            pending[3] += 1
+        if pending[3] * self.decimation[level] >= self.decimation[level + 1]:
+            self._pending[level + 1] = None
+            n = pending[3]
+            self._push(level + 1, pending[0], pending[1], [s / n for s in pending[2]])
+
+    def _compact(self):
+        """Une las entradas del último nivel de dos en dos"""
+        level = self.data[-1]
+        even, odd = level[:, 0::2], level[:, 1::2]
+        half = self.capacity // 2
+        merged_min = np.minimum(even[MIN], odd[MIN])
+        merged_max = np.maximum(even[MAX], odd[MAX])
+        merged_mean = (even[MEAN] + odd[MEAN]) / 2
+        level[MIN, :half], level[MAX, :half], level[MEAN, :half] = merged_min, merged_max, merged_mean
+        self.count[-1] = half
+        self.decimation[-1] *= 2
+
+    def _entries(self, level, k):
+        """Las últimas k entradas del nivel en orden cronológico"""
+        count = self.count[level]
+        if level == self.levels - 1:
+            return self.data[level, :, count - k:count]
+        slots = np.arange(count - k, count) % self.capacity
+        return self.data[level][:, slots]
+
+    def window(self, span=None, points=280):
+        """
+        (ticks cubiertos, mínimos, máximos, medias) de los últimos `span` ticks (None =
+        toda la corrida), con a lo sumo `points` filas de forma (series,).
+        """
+        span = self.samples if span is None else min(span, self.samples)
+        if span <= 0:
+            empty = np.zeros((0, self.series), dtype=np.float32)
+            return 0, empty, empty, empty
+        for level in range(self.levels):
+            decimation = self.decimation[level]
+            count = self.count[level]
+            needed = -(-span // decimation)
+            # Sirve si tiene todas las entradas pedidas o si nunca dio la vuelta al anillo
+            if needed <= min(count, self.capacity) or (needed <= self.capacity and count <= self.capacity):
+                break
+        k = min(needed, count, self.capacity)
+        if k <= 0:
+            empty = np.zeros((0, self.series), dtype=np.float32)
+            return 0, empty, empty, empty
+        entries = self._entries(level, k)
+        mins, maxs, means = reduce_columns(entries[MIN], entries[MAX], entries[MEAN], points)
+        return k * decimation, mins, maxs, means
+
+
+class SeriesHistory:
+    """
+    La misma interfaz sobre una serie ya completa (el visor de repeticiones): `end`
+    marca la última muestra visible y cada muestra representa `stride` ticks.
+    """
+    def __init__(self, values, stride=1):
+        self.values = np.asarray(values, dtype=np.float32)
+        self.stride = max(1, stride)
+        self.end = len(self.values)
+
+    def __len__(self):
+        return self.end
+
+    def clear(self):
+        self.end = 0
+
+    def window(self, span=None, points=280):
+        n = self.end if span is None else min(self.end, -(-span // self.stride))
+        rows = self.values[self.end - n:self.end]
+        mins, maxs, means = reduce_columns(rows, rows, rows, points)
+        return n * self.stride, mins, maxs, means
@@ -0,0 +1,130 @@
+"""
+Tabla de interacciones entre especies y pasada de vecindad fusionada.
+
+Cada fila de INTERACTIONS dice quién come, huye o se aparea con quién y a qué
+radio (múltiplos del radio de visión). Las filas de un actor, en el orden de la
+tabla, son los argumentos de su update: Rabbit.update(comida, zorros, conejos) y
+Fox.update(conejos, zorros). El tipo decide además qué hace la simulación con cada
+par al final del tick: las filas EATS son las pasadas de handle_feeding (en
+feeding_order) y las MATES las de handle_reproduction.
+
+InteractionPass calcula todos los objetivos del tick de una vez sobre un único
+índice espacial (spatial.CellIndex) con las posiciones de todas las especies que
+son objetivo de alguna fila, ordenadas juntas una sola vez. Cada fila consulta ese
+índice solo en su especie objetivo y solo en las celdas que cubre su radio, así que
+añadir una especie añade filas a la tabla y puntos al índice, no otra rejilla ni
+un recorrido O(N·M) por pareja.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from spatial import CellIndex
+
+EATS, FLEES, MATES = "eats", "flees", "mates"
+
+
+class Interaction(NamedTuple):
+    actor: str
+    target: str
+    kind: str
+    scale: float  # Radio en múltiplos del radio de visión
+
+
+INTERACTIONS = (
+    Interaction("rabbit", "food", EATS, 1.0),  # Rabbit.seek_food
+    Interaction("rabbit", "fox", FLEES, 1.5),  # Rabbit.avoid_danger
+    Interaction("rabbit", "rabbit", MATES, 1.0),  # Rabbit.seek_mate
+    Interaction("fox", "rabbit", EATS, 1.0),  # Fox.hunt / hunt_weak_prey
+    Interaction("fox", "fox", MATES, 1.0),  # Fox.seek_mate
+)
+
+
+def vision_radius(params):
+    # seek_food/avoid_danger usan SimulationParams.vision_radius y seek_mate/hunt self.params
+    return max(params.vision_radius, type(params).vision_radius)
+
+
+def queries_for(actor, params, table=INTERACTIONS):
+    """(especie objetivo, radio) de cada fila del actor, en el orden de la tabla"""
+    vision = vision_radius(params)
+    return tuple((row.target, vision * row.scale) for row in table if row.actor == actor)
+
+
+def rows(kind, table=INTERACTIONS):
+    """Filas de un tipo, en el orden de la tabla"""
+    return tuple(row for row in table if row.kind == kind)
+
+
+def feeding_order(table=INTERACTIONS):
+    """Filas EATS con cada depredador antes que sus presas: un animal cazado en el tick ya no come"""
+    eats = rows(EATS, table)
+
+    def depth(species, seen=()):
+        # Eslabones de la cadena trófica por encima de la especie
+        eaters = [row.actor for row in eats if row.target == species and row.actor not in seen]
+        return max((depth(eater, seen + (species,)) + 1 for eater in eaters), default=0)
+
+    return tuple(sorted(eats, key=lambda row: depth(row.actor)))
+
+
+def centres(entities):
+    n = len(entities)
+    xs = np.fromiter((e.rect.centerx for e in entities), np.int64, n)
+    ys = np.fromiter((e.rect.centery for e in entities), np.int64, n)
+    return xs, ys
+
+
+def _stack(blocks, cache):
+    """Posiciones de varias listas en bloques consecutivos: (xs, ys, especie de cada fila, inicio de cada bloque)"""
+    sizes = [len(block) for block in blocks]
+    points = []
+    for block in blocks:
+        # Una misma lista puede ser actor y objetivo: sus posiciones se leen una vez
+        if id(block) not in cache:
+            cache[id(block)] = centres(block)
+        points.append(cache[id(block)])
+    xs = np.concatenate([x for x, _ in points])
+    ys = np.concatenate([y for _, y in points])
+    return xs, ys, np.repeat(np.arange(len(blocks)), sizes), np.cumsum([0] + sizes)
+
+
+class InteractionPass:
+    def __init__(self, params, table=INTERACTIONS):
+        self.params = params
+        self.table = table
+        self.actors = tuple(dict.fromkeys(row.actor for row in table))
+        self.targets = tuple(dict.fromkeys(row.target for row in table))
+
+    def run(self, actors, targets):
+        """
+        `actors` y `targets`: {especie: lista de entidades}. Devuelve {especie del actor:
+        lista con, para cada actor, la tupla de listas de objetivos de sus filas}, cada
+        lista en el orden de `targets[especie]`.
+        """
+        vision = vision_radius(self.params)
+        actor_lists = [actors[name] for name in self.actors]
+        target_lists = [targets[name] for name in self.targets]
+        cache = {}
+        qx, qy, _, actor_starts = _stack(actor_lists, cache)
+        tx, ty, target_species, target_starts = _stack(target_lists, cache)
+        # Índice compartido: celdas del menor radio; las filas de radio mayor miran más celdas
+        index = CellIndex(tx, ty, target_species, vision * min(row.scale for row in self.table))
+
+        results = {}
+        for a, name in enumerate(self.actors):
+            n = len(actor_lists[a])
+            start = actor_starts[a]
+            columns = []
+            for row in self.table:
+                if row.actor != name:
+                    continue
+                t = self.targets.index(row.target)
+                qi, tj, _ = index.pairs(qx[start:start + n], qy[start:start + n], t, vision * row.scale)
+                order = np.lexsort((tj, qi))
+                bounds = np.searchsorted(qi[order], np.arange(n + 1)).tolist()
+                found = (tj[order] - target_starts[t]).tolist()
+                block = target_lists[t]
+                columns.append([[block[j] for j in found[bounds[i]:bounds[i + 1]]] for i in range(n)])
+            results[name] = list(zip(*columns))
+        return results
@@ -0,0 +1,511 @@
+import math
+import multiprocessing as mp
+import os
+import random
+
+import pygame
+
+from events import BIRTH, DemographicEvents
+from interactions import MATES, feeding_order, rows
+from random_generator import MiddleSquare
+from simulation import MATING_RULES, Simulation, SimulationParams, Rabbit, Food, Gender
+from spatial import resolve_contacts
+
+# Atributos que viajan con un animal cuando cambia de tesela
+ANIMAL_FIELDS = ('age', 'energy', 'health', 'sick', 'time_since_food',
+                 'change_dir_timer', 'fear', 'reproduction_cooldown')
+
+
+def tile_grid(workers):
+    """Divide el número de procesos en una rejilla columnas x filas lo más cuadrada posible"""
+    rows = int(math.sqrt(workers))
+    while workers % rows:
+        rows -= 1
+    return workers // rows, rows
+
+
+def tile_bounds(index, cols, rows, world_width, world_height):
+    """Rectángulo (en coordenadas de mundo) que posee la tesela `index`"""
+    col, row = index % cols, index // cols
+    left = world_width * col // cols
+    top = world_height * row // rows
+    right = world_width * (col + 1) // cols
+    bottom = world_height * (row + 1) // rows
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+def tile_of(x, y, cols, rows, world_width, world_height):
+    """Índice de la tesela dueña de un punto (los puntos fuera del mundo se asignan al borde)"""
+    col = min(cols - 1, max(0, int(x * cols // world_width)))
+    row = min(rows - 1, max(0, int(y * rows // world_height)))
+    return row * cols + col
+
+
+class Ghost:
+    """
+    Copia de solo lectura de una entidad de otra tesela (región halo).
+    Expone los atributos que leen los comportamientos y la alimentación.
+    """
+    def __init__(self, state):
+        self.kind = state['kind']
+        self.uid = state['uid']
+        self.tile = state['tile']
+        self.rect = pygame.Rect(state['rect'])
+        if self.kind == 'food':
+            self.nutrition = state['nutrition']
+        else:
+            self.gender = Gender(state['gender'])
+            self.age = state['age']
+            self.maturity_age = state['maturity_age']
+            self.health = state['health']
+            self.energy = state['energy']
+            self.reproduction_cooldown = state['reproduction_cooldown']
+
+    def alive(self):
+        return True
+
+
+class CombinedView:
+    """Iterable que recorre un grupo de sprites propio seguido de los fantasmas del halo"""
+    def __init__(self, group, ghosts):
+        self.group = group
+        self.ghosts = ghosts
+
+    def __iter__(self):
+        yield from self.group
+        yield from self.ghosts
+
+
+class TileWorker:
+    """
+    Parte del mundo simulada por un proceso. Posee las entidades cuyo centro cae
+    dentro de su rectángulo y ve como fantasmas las de las teselas vecinas que
+    están a menos de `halo` píxeles de su borde.
+    """
+    def __init__(self, index, cols, rows, params, seed):
+        # La tesela recorre sus propias vistas (grupo + fantasmas) en update_phase
+        local_params = dict(params, initial_rabbits=0, initial_foxes=0, initial_food=0,
+                            neighbour_lists=False)
+        self.sim = Simulation(local_params, headless=True, seed=seed)
+        self.index = index
+        self.cols, self.rows = cols, rows
+        self.n_tiles = cols * rows
+        # Los animales de la referencia comparten una sola lista de LCG: al agotarse pasan
+        # al respaldo de random. Cada tesela gasta su parte para que se agote a la vez
+        rng = self.sim.rng
+        budget = rng.count // self.n_tiles
+        for values in (rng.xi_list, rng.ri_list, rng.ni_list):
+            del values[:len(values) - budget]
+        world_width, world_height = self.sim.params.world_width, self.sim.params.world_height
+        self.world_size = (world_width, world_height)
+        self.bounds = tile_bounds(index, cols, rows, world_width, world_height)
+        self.area_fraction = (self.bounds.width * self.bounds.height) / (world_width * world_height)
+        # Los conejos huyen de zorros hasta 1.5 veces el radio de visión (Rabbit.avoid_danger)
+        self.halo = int(self.sim.params.vision_radius * 1.5) + 1
+        self.neighbours = []
+        for other in range(self.n_tiles):
+            if other == index:
+                continue
+            other_rect = tile_bounds(other, cols, rows, world_width, world_height)
+            inflated = other_rect.inflate(2 * self.halo, 2 * self.halo)
+            if inflated.colliderect(self.bounds):
+                self.neighbours.append((other, inflated))
+        # Identificadores únicos sin coordinación entre procesos: index, index + n_tiles, ...
+        self.sim.registry.next_uid = index
+        self.sim.registry.uid_step = self.n_tiles
+        self.ghosts = {'rabbit': [], 'fox': [], 'food': []}
+        self.litters = []  # (especie, centro de la pareja, tamaño) pendientes de la fase 3
+
+    def owner(self, x, y):
+        return tile_of(x, y, self.cols, self.rows, *self.world_size)
+
+    def _pack(self, entity):
+        if isinstance(entity, Food):
+            return {'kind': 'food', 'uid': entity.uid, 'tile': self.index,
+                    'rect': tuple(entity.rect), 'nutrition': entity.nutrition, 'size': entity.size,
+                    'color': entity.color, 'age': entity.age, 'lifespan': entity.lifespan}
+        state = {'kind': 'rabbit' if isinstance(entity, Rabbit) else 'fox', 'uid': entity.uid,
+                 'tile': self.index, 'rect': tuple(entity.rect), 'gender': entity.gender.value,
+                 'maturity_age': entity.maturity_age, 'direction': tuple(entity.direction)}
+        for field in ANIMAL_FIELDS:
+            state[field] = getattr(entity, field)
+        return state
+
+    def _unpack(self, state):
+        """Recrea como propia una entidad que migró desde otra tesela"""
+        center = pygame.Rect(state['rect']).center
+        if state['kind'] == 'food':
+            # Conserva tamaño, nutrición y color en lugar de los que sortea Food
+            food = self.sim.add_food(*center, uid=state['uid'])
+            food.size, food.nutrition, food.color = state['size'], state['nutrition'], tuple(state['color'])
+            food.image = Food.image_for(food.size, food.color)
+            food.rect = food.image.get_rect(center=center)
+            food.age, food.lifespan = state['age'], state['lifespan']
+            return
+        add = self.sim.add_rabbit if state['kind'] == 'rabbit' else self.sim.add_fox
+        animal = add(center[0], center[1], Gender(state['gender']), uid=state['uid'])
+        animal.direction = list(state['direction'])
+        for field in ANIMAL_FIELDS:
+            setattr(animal, field, state[field])
+        animal.rect.center = center
+
+    def spawn(self, kind, x, y, gender=None):
+        if kind == 'food':
+            self.sim.add_food(x, y)
+        elif kind == 'rabbit':
+            self.sim.add_rabbit(x, y, Gender(gender))
+        else:
+            self.sim.add_fox(x, y, Gender(gender))
+
+    def _halo(self, groups, skip=None):
+        """
+        Mensajes con las entidades propias visibles desde cada tesela vecina. `skip`:
+        uid -> tesela a la que no hace falta enviarla (la que la recibe como migrante).
+        """
+        outbox = {}
+        for group in groups:
+            for entity in group:
+                center = entity.rect.center
+                new_owner = skip.get(entity.uid) if skip else None
+                for other, inflated in self.neighbours:
+                    if other != new_owner and inflated.collidepoint(center):
+                        outbox.setdefault(other, []).append(('halo', self._pack(entity)))
+        return outbox
+
+    def _receive(self, inbox):
+        """Aplica migraciones y créditos, y guarda los fantasmas recibidos"""
+        self.ghosts = {'rabbit': [], 'fox': [], 'food': []}
+        for kind, data in inbox:
+            if kind == 'halo':
+                self.ghosts[data['kind']].append(Ghost(data))
+            elif kind == 'migrant':
+                self._unpack(data)
+            elif kind == 'spawn':
+                self.spawn(*data)
+            else:
+                uid, amount, cooldown = data
+                animal = self.sim.rabbits.get(uid) or self.sim.foxes.get(uid)
+                if animal is None:
+                    continue
+                if kind == 'fed':
+                    animal.energy = min(100, animal.energy + amount)
+                    animal.time_since_food = 0
+                else:  # 'mated'
+                    animal.energy -= amount
+                    animal.reproduction_cooldown = cooldown
+        for ghosts in self.ghosts.values():
+            ghosts.sort(key=lambda g: g.uid)
+
+    def counts(self, in_transit=(0, 0, 0)):
+        """Población de la tesela, contando las entidades que acaba de enviar a otra"""
+        sim = self.sim
+        return (len(sim.rabbits) + in_transit[0], len(sim.foxes) + in_transit[1],
+                len(sim.foods) + in_transit[2])
+
+    def update_phase(self, inbox):
+        """Fase 1: movimiento y comportamiento con el halo del tick anterior"""
+        self._receive(inbox)
+        sim = self.sim
+        sim.events.tick = sim.tick + 1
+        sim.update_day_night_cycle()
+        sim.update_season()
+
+        foods_view = CombinedView(sim.foods, self.ghosts['food'])
+        foxes_view = CombinedView(sim.foxes, self.ghosts['fox'])
+        rabbits_view = CombinedView(sim.rabbits, self.ghosts['rabbit'])
+        for rabbit in sim.rabbits:
+            rabbit.update(foods_view, foxes_view, rabbits_view)
+
+        rabbits_view = CombinedView(sim.rabbits, self.ghosts['rabbit'])
+        for fox in sim.foxes:
+            fox.update(rabbits_view, foxes_view)
+
+        # Halo intermedio: posiciones ya movidas, necesarias para comer y emparejarse
+        return {'outbox': self._halo((sim.rabbits, sim.foxes)), 'counts': self.counts()}
+
+    def interact_phase(self, inbox):
+        """
+        Fase 2: parejas entre teselas y alimentación. Los créditos para los animales
+        de otras teselas (comida, pareja) se aplican al empezar la fase 3, antes de
+        que su tesela decida su propia reproducción.
+        """
+        self._receive(inbox)
+        sim = self.sim
+        outbox = {}
+
+        def send(tile, message):
+            outbox.setdefault(tile, []).append(message)
+
+        # Antes de comer: todas las teselas deciden con el mismo estado (el del halo)
+        self._pair_across_border(send)
+        sim.foods.update()
+        self._feed(send)
+        return {'outbox': outbox, 'counts': self.counts()}
+
+    def settle_phase(self, inbox, rabbit_quota, fox_quota):
+        """Fase 3: créditos, reproducción, comida nueva y migraciones"""
+        self._receive(inbox)
+        sim = self.sim
+        outbox = {}
+
+        # La capacidad global restante se reparte entre teselas para no superar el máximo
+        max_rabbits, max_foxes = sim.params.max_rabbits, sim.params.max_foxes
+        sim.params.max_rabbits = len(sim.rabbits) + rabbit_quota
+        sim.params.max_foxes = len(sim.foxes) + fox_quota
+        self._bear_litters()
+        sim.handle_reproduction()
+        sim.params.max_rabbits, sim.params.max_foxes = max_rabbits, max_foxes
+
+        self._spawn_food()
+
+        # Las entidades que salieron de la tesela pasan a la que ahora las posee (la
+        # asignación de tile_of, que también reparte las que están fuera del mundo)
+        migrants = {}
+        for group in (sim.rabbits, sim.foxes, sim.foods):
+            for entity in group.view():
+                owner = self.owner(*entity.rect.center)
+                if owner != self.index:
+                    migrants[entity.uid] = owner
+        groups = (sim.rabbits, sim.foxes, sim.foods)
+        # Los vecinos ven también a los migrantes, salvo la tesela que los recibe
+        outbox.update(self._halo(groups, migrants))
+        in_transit = [0, 0, 0]
+        for i, group in enumerate(groups):
+            for entity in group:
+                owner = migrants.get(entity.uid)
+                if owner is not None:
+                    outbox.setdefault(owner, []).append(('migrant', self._pack(entity)))
+                    entity.kill()
+                    in_transit[i] += 1
+        sim.tick += 1
+        sim.events.tick = sim.tick
+        return {'outbox': outbox, 'counts': self.counts(in_transit), 'events': sim.events.counts}
+
+    def _feed(self, send):
+        """
+        Las filas EATS de la tabla, como Simulation.handle_feeding. Cada presa la
+        resuelve la tesela que la posee con spatial.resolve_contacts: de los
+        cazadores que la tocan, propios o fantasmas, gana el de centro más cercano.
+        """
+        sim = self.sim
+        for row in feeding_order():
+            hunters = list(sim.group(row.actor)) + self.ghosts[row.actor]
+            for hunter, prey in resolve_contacts(hunters, sim.group(row.target)):
+                prey.eaten()
+                if isinstance(hunter, Ghost):
+                    send(hunter.tile, ('fed', (hunter.uid, prey.nutrition, 0)))
+                else:
+                    hunter.energy = min(100, hunter.energy + prey.nutrition)
+                    hunter.time_since_food = 0
+
+    def _pair_across_border(self, send):
+        """
+        Parejas de un animal propio con un fantasma. Cada pareja la decide una sola
+        tesela: la de menor índice entre las de los dos animales y las de todos sus
+        candidatos. Todas calculan esa regla con el mismo estado (el del halo), así que
+        ningún animal se empareja en dos teselas a la vez. La camada nace en la fase 3
+        y la pareja recibe su crédito antes de que su tesela se reproduzca.
+        """
+        sim = self.sim
+        params = sim.params
+        distance_sq = params.reproduce_distance ** 2
+        for row in rows(MATES):
+            kind = row.actor
+            min_energy, cost, cooldown, prob_field, litter_field, _ = MATING_RULES[kind]
+            prob, litter = getattr(params, prob_field), getattr(params, litter_field)
+            group = sim.group(kind)
+            ghosts = self.ghosts[kind]
+            if not ghosts:
+                continue
+
+            def eligible(animal):
+                return (animal.age >= animal.maturity_age and animal.reproduction_cooldown == 0 and
+                        animal.energy >= min_energy)
+
+            candidates = [a for a in list(group) + ghosts if eligible(a)]
+
+            def partners(animal):
+                return [other for other in candidates
+                        if other.gender != animal.gender and
+                        (animal.rect.centerx - other.rect.centerx) ** 2 +
+                        (animal.rect.centery - other.rect.centery) ** 2 < distance_sq]
+
+            def tile(animal):
+                return animal.tile if isinstance(animal, Ghost) else self.index
+
+            paired = set()
+            for animal in group.view():
+                if not eligible(animal):
+                    continue
+                mates = [m for m in partners(animal) if isinstance(m, Ghost) and m.uid not in paired]
+                for mate in mates:
+                    involved = partners(animal) + partners(mate)
+                    if min(map(tile, involved)) != self.index:
+                        continue
+                    if random.random() < prob:
+                        center = ((animal.rect.centerx + mate.rect.centerx) // 2,
+                                  (animal.rect.centery + mate.rect.centery) // 2)
+                        self.litters.append((kind, center, random.randint(*litter)))
+                        animal.reproduction_cooldown = cooldown
+                        animal.energy -= cost
+                        paired.add(mate.uid)
+                        send(mate.tile, ('mated', (mate.uid, cost, cooldown)))
+                        break
+
+    def _bear_litters(self):
+        """Camadas de las parejas entre teselas decididas en la fase 2"""
+        sim = self.sim
+        for kind, (x, y), size in self.litters:
+            group, max_pop = sim.group(kind), getattr(sim.params, MATING_RULES[kind][5])
+            add = sim.add_rabbit if kind == 'rabbit' else sim.add_fox
+            for _ in range(size):
+                if len(group) < max_pop:
+                    child = add(x + random.randint(-10, 10), y + random.randint(-10, 10),
+                                random.choice(list(Gender)))
+                    sim.events.record(BIRTH, child.species, child)
+        self.litters = []
+
+    def _spawn_food(self):
+        """Equivalente local de Simulation.spawn_food, escalado por el área de la tesela"""
+        sim = self.sim
+        if random.random() < sim.params.food_respawn_rate / 100 * self.area_fraction:
+            bounds = self.bounds
+            world_width, world_height = self.world_size
+            if sim.season.name in ('SPRING', 'SUMMER') and random.random() < 0.3:
+                cluster_size = random.randint(3, 10)
+                center_x = random.randint(bounds.left, bounds.right - 1)
+                center_y = random.randint(bounds.top, bounds.bottom - 1)
+                for _ in range(cluster_size):
+                    x = center_x + random.randint(-40, 40)
+                    y = center_y + random.randint(-40, 40)
+                    if 0 <= x <= world_width and 0 <= y <= world_height:
+                        sim.add_food(x, y)
+            else:
+                sim.add_food(random.randint(bounds.left, bounds.right - 1),
+                             random.randint(bounds.top, bounds.bottom - 1))
+
+
+def _worker_main(conn, index, cols, rows, params, seed):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    worker = TileWorker(index, cols, rows, params, seed)
+    while True:
+        command, *args = conn.recv()
+        if command == 'update':
+            conn.send(worker.update_phase(*args))
+        elif command == 'interact':
+            conn.send(worker.interact_phase(*args))
+        elif command == 'settle':
+            conn.send(worker.settle_phase(*args))
+        elif command == 'stop':
+            conn.close()
+            break
+
+
+class ParallelSimulation:
+    """
+    Simulación headless repartida en teselas, cada una en su propio proceso.
+    Cada tick tiene tres fases (movimiento; parejas entre teselas y alimentación;
+    reproducción y migraciones); entre ellas el proceso principal reparte los
+    mensajes de halo, migración y créditos entre teselas.
+    """
+    def __init__(self, initial_params=None, workers=None, seed=0):
+        self.params = dict(initial_params or {})
+        self.sim_params = SimulationParams.from_dict(self.params)
+        self.workers = workers or os.cpu_count() or 1
+        self.cols, self.rows = tile_grid(self.workers)
+        self.history = []
+        self.events = DemographicEvents()  # Suma de los contadores de todas las teselas
+
+        self.connections = []
+        self.processes = []
+        for index in range(self.workers):
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_worker_main,
+                                 args=(child_conn, index, self.cols, self.rows, self.params, seed * 1009 + index),
+                                 daemon=True)
+            process.start()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+        self.inboxes = [[] for _ in range(self.workers)]
+        self._seed_population(random.Random(seed))
+
+    def _seed_population(self, rng):
+        """
+        Población inicial generada en el proceso principal y repartida por posición.
+        La comida sale del MiddleSquare, como en Simulation.spawn_foods: su cola se
+        repite y apila comida en pocos puntos, y eso cambia cuánto se come.
+        """
+        p = self.sim_params
+        world = (p.world_width, p.world_height)
+        food_values = MiddleSquare(number=p.middle_square_seed, digits=8, count=10000).pop_many(2 * p.initial_food)
+        for kind, count in (('rabbit', p.initial_rabbits), ('fox', p.initial_foxes), ('food', p.initial_food)):
+            for i in range(count):
+                x, y = rng.randint(0, world[0]), rng.randint(0, world[1])
+                if kind == 'food' and 2 * i + 1 < len(food_values):
+                    x, y = int(food_values[2 * i] * world[0]), int(food_values[2 * i + 1] * world[1])
+                gender = rng.choice(list(Gender)).value
+                tile = tile_of(x, y, self.cols, self.rows, *world)
+                self.inboxes[tile].append(('spawn', (kind, x, y, gender)))
+
+    def _exchange(self, commands):
+        """Envía a cada tesela su orden con su bandeja de entrada y reparte las respuestas"""
+        for conn, inbox, (command, *extra) in zip(self.connections, self.inboxes, commands):
+            conn.send((command, inbox, *extra))
+        results = [conn.recv() for conn in self.connections]
+        if 'events' in results[0]:
+            self.events.counts = [[sum(column) for column in zip(*rows)]
+                                  for rows in zip(*(result['events'] for result in results))]
+        self.inboxes = [[] for _ in range(self.workers)]
+        for result in results:
+            for tile, messages in sorted(result['outbox'].items()):
+                self.inboxes[tile].extend(messages)
+        return [result['counts'] for result in results]
+
+    def step(self):
+        self._exchange([('update',)] * self.workers)
+        counts = self._exchange([('interact',)] * self.workers)
+        rabbit_quotas = self._split(self.sim_params.max_rabbits - sum(c[0] for c in counts))
+        fox_quotas = self._split(self.sim_params.max_foxes - sum(c[1] for c in counts))
+        counts = self._exchange([('settle', rq, fq) for rq, fq in zip(rabbit_quotas, fox_quotas)])
+        totals = tuple(sum(c[i] for c in counts) for i in range(3))
+        self.history.append(totals)
+        return totals
+
+    def _split(self, headroom):
+        """Reparte la capacidad restante entre teselas de forma determinista"""
+        headroom = max(0, headroom)
+        share, remainder = divmod(headroom, self.workers)
+        return [share + (1 if i < remainder else 0) for i in range(self.workers)]
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.step()
+        return self.history
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(('stop',))
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    params = {"world_width": 4000, "world_height": 4000, "initial_rabbits": 600,
+              "initial_foxes": 60, "initial_food": 1500, "max_rabbits": 3000, "max_foxes": 400}
+    start = time.perf_counter()
+    with ParallelSimulation(params, workers=workers, seed=1) as parallel_sim:
+        history = parallel_sim.run(ticks)
+    elapsed = time.perf_counter() - start
+    print(f"{workers} procesos: {ticks / elapsed:.1f} ticks/s, población final {history[-1]}")
@@ -1,6 +1,25 @@
 import math
 import statistics as st
-from scipy.stats import chi2
+
+# Valores críticos de Chi-Cuadrado con 95% de confianza para 1..30 grados de libertad
+CHI2_CRITICAL_95 = (
+    3.841459, 5.991465, 7.814728, 9.487729, 11.070498, 12.591587, 14.067140, 15.507313,
+    16.918978, 18.307038, 19.675138, 21.026070, 22.362032, 23.684791, 24.995790, 26.296228,
+    27.587112, 28.869299, 30.143527, 31.410433, 32.670573, 33.924438, 35.172462, 36.415029,
+    37.652484, 38.885139, 40.113272, 41.337138, 42.556968, 43.772972,
+)
+
+
+def chi2_critical(df, confidence=0.95):
+    """
+    Valor crítico de Chi-Cuadrado sin depender de scipy: tabla exacta para pocos
+    grados de libertad y aproximación de Wilson-Hilferty (error < 0.1%) para el resto.
+    """
+    if confidence == 0.95 and 1 <= df <= len(CHI2_CRITICAL_95):
+        return CHI2_CRITICAL_95[df - 1]
+    z = st.NormalDist().inv_cdf(confidence)
+    k = 2 / (9 * df)
+    return df * (1 - k + z * math.sqrt(k)) ** 3
 
 class ChiSquare:
     """
@@ -15,7 +34,7 @@ class ChiSquare:
                            self.intervals_number
         self.intervals = {}
         self.squ_chi = 0
-        self.squ_chi_critic = chi2.ppf(0.95, self.intervals_number - 1)
+        self.squ_chi_critic = chi2_critical(self.intervals_number - 1)
 
     def create_intervals(self):
         """Crea los intervalos de frecuencia esperada para la prueba."""
@@ -112,6 +131,33 @@ class KS:
             print(f"Intervalo {interval}: {frequency}")
 
 
+def run_uniformity_tests(number_list):
+    """
+    Ejecuta Chi-Cuadrado y KS sobre la lista y devuelve un resumen serializable
+    (pensado para ejecutarse en otro proceso).
+    """
+    chi = ChiSquare(number_list)
+    chi.create_intervals()
+    chi.calculate_frequence()
+    chi.calculate_squ_chi()
+
+    ks = KS(number_list)
+    ks.create_intervals()
+    ks.calculate_frequence_obtained()
+    ks.calculate_frequence_obtained_acumulated()
+    ks.calculate_dm()
+
+    return {
+        "size": len(number_list),
+        "chi": chi.squ_chi,
+        "chi_critic": chi.squ_chi_critic,
+        "chi_passed": chi.squ_chi < chi.squ_chi_critic,
+        "ks": ks.dm_calculated,
+        "ks_critic": ks.dm_critic,
+        "ks_passed": ks.dm_calculated < ks.dm_critic,
+    }
+
+
 """
 if __name__ == "__main__":
     alg = random_number.LCG(5, 7, 991, 3, 4, 19)
@@ -0,0 +1,84 @@
+"""
+Gobernador de calidad para el modo con ventana: mide el tiempo de cada frame
+(fases de la simulación + dibujado) y baja o sube un nivel de calidad para
+mantenerse dentro del presupuesto de milisegundos por frame.
+
+Cada Simulation tiene su propio gobernador y el nivel solo cambia cómo se dibuja:
+las imágenes rotadas se eligen al dibujar y el rect de los animales sale siempre
+de la imagen sin rotar, así que la ecología no depende del tiempo de frame.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    rotation_step: object  # 0 = ángulo exacto, N = grados redondeados a múltiplos de N, None = sin rotar
+    gradient_band: int  # Alto en píxeles de cada franja del fondo (0 = color plano)
+    graph_interval: int  # Frames entre redibujos del gráfico de población
+    text_interval: int  # Frames entre renders del texto del panel
+    full_text: bool  # Panel completo o solo poblaciones y calidad
+    food_sprites: bool  # Comida con su imagen o como rectángulos de color
+
+
+LEVELS = (
+    QualityLevel("máxima", 0, 1, 1, 1, True, True),
+    QualityLevel("alta", 0, 8, 5, 5, True, True),
+    QualityLevel("media", 15, 20, 15, 10, True, False),
+    QualityLevel("baja", 45, 0, 30, 20, False, False),
+    QualityLevel("mínima", None, 0, 60, 30, False, False),
+)
+
+
+class QualityGovernor:
+    """
+    Media móvil exponencial del tiempo de frame (y de cada fase). Si supera el objetivo
+    durante `down_after` frames seguidos se baja un nivel; si queda por debajo de
+    `headroom` * objetivo durante `up_after` frames se sube uno. La asimetría evita
+    que el nivel oscile.
+    """
+    def __init__(self, target_ms, levels=LEVELS, smoothing=0.1, down_after=15, up_after=180, headroom=0.6):
+        self.target_ms = target_ms
+        self.levels = levels
+        self.smoothing = smoothing
+        self.down_after = down_after
+        self.up_after = up_after
+        self.headroom = headroom
+        self.index = 0
+        self.frame_ms = 0.0
+        self.phase_ms = {}
+        self._over = 0
+        self._under = 0
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def record(self, phase_times):
+        """Registra los tiempos de un frame; devuelve True si cambió el nivel"""
+        alpha = self.smoothing
+        for name, ms in phase_times.items():
+            self.phase_ms[name] = self.phase_ms.get(name, ms) * (1 - alpha) + ms * alpha
+        total = sum(phase_times.values())
+        self.frame_ms = total if not self.frame_ms else self.frame_ms * (1 - alpha) + total * alpha
+
+        if self.frame_ms > self.target_ms:
+            self._over, self._under = self._over + 1, 0
+        elif self.frame_ms < self.target_ms * self.headroom:
+            self._over, self._under = 0, self._under + 1
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.index < len(self.levels) - 1:
+            self.index += 1
+        elif self._under >= self.up_after and self.index > 0:
+            self.index -= 1
+        else:
+            return False
+        self._over = self._under = 0
+        return True
+
+    def status(self):
+        """Texto para el panel de estadísticas"""
+        return (f"Calidad: {self.level.name} ({self.index}/{len(self.levels) - 1}) "
+                f"{self.frame_ms:.1f}/{self.target_ms:.1f} ms")
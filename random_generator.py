@@ -1,8 +1,11 @@
+import math
+
+
 class LCG:
     """
     Generador Congruencial Lineal (LCG) para generar números pseudoaleatorios.
     """
-    def __init__(self, a, x0, m, c, min_val, max_val):
+    def __init__(self, a, x0, m, c, min_val, max_val, count=10000):
         self.a = a
         self.x0 = x0
         self.m = m
@@ -12,7 +15,8 @@ class LCG:
         self.xi_list = []
         self.ri_list = []
         self.ni_list = []
-        self.calculate_seed(10000)
+        self.count = count
+        self.calculate_seed(count)
 
     def calculate_seed(self, i):
         for _ in range(i):
@@ -29,6 +33,57 @@ class LCG:
         ni = self.min + ((self.max - self.min) * ri)
         self.ni_list.append(ni)
 
+    @staticmethod
+    def affine_power(a, c, m, k):
+        """
+        Coeficientes (A, C) de k pasos del LCG: x_(n+k) = (A * x_n + C) mod m.
+        Compone la función afín x -> a*x + c consigo misma por cuadrados sucesivos: O(log k).
+        """
+        result_a, result_c = 1, 0
+        step_a, step_c = a % m, c % m
+        while k > 0:
+            if k & 1:
+                # Aplicar `step` después de `result`
+                result_a, result_c = (step_a * result_a) % m, (step_a * result_c + step_c) % m
+            # step = step o step
+            step_a, step_c = (step_a * step_a) % m, (step_a * step_c + step_c) % m
+            k >>= 1
+        return result_a, result_c
+
+    @property
+    def state(self):
+        """Último xi generado (o la semilla si aún no se generó ninguno)"""
+        return self.xi_list[-1] if self.xi_list else self.x0
+
+    def jump(self, k):
+        """
+        Avanza el generador k pasos en O(log k), como si se generaran y descartaran
+        k números. Los números pendientes en las listas se descartan y se generan
+        `count` nuevos desde el estado tras el salto, así pop_last sigue dando números.
+        """
+        mult, inc = self.affine_power(self.a, self.c, self.m, k)
+        self.x0 = (mult * self.state + inc) % self.m
+        self.xi_list, self.ri_list, self.ni_list = [], [], []
+        self.calculate_seed(self.count)
+        return self
+
+    def split(self, n, stride=None, count=10000):
+        """
+        Devuelve n generadores cuyos flujos empiezan separados `stride` pasos
+        (por defecto el periodo repartido en partes iguales), así no se solapan
+        mientras ninguno consuma más de `stride` números.
+        """
+        if stride is None:
+            period = period_analysis(self.a, self.c, self.m, self.state)["period"] or self.m
+            stride = max(1, period // n)
+        mult, inc = self.affine_power(self.a, self.c, self.m, stride)
+        generators = []
+        x = self.state
+        for _ in range(n):
+            generators.append(LCG(self.a, x, self.m, self.c, self.min, self.max, count))
+            x = (mult * x + inc) % self.m
+        return generators
+
     def pop_last(self):
         """
         Elimina y retorna el último número generado (ni), junto con ri y xi.
@@ -40,6 +95,8 @@ class LCG:
         ri = self.ri_list.pop()
         xi = self.xi_list.pop()
         return ni, ri, xi
+
+
 class MiddleSquare:
     """
     Generador de números pseudoaleatorios basado en el método del cuadrado medio.
@@ -75,3 +132,105 @@ class MiddleSquare:
         original = self.list.pop()
         normalized = self.normalized_list.pop()
         return original, normalized
+
+    def pop_many(self, n):
+        """
+        Elimina los últimos n números (o los que queden) de una vez.
+        :return: Lista de valores normalizados en el orden en que los daría pop_last
+        """
+        n = min(n, len(self.list))
+        if n <= 0:
+            return []
+        normalized = self.normalized_list[-n:][::-1]
+        del self.list[-n:]
+        del self.normalized_list[-n:]
+        return normalized
+
+
+def prime_factors(n):
+    """Factores primos distintos de n (división por tentativa)"""
+    factors = []
+    d = 2
+    while d * d <= n:
+        if n % d == 0:
+            factors.append(d)
+            while n % d == 0:
+                n //= d
+        d += 1 if d == 2 else 2
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def carmichael(n):
+    """Función de Carmichael: exponente del grupo multiplicativo módulo n"""
+    result = 1
+    for p in prime_factors(n):
+        k = 0
+        m = n
+        while m % p == 0:
+            m //= p
+            k += 1
+        if p == 2 and k >= 3:
+            value = 2 ** (k - 2)
+        else:
+            value = (p - 1) * p ** (k - 1)
+        result = result * value // math.gcd(result, value)
+    return result
+
+
+def period_analysis(a, c, m, x0=0, brute_force_limit=10 ** 7):
+    """
+    Analiza los parámetros (a, c, m) de un LCG. Comprueba las condiciones de
+    Hull-Dobell para periodo completo y calcula el periodo real desde x0:
+      - si se cumplen, el periodo es m;
+      - si a es invertible módulo m, la función es biyectiva y el periodo es el menor
+        divisor d de m * carmichael(m) con f^d(x0) = x0 (cada prueba cuesta O(log d));
+      - si no, se recorre la secuencia (algoritmo de Brent) cuando m es pequeño.
+    """
+    factors = prime_factors(m)
+    conditions = {
+        "c_coprime_m": math.gcd(c, m) == 1,
+        "a_minus_1_divisible_by_primes_of_m": all((a - 1) % p == 0 for p in factors),
+        "a_minus_1_divisible_by_4_if_4_divides_m": m % 4 != 0 or (a - 1) % 4 == 0,
+    }
+    full_period = all(conditions.values())
+    result = {"a": a, "c": c, "m": m, "x0": x0, "full_period": full_period,
+              "conditions": conditions, "period": None, "tail": None}
+    x0 %= m
+
+    if full_period:
+        result["period"], result["tail"] = m, 0
+    elif math.gcd(a, m) == 1:
+        order = m * carmichael(m)
+        for p in prime_factors(order):
+            while order % p == 0:
+                mult, inc = LCG.affine_power(a, c, m, order // p)
+                if (mult * x0 + inc) % m != x0:
+                    break
+                order //= p
+        result["period"], result["tail"] = order, 0
+    elif m <= brute_force_limit:
+        result["period"], result["tail"] = _brent_cycle(lambda x: (a * x + c) % m, x0)
+    return result
+
+
+def _brent_cycle(f, x0):
+    """Longitud del ciclo y de la cola de la secuencia x0, f(x0), ... (algoritmo de Brent)"""
+    power = period = 1
+    tortoise, hare = x0, f(x0)
+    while tortoise != hare:
+        if power == period:
+            tortoise = hare
+            power *= 2
+            period = 0
+        hare = f(hare)
+        period += 1
+    tortoise = hare = x0
+    for _ in range(period):
+        hare = f(hare)
+    tail = 0
+    while tortoise != hare:
+        tortoise, hare = f(tortoise), f(hare)
+        tail += 1
+    return period, tail
@@ -0,0 +1,118 @@
+"""
+Registro de entidades: un almacén denso por especie en lugar de grupos de sprites solapados.
+
+Cada entidad vive en un solo contenedor, el SpeciesStore de su especie: una lista
+densa (`entities`) y un mapa uid -> posición en esa lista. Quitar una entidad mueve
+la última al hueco (swap-remove), así que `kill()` cuesta O(1) y toca un único
+contenedor, en vez de la especie y además all_sprites.
+
+El registro asigna a cada entidad un `uid` estable al insertarla (el que usan la
+grabación de trayectorias, el registro de eventos y las teselas de parallel.py) y
+se recorre como la antigua all_sprites para dibujar: comida, conejos y zorros.
+
+SpeciesStore cumple la interfaz de grupo de pygame que usa el resto del código
+(iterar, len, add, empty, Sprite.kill/alive). Iterar el almacén recorre una copia,
+como pygame, porque los animales pueden morir durante el recorrido; `view()` da la
+lista densa sin copiar para las consultas que solo leen.
+"""
+from itertools import chain
+
+import pygame
+
+
+class SpeciesStore(pygame.sprite.AbstractGroup):
+    def __init__(self, registry, species):
+        super().__init__()
+        self.registry = registry
+        self.species = species
+        self.entities = []
+        self.slots = {}  # uid -> posición en entities
+        self.moves = 0  # Veces que una entidad cambió de posición (para cachés que dependen del orden)
+
+    def add_internal(self, sprite, layer=None):
+        uid = self.registry.assign(sprite)
+        self.slots[uid] = len(self.entities)
+        self.entities.append(sprite)
+
+    def remove_internal(self, sprite):
+        slot = self.slots.pop(sprite.uid)
+        last = self.entities.pop()
+        if last is not sprite:
+            self.entities[slot] = last
+            self.slots[last.uid] = slot
+            self.moves += 1
+
+    def has_internal(self, sprite):
+        slot = self.slots.get(getattr(sprite, "uid", None))
+        return slot is not None and self.entities[slot] is sprite
+
+    def get(self, uid):
+        """La entidad con ese uid, o None"""
+        slot = self.slots.get(uid)
+        return None if slot is None else self.entities[slot]
+
+    def slot_of(self, sprite):
+        return self.slots[sprite.uid]
+
+    def view(self):
+        """La lista densa, sin copiar: no quitar entidades mientras se recorre"""
+        return self.entities
+
+    def sprites(self):
+        return self.entities.copy()
+
+    def __iter__(self):
+        return iter(self.entities.copy())
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __bool__(self):
+        return bool(self.entities)
+
+    def empty(self):
+        for sprite in self.entities:
+            sprite.remove_internal(self)
+        self.entities = []
+        self.slots = {}
+
+
+class EntityRegistry:
+    """
+    Conejos, zorros y comida (los códigos de especie de trajectory.py). Los uid
+    empiezan en `first_uid` y avanzan de `uid_step` en `uid_step`, así cada tesela
+    de parallel.py numera sin coordinarse con las demás.
+    """
+    def __init__(self, first_uid=0, uid_step=1):
+        self.next_uid = first_uid
+        self.uid_step = uid_step
+        self.rabbits = SpeciesStore(self, 0)
+        self.foxes = SpeciesStore(self, 1)
+        self.foods = SpeciesStore(self, 2)
+        self.stores = (self.rabbits, self.foxes, self.foods)
+
+    def assign(self, entity):
+        """uid de la entidad; se asigna la primera vez (las que migran conservan el suyo)"""
+        uid = getattr(entity, "uid", None)
+        if uid is None:
+            uid = entity.uid = self.next_uid
+            self.next_uid += self.uid_step
+        return uid
+
+    def get(self, uid):
+        for store in self.stores:
+            entity = store.get(uid)
+            if entity is not None:
+                return entity
+        return None
+
+    def __len__(self):
+        return sum(len(store) for store in self.stores)
+
+    def __iter__(self):
+        # Orden de dibujo: la comida debajo de los animales
+        return chain(self.foods.entities, self.rabbits.entities, self.foxes.entities)
+
+    def empty(self):
+        for store in self.stores:
+            store.empty()
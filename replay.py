@@ -0,0 +1,241 @@
+"""
+Visor de repeticiones para trayectorias grabadas con trajectory.py.
+
+Reutiliza el dibujado de Simulation (draw_environment, la cámara con los sprites y
+draw_stats) pero el estado de cada frame se lee del archivo memory-mapped en lugar
+de simularse. Cada muestra del archivo es un estado completo (un keyframe), así que
+ir a cualquier tick es una búsqueda binaria en el índice; reproducir a 1000x cuesta
+lo mismo que a 1x porque solo se dibuja la muestra que toca en cada frame.
+
+    python -m cli replay runs/partida --speed 10
+
+Controles: [ESPACIO] reproducir/pausa, [←/→] muestra anterior/siguiente
+(con Mayús: 100), [↑/↓] velocidad, [RePág/AvPág] saltar 10%, click o arrastre en
+la barra inferior para ir a un tick, rueda para zoom (sobre el gráfico: rango de
+ticks), arrastre con click derecho para mover la cámara, [Inicio] ver todo,
+[S] estadísticas, [ESC] salir.
+"""
+import time
+
+import pygame
+
+from history import SeriesHistory
+from simulation import (FOOD_COLORS, FPS, HEIGHT, WHITE, WIDTH, Fox, Gender, Rabbit, Season,
+                        Simulation, get_font)
+from trajectory import SPECIES_FOOD, SPECIES_FOX, SPECIES_RABBIT, TrajectoryReader
+
+SPEEDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class ReplaySprite:
+    """Lo mínimo que necesita Camera.draw / draw_rects: rect, imagen y color"""
+    __slots__ = ("rect", "image", "color")
+
+    def __init__(self, image, color=None):
+        self.image = image
+        self.rect = image.get_rect()
+        self.color = color
+
+    def rotated_image(self, step=0):
+        # La grabación no guarda la dirección: los animales se dibujan sin rotar
+        return self.image
+
+
+class Replay(Simulation):
+    def __init__(self, path, speed=1):
+        self.reader = TrajectoryReader(path)
+        if not len(self.reader):
+            raise ValueError(f"La grabación {self.reader.path} no tiene muestras")
+        meta = self.reader.meta
+        params = {"initial_rabbits": 0, "initial_foxes": 0, "initial_food": 0, "neighbour_lists": False}
+        if "world_width" in meta:
+            params.update(world_width=meta["world_width"], world_height=meta["world_height"])
+        super().__init__(params)
+        pygame.display.set_caption(f"Repetición - {self.reader.path}")
+
+        self.populations = self.reader.populations()
+        self.history = SeriesHistory(self.populations, self.reader.meta.get("stride", 1))
+        self.events = None  # La grabación no guarda las causas: sin contadores en el panel
+        self.speed_index = min(range(len(SPEEDS)), key=lambda i: abs(SPEEDS[i] - speed))
+        self.playing = True
+        self.position = 0
+        self.play_tick = float(self.reader.ticks[0])
+        self.timeline_rect = pygame.Rect(20, HEIGHT - 36, WIDTH - 40, 14)
+        self._scrubbing = False
+        self._dragging_camera = False
+
+        # Imágenes y sprites reutilizados entre frames
+        self._animal_images = {
+            SPECIES_RABBIT: Rabbit(1, 1, Gender.MALE, self.params).original_image,
+            SPECIES_FOX: Fox(1, 1, Gender.MALE, self.params).original_image,
+        }
+        self._food_images = {}
+        self._pools = {SPECIES_RABBIT: [], SPECIES_FOX: [], SPECIES_FOOD: []}
+        self.load(0)
+
+    @property
+    def speed(self):
+        return SPEEDS[self.speed_index]
+
+    def _food_image(self, size, color):
+        key = (size, color)
+        image = self._food_images.get(key)
+        if image is None:
+            image = self._food_images[key] = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(image, color, (size // 2, size // 2), size // 2)
+        return image
+
+    def _sprites(self, species, rows):
+        """Coloca los sprites del pool en las posiciones de la muestra"""
+        pool = self._pools[species]
+        n = len(rows)
+        while len(pool) < n:
+            image = self._animal_images.get(species) or self._food_image(3, FOOD_COLORS[0])
+            pool.append(ReplaySprite(image, FOOD_COLORS[0]))
+        xs, ys = rows["x"].tolist(), rows["y"].tolist()
+        if species == SPECIES_FOOD:
+            sizes = (rows["energy"] // 2).astype(int).tolist()
+            # El campo de comportamiento de la comida guarda su color (índice en FOOD_COLORS)
+            colors = rows["behaviour"].tolist()
+            for sprite, x, y, size, index in zip(pool, xs, ys, sizes, colors):
+                color = FOOD_COLORS[index % len(FOOD_COLORS)]
+                sprite.image = self._food_image(max(size, 1), color)
+                sprite.color = color
+                sprite.rect = sprite.image.get_rect(center=(x, y))
+        else:
+            for sprite, x, y in zip(pool, xs, ys):
+                sprite.rect.center = (x, y)
+        return pool[:n]
+
+    def load(self, position):
+        """Muestra el estado de la muestra número `position`"""
+        position = max(0, min(position, len(self.reader) - 1))
+        self.position = position
+        entry = self.reader.index[position]
+        rows = self.reader.sample(position)
+        self.tick = int(entry["tick"])
+        season = int(entry["season"])
+        self.season = Season(season) if season in Season._value2member_map_ else Season.SPRING
+        self.day_night_cycle = float(entry["day_night"])
+
+        species = rows["species"]
+        self.rabbits = self._sprites(SPECIES_RABBIT, rows[species == SPECIES_RABBIT])
+        self.foxes = self._sprites(SPECIES_FOX, rows[species == SPECIES_FOX])
+        self.foods = self._sprites(SPECIES_FOOD, rows[species == SPECIES_FOOD])
+        self.all_sprites = self.foods + self.rabbits + self.foxes
+
+        # El gráfico de draw_stats llega hasta la muestra actual
+        self.history.end = position + 1
+
+    def seek(self, tick):
+        self.play_tick = float(tick)
+        self.load(self.reader.position_of(tick))
+
+    def step_samples(self, count):
+        self.load(self.position + count)
+        self.play_tick = float(self.tick)
+
+    def advance(self):
+        """Avanza `speed` ticks por frame (a 1x, un tick por frame como la simulación en vivo)"""
+        last_tick = int(self.reader.ticks[-1])
+        self.play_tick = min(self.play_tick + self.speed, last_tick)
+        position = self.reader.position_of(self.play_tick)
+        if position != self.position:
+            self.load(position)
+        if self.play_tick >= last_tick:
+            self.playing = False
+
+    def _timeline_tick(self, x):
+        first, last = int(self.reader.ticks[0]), int(self.reader.ticks[-1])
+        ratio = min(max((x - self.timeline_rect.x) / self.timeline_rect.width, 0), 1)
+        return first + ratio * (last - first)
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                step = 100 if event.mod & pygame.KMOD_SHIFT else 1
+                jump = max(1, len(self.reader) // 10)
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key == pygame.K_SPACE:
+                    if not self.playing and self.position == len(self.reader) - 1:
+                        self.seek(self.reader.ticks[0])  # Al final, volver a empezar
+                    self.playing = not self.playing
+                elif event.key == pygame.K_RIGHT:
+                    self.step_samples(step)
+                elif event.key == pygame.K_LEFT:
+                    self.step_samples(-step)
+                elif event.key == pygame.K_PAGEDOWN:
+                    self.step_samples(jump)
+                elif event.key == pygame.K_PAGEUP:
+                    self.step_samples(-jump)
+                elif event.key == pygame.K_UP:
+                    self.speed_index = min(self.speed_index + 1, len(SPEEDS) - 1)
+                elif event.key == pygame.K_DOWN:
+                    self.speed_index = max(self.speed_index - 1, 0)
+                elif event.key == pygame.K_s:
+                    self.show_stats = not self.show_stats
+                elif event.key == pygame.K_HOME:
+                    self.camera.fit_world()
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_pos = pygame.mouse.get_pos()
+                if self.show_stats and self.graph_rect.collidepoint(mouse_pos):
+                    self.zoom_graph(event.y)
+                else:
+                    self.camera.zoom_at(1.1 ** event.y, mouse_pos)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1 and self.timeline_rect.inflate(0, 16).collidepoint(event.pos):
+                    self._scrubbing = True
+                    self.seek(self._timeline_tick(event.pos[0]))
+                elif event.button == 3:
+                    self._dragging_camera = True
+            elif event.type == pygame.MOUSEBUTTONUP:
+                self._scrubbing = False
+                self._dragging_camera = False
+            elif event.type == pygame.MOUSEMOTION:
+                if self._scrubbing:
+                    self.seek(self._timeline_tick(event.pos[0]))
+                elif self._dragging_camera:
+                    self.camera.pan(-event.rel[0], -event.rel[1])
+
+    def draw_timeline(self):
+        bar = self.timeline_rect
+        first, last = int(self.reader.ticks[0]), int(self.reader.ticks[-1])
+        ratio = (self.tick - first) / (last - first) if last > first else 1.0
+        background = pygame.Surface((bar.width + 20, bar.height + 30), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 128))
+        self.screen.blit(background, (bar.x - 10, bar.y - 22))
+        pygame.draw.rect(self.screen, (90, 90, 90), bar)
+        pygame.draw.rect(self.screen, (220, 220, 220), (bar.x, bar.y, int(bar.width * ratio), bar.height))
+        marker_x = bar.x + int(bar.width * ratio)
+        pygame.draw.line(self.screen, WHITE, (marker_x, bar.y - 3), (marker_x, bar.bottom + 2), 3)
+        state = "reproduciendo" if self.playing else "pausa"
+        text = (f"Tick {self.tick} / {last}   x{self.speed}   {state}   "
+                f"muestra {self.position + 1}/{len(self.reader)}")
+        self.screen.blit(get_font().render(text, True, WHITE), (bar.x, bar.y - 19))
+
+    def run(self):
+        while self.running:
+            self.handle_events()
+            if self.playing:
+                self.advance()
+
+            render_start = time.perf_counter()
+            self.render()
+            self.draw_timeline()
+            pygame.display.flip()
+            self.phase_times = {'render': (time.perf_counter() - render_start) * 1000}
+            self.frame += 1
+            if self.quality is not None:
+                self.quality.record(self.phase_times)
+            self.clock.tick(FPS)
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+
+    main(["replay", *sys.argv[1:]])
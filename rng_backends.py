@@ -0,0 +1,188 @@
+"""
+Generadores con interfaz común que entregan números por lotes (arreglos de NumPy)
+y que pueden dividirse en subflujos independientes, uno por agente o por tesela.
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from random_generator import LCG
+
+LCG_A = 1664525
+LCG_C = 1013904223
+LCG_M = 2 ** 32
+
+
+def lcg_tables(a, c, m, size):
+    """
+    Tablas A[k] = a^(k+1) mod m y C[k] tales que x_(k+1) = A[k] * x_0 + C[k] (mod m),
+    construidas por duplicación: O(size) operaciones vectorizadas (requiere m <= 2^32).
+    """
+    A = np.array([a % m], dtype=np.uint64)
+    C = np.array([c % m], dtype=np.uint64)
+    m64 = np.uint64(m)
+    while len(A) < size:
+        a_last, c_last = A[-1], C[-1]
+        A_next = (A * a_last) % m64
+        C_next = ((A * c_last) % m64 + C) % m64
+        A = np.concatenate((A, A_next))
+        C = np.concatenate((C, C_next))
+    return A[:size], C[:size]
+
+
+class RNGBackend(ABC):
+    """
+    Interfaz común. `random(size)` devuelve uniformes en [0, 1) con la forma pedida
+    y `spawn(n)` crea n subflujos independientes y reproducibles a partir de la semilla.
+    """
+    name = "base"
+
+    def __init__(self, seed=None):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+
+    @abstractmethod
+    def random(self, size):
+        """Uniformes en [0, 1) con forma `size`"""
+
+    def spawn(self, n):
+        return [type(self)(child) for child in self.seed_sequence.spawn(n)]
+
+    def stream(self, batch=64):
+        """Adaptador con pop_last() para los animales, servido por lotes"""
+        return BatchedStream(self, batch)
+
+
+class LCGBackend(RNGBackend):
+    """El LCG del proyecto (mismos a, c, m que Simulation) generado por bloques vectorizados"""
+    name = "lcg"
+    _tables = {}
+
+    def __init__(self, seed=None, a=LCG_A, c=LCG_C, m=LCG_M, block=4096):
+        super().__init__(seed)
+        self.a, self.c, self.m = a, c, m
+        self.state = int(self.seed_sequence.generate_state(1, np.uint64)[0]) % m
+        self.block = block
+
+    def _block_tables(self):
+        key = (self.a, self.c, self.m, self.block)
+        tables = self._tables.get(key)
+        if tables is None:
+            tables = self._tables[key] = lcg_tables(self.a, self.c, self.m, self.block)
+        return tables
+
+    def raw(self, n):
+        """Los siguientes n estados xi del generador"""
+        A, C = self._block_tables()
+        m64 = np.uint64(self.m)
+        out = np.empty(n, dtype=np.uint64)
+        done = 0
+        while done < n:
+            k = min(self.block, n - done)
+            out[done:done + k] = (A[:k] * np.uint64(self.state) % m64 + C[:k]) % m64
+            self.state = int(out[done + k - 1])
+            done += k
+        return out
+
+    def random(self, size):
+        n = int(np.prod(size))
+        return (self.raw(n) / self.m).reshape(size)
+
+    def spawn(self, n):
+        return [LCGBackend(child, self.a, self.c, self.m, self.block)
+                for child in self.seed_sequence.spawn(n)]
+
+    def split(self, n):
+        """
+        n subflujos que recorren tramos disjuntos del periodo (saltos de m // n pasos
+        con LCG.affine_power), para réplicas o teselas que no deben solaparse.
+        """
+        mult, inc = LCG.affine_power(self.a, self.c, self.m, max(1, self.m // n))
+        children = []
+        state = self.state
+        for child_seed in self.seed_sequence.spawn(n):
+            child = LCGBackend(child_seed, self.a, self.c, self.m, self.block)
+            child.state = state
+            children.append(child)
+            state = (mult * state + inc) % self.m
+        return children
+
+
+class MiddleSquareBackend(RNGBackend):
+    """Cuadrado medio del proyecto; secuencial por naturaleza, pero servido por lotes"""
+    name = "middlesquare"
+
+    def __init__(self, seed=None, digits=8):
+        super().__init__(seed)
+        self.digits = digits
+        self.modulus = 10 ** digits
+        self.shift = 10 ** (digits - digits // 2)
+        # Semilla de `digits` cifras que no empiece por cero
+        low = 10 ** (digits - 1)
+        self.number = low + int(self.seed_sequence.generate_state(1, np.uint64)[0]) % (self.modulus - low)
+
+    def random(self, size):
+        n = int(np.prod(size))
+        values = np.empty(n)
+        number, shift, modulus = self.number, self.shift, self.modulus
+        for i in range(n):
+            number = (number * number // shift) % modulus
+            values[i] = number
+        self.number = number
+        # Misma normalización que MiddleSquare.normalize_list: n / 10**len(str(n))
+        powers = 10.0 ** np.arange(0, 20)
+        digits = np.maximum(np.searchsorted(powers, values, side='right'), 1)
+        return (values / powers[digits]).reshape(size)
+
+    def spawn(self, n):
+        return [MiddleSquareBackend(child, self.digits) for child in self.seed_sequence.spawn(n)]
+
+
+class PCG64Backend(RNGBackend):
+    """PCG64 de NumPy"""
+    name = "pcg64"
+
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+
+    def random(self, size):
+        return self.generator.random(size)
+
+
+BACKENDS = {
+    LCGBackend.name: LCGBackend,
+    MiddleSquareBackend.name: MiddleSquareBackend,
+    PCG64Backend.name: PCG64Backend,
+}
+
+
+def make_backend(name, seed=None):
+    try:
+        return BACKENDS[name](seed)
+    except KeyError:
+        raise ValueError(f"Generador desconocido: {name} (opciones: {', '.join(BACKENDS)})") from None
+
+
+class BatchedStream:
+    """
+    Sustituto de random_generator.LCG para un animal: pop_last() devuelve
+    (ni, ri, xi) como el LCG original, pero sin agotarse y pidiendo los
+    números al backend de `batch` en `batch`.
+    """
+    def __init__(self, backend, batch=64):
+        self.backend = backend
+        self.batch = batch
+        self._values = []
+
+    def random(self):
+        if not self._values:
+            # Invertido para servir con pop() en el orden en que se generaron
+            self._values = self.backend.random(self.batch)[::-1].tolist()
+        return self._values.pop()
+
+    def pop_last(self):
+        value = self.random()
+        return value, value, value
@@ -0,0 +1,346 @@
+"""
+Batería de pruebas de calidad para los generadores de random_generator
+(LCG y MiddleSquare) sobre volúmenes grandes (10^7 - 10^8 valores).
+
+Los números se generan con NumPy por bloques y cada prueba acumula sus
+conteos bloque a bloque, así que la memoria depende del tamaño del bloque
+y no del total de valores.
+"""
+import math
+import statistics as st
+
+import numpy as np
+
+from proofs import chi2_critical
+from rng_backends import lcg_tables
+
+NORMAL = st.NormalDist()
+
+
+# ---------------------------------------------------------------------------
+# Fuentes de números por bloques
+# ---------------------------------------------------------------------------
+
+def lcg_chunks(a, x0, m, c, total, chunk=1_000_000):
+    """
+    Genera los ri = xi / m del LCG en el mismo orden que LCG.calculate_seed,
+    devolviendo bloques de como mucho `chunk` valores.
+    """
+    if m > 2 ** 32:
+        yield from _lcg_chunks_python(a, x0, m, c, total, chunk)
+        return
+    A, C = lcg_tables(a, c, m, min(chunk, total))
+    m64 = np.uint64(m)
+    x = np.uint64(x0 % m)
+    produced = 0
+    while produced < total:
+        n = min(len(A), total - produced)
+        xi = (A[:n] * x % m64 + C[:n]) % m64
+        x = xi[-1]
+        produced += n
+        yield xi / m
+
+
+def _lcg_chunks_python(a, x0, m, c, total, chunk):
+    """Alternativa con enteros de Python para módulos que desbordarían uint64"""
+    x = x0
+    produced = 0
+    while produced < total:
+        n = min(chunk, total - produced)
+        block = np.empty(n)
+        for i in range(n):
+            x = (a * x + c) % m
+            block[i] = x / m
+        produced += n
+        yield block
+
+
+def _middle_square_normalize(values):
+    """Vectorización de MiddleSquare.normalize_list: n / 10**len(str(n))"""
+    powers = 10 ** np.arange(0, 20, dtype=np.float64)
+    digits = np.maximum(np.searchsorted(powers, values, side='right'), 1)
+    return values / powers[digits]
+
+
+def middle_square_chunks(number, digits, total, chunk=1_000_000, max_tracked=1_000_000):
+    """
+    Genera los valores normalizados de MiddleSquare en el mismo orden que
+    MiddleSquare.calculate. El método cae pronto en un ciclo, así que se detecta
+    el ciclo una vez y el resto de la secuencia se produce repitiéndolo.
+    """
+    shift = 10 ** (digits - digits // 2)
+    modulus = 10 ** digits
+    sequence = []
+    seen = {}
+    value = number
+    cycle_start = None
+    while len(sequence) < min(total, max_tracked):
+        value = (value * value // shift) % modulus
+        if value in seen:
+            cycle_start = seen[value]
+            break
+        seen[value] = len(sequence)
+        sequence.append(value)
+
+    values = _middle_square_normalize(np.array(sequence, dtype=np.float64))
+    produced = 0
+    if cycle_start is None:
+        # Sin ciclo dentro de lo rastreado: se continúa de forma secuencial
+        for start in range(0, len(values), chunk):
+            block = values[start:start + chunk]
+            produced += len(block)
+            yield block
+        while produced < total:
+            n = min(chunk, total - produced)
+            block = np.empty(n)
+            for i in range(n):
+                value = (value * value // shift) % modulus
+                block[i] = value
+            produced += n
+            yield _middle_square_normalize(block)
+        return
+
+    prefix, cycle = values[:cycle_start], values[cycle_start:]
+    for start in range(0, len(prefix), chunk):
+        block = prefix[start:start + min(chunk, total - produced)]
+        if len(block) == 0:
+            break
+        produced += len(block)
+        yield block
+    # Bloque de repetición del ciclo: múltiplo de su longitud para que encaje entre bloques
+    repeats = max(1, chunk // len(cycle))
+    tiled = np.tile(cycle, repeats)
+    while produced < total:
+        block = tiled[:total - produced]
+        produced += len(block)
+        yield block
+
+
+# ---------------------------------------------------------------------------
+# Pruebas (acumulan por bloques)
+# ---------------------------------------------------------------------------
+
+def _chi2_pvalue(statistic, df):
+    """p-valor aproximado de Chi-Cuadrado (transformación de Wilson-Hilferty)"""
+    k = 2 / (9 * df)
+    z = ((statistic / df) ** (1 / 3) - (1 - k)) / math.sqrt(k)
+    return 1 - NORMAL.cdf(z)
+
+
+def _chi2_result(name, observed, expected, confidence):
+    observed = np.asarray(observed, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    mask = expected > 0
+    statistic = float((((observed - expected) ** 2)[mask] / expected[mask]).sum())
+    df = int(mask.sum()) - 1
+    critical = chi2_critical(df, confidence)
+    return {"test": name, "statistic": statistic, "critical": critical, "df": df,
+            "p_value": _chi2_pvalue(statistic, df), "passed": statistic < critical}
+
+
+def _z_result(name, z, confidence):
+    critical = NORMAL.inv_cdf(1 - (1 - confidence) / 2)
+    return {"test": name, "statistic": z, "critical": critical,
+            "p_value": 2 * (1 - NORMAL.cdf(abs(z))), "passed": abs(z) < critical}
+
+
+class FrequencyTest:
+    """Uniformidad: Chi-Cuadrado sobre `bins` intervalos iguales"""
+    def __init__(self, bins=1000):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, block):
+        idx = np.minimum((block * self.bins).astype(np.int64), self.bins - 1)
+        self.counts += np.bincount(idx, minlength=self.bins)
+
+    def results(self, confidence):
+        n = self.counts.sum()
+        return [_chi2_result(f"frecuencia ({self.bins} intervalos)", self.counts,
+                             np.full(self.bins, n / self.bins), confidence)]
+
+
+class RunsUpDownTest:
+    """Corridas arriba/abajo: número total de corridas frente a (2n-1)/3"""
+    def __init__(self):
+        self.n = 0
+        self.changes = 0
+        self.last_value = None
+        self.last_direction = None
+
+    def update(self, block):
+        if self.last_value is not None:
+            block = np.concatenate(([self.last_value], block))
+            self.n -= 1  # El valor arrastrado ya estaba contado
+        self.n += len(block)
+        direction = np.diff(block) > 0
+        if len(direction) == 0:
+            return
+        self.changes += int(np.count_nonzero(direction[1:] != direction[:-1]))
+        if self.last_direction is not None and direction[0] != self.last_direction:
+            self.changes += 1
+        self.last_value = block[-1]
+        self.last_direction = direction[-1]
+
+    def results(self, confidence):
+        n = self.n
+        runs = self.changes + 1
+        mean = (2 * n - 1) / 3
+        std = math.sqrt((16 * n - 29) / 90)
+        return [_z_result("corridas arriba/abajo", (runs - mean) / std, confidence)]
+
+
+class GapTest:
+    """Huecos entre apariciones en [low, high): distribución geométrica"""
+    def __init__(self, low=0.0, high=0.5, max_gap=10):
+        self.low, self.high = low, high
+        self.max_gap = max_gap
+        self.counts = np.zeros(max_gap + 1, dtype=np.int64)
+        self.offset = 0
+        self.last_hit = None
+
+    def update(self, block):
+        hits = np.flatnonzero((block >= self.low) & (block < self.high)) + self.offset
+        self.offset += len(block)
+        if len(hits) == 0:
+            return
+        if self.last_hit is not None:
+            hits = np.concatenate(([self.last_hit], hits))
+        gaps = np.minimum(np.diff(hits) - 1, self.max_gap)
+        self.counts += np.bincount(gaps, minlength=self.max_gap + 1)
+        self.last_hit = hits[-1]
+
+    def results(self, confidence):
+        p = self.high - self.low
+        total = self.counts.sum()
+        probs = p * (1 - p) ** np.arange(self.max_gap + 1)
+        probs[-1] = (1 - p) ** self.max_gap  # Último intervalo: huecos >= max_gap
+        return [_chi2_result(f"huecos [{self.low}, {self.high})", self.counts, probs * total, confidence)]
+
+
+class PokerTest:
+    """Póker: manos de 5 dígitos decimales clasificadas por número de dígitos distintos"""
+    HAND = 5
+
+    def __init__(self):
+        self.counts = np.zeros(self.HAND + 1, dtype=np.int64)
+        self.leftover = np.empty(0)
+
+    def update(self, block):
+        digits = np.concatenate((self.leftover, np.minimum((block * 10).astype(np.int64), 9)))
+        usable = len(digits) - len(digits) % self.HAND
+        self.leftover = digits[usable:]
+        hands = np.sort(digits[:usable].reshape(-1, self.HAND).astype(np.int8), axis=1)
+        distinct = 1 + np.count_nonzero(np.diff(hands, axis=1), axis=1)
+        self.counts += np.bincount(distinct, minlength=self.HAND + 1)
+
+    def results(self, confidence):
+        # P(r distintos) = S(5, r) * 10! / (10 - r)! / 10^5 (S: números de Stirling de 2ª especie)
+        stirling = {1: 1, 2: 15, 3: 25, 4: 10, 5: 1}
+        probs = np.zeros(self.HAND + 1)
+        for r, s in stirling.items():
+            probs[r] = s * math.perm(10, r) / 10 ** self.HAND
+        total = self.counts.sum()
+        return [_chi2_result("póker (5 dígitos)", self.counts[1:], probs[1:] * total, confidence)]
+
+
+class SerialTest:
+    """Serial: tuplas no solapadas de `dimension` valores en una rejilla de `divisions`^dimension celdas"""
+    def __init__(self, dimension=2, divisions=16):
+        self.dimension = dimension
+        self.divisions = divisions
+        self.cells = divisions ** dimension
+        self.counts = np.zeros(self.cells, dtype=np.int64)
+        self.leftover = np.empty(0)
+
+    def update(self, block):
+        values = np.concatenate((self.leftover, block))
+        usable = len(values) - len(values) % self.dimension
+        self.leftover = values[usable:]
+        bins = np.minimum((values[:usable] * self.divisions).astype(np.int64), self.divisions - 1)
+        tuples = bins.reshape(-1, self.dimension)
+        index = np.zeros(len(tuples), dtype=np.int64)
+        for column in range(self.dimension):
+            index = index * self.divisions + tuples[:, column]
+        self.counts += np.bincount(index, minlength=self.cells)
+
+    def results(self, confidence):
+        total = self.counts.sum()
+        name = "serial pares" if self.dimension == 2 else "serial tríos" if self.dimension == 3 \
+            else f"serial {self.dimension}-tuplas"
+        return [_chi2_result(f"{name} ({self.divisions}^{self.dimension})", self.counts,
+                             np.full(self.cells, total / self.cells), confidence)]
+
+
+class AutocorrelationTest:
+    """Autocorrelación de (u - 0.5) para varios retardos; bajo H0, rho * sqrt(n) ~ N(0, 1)"""
+    def __init__(self, lags=(1, 2, 3, 5, 10, 100)):
+        self.lags = tuple(lags)
+        self.max_lag = max(self.lags)
+        self.sums = np.zeros(len(self.lags))
+        self.pairs = np.zeros(len(self.lags), dtype=np.int64)
+        self.tail = np.empty(0)
+
+    def update(self, block):
+        centered = np.concatenate((self.tail, block - 0.5))
+        carried = len(self.tail)
+        for i, lag in enumerate(self.lags):
+            # Solo los pares cuyo segundo elemento pertenece al bloque nuevo
+            start = max(carried - lag, 0)
+            first = centered[start:len(centered) - lag]
+            second = centered[start + lag:]
+            self.sums[i] += float(np.dot(first, second))
+            self.pairs[i] += len(first)
+        self.tail = centered[-self.max_lag:]
+
+    def results(self, confidence):
+        results = []
+        for lag, total, pairs in zip(self.lags, self.sums, self.pairs):
+            rho = 12 * total / pairs
+            results.append(_z_result(f"autocorrelación retardo {lag}", rho * math.sqrt(pairs), confidence))
+        return results
+
+
+def default_tests():
+    return [FrequencyTest(), RunsUpDownTest(), GapTest(0.0, 0.5), GapTest(0.3, 0.4, max_gap=30),
+            PokerTest(), SerialTest(2, 16), SerialTest(3, 8), AutocorrelationTest()]
+
+
+def run_battery(chunks, tests=None, confidence=0.95):
+    """Pasa todos los bloques por cada prueba y devuelve la lista de resultados"""
+    tests = tests if tests is not None else default_tests()
+    total = 0
+    for block in chunks:
+        total += len(block)
+        for test in tests:
+            test.update(block)
+    results = []
+    for test in tests:
+        results.extend(test.results(confidence))
+    return total, results
+
+
+def format_report(title, total, results):
+    lines = [f"{title} - {total:,} valores", ""]
+    lines.append(f"{'Prueba':<34} {'Estadístico':>14} {'Crítico':>12} {'p-valor':>10}  Resultado")
+    for res in results:
+        verdict = "Aceptado" if res["passed"] else "Rechazado"
+        lines.append(f"{res['test']:<34} {res['statistic']:>14.4f} {res['critical']:>12.4f} "
+                     f"{res['p_value']:>10.4f}  {verdict}")
+    return "\n".join(lines)
+
+
+def generator_chunks(generator, count, chunk, seed=None):
+    """Bloques de los generadores con los mismos parámetros que usa Simulation"""
+    if generator == "lcg":
+        x0 = seed if seed is not None else 12345
+        return "LCG", lcg_chunks(1664525, x0, 2 ** 32, 1013904223, count, chunk)
+    number = seed if seed is not None else 84930271
+    return "MiddleSquare", middle_square_chunks(number, 8, count, chunk)
+
+
+if __name__ == "__main__":
+    import sys
+    from cli import main
+
+    main(["battery", *sys.argv[1:]])
@@ -1,24 +1,30 @@
 import math
 import random
 import sys
+import time
 from collections import deque
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
 import pygame
 from pygame.locals import *
 
 import random_generator
-
-# Configuración inicial
-pygame.init()
-pygame.font.init()
-
-# Constantes
+from camera import Camera
+from events import BIRTH, DISEASE, EATEN, EXPIRED, PREDATION, STARVATION, DemographicEvents
+from history import GRAPH_SPANS, PopulationHistory
+from interactions import MATES, feeding_order, rows
+from registry import EntityRegistry
+from spatial import NeighbourLists, resolve_contacts
+
+# Constantes (tamaño de la ventana; el tamaño del mundo se configura en SimulationParams)
 WIDTH, HEIGHT = 1200, 800
 FPS = 60
-FONT = pygame.font.SysFont('Arial', 14)
-LARGE_FONT = pygame.font.SysFont('Arial', 24)
+FONT_SIZE = 14
+LARGE_FONT_SIZE = 24
+GRAPH_WIDTH, GRAPH_HEIGHT = 280, 100
+GRAPH_MARGIN = 30  # Espacio a la izquierda del gráfico para las etiquetas del eje
 
 # Colores
 BLACK = (0, 0, 0)
@@ -31,6 +37,32 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 BROWN = (139, 69, 19)
 GRAY = (128, 128, 128)
+FOOD_COLORS = [
+    (0, 200, 0),
+    (50, 150, 50),
+    (100, 200, 100),
+    (150, 200, 150)
+]
+
+# Reglas de cada especie que se aparea (filas MATES de interactions.INTERACTIONS):
+# energía mínima de la pareja, energía que le cuesta, espera hasta la siguiente camada
+# y los campos de SimulationParams con la probabilidad, la camada y la población máxima
+MATING_RULES = {
+    'rabbit': (60, 20, 100, 'rabbit_reproduce_prob', 'rabbit_litter_size', 'max_rabbits'),
+    'fox': (70, 30, 200, 'fox_reproduce_prob', 'fox_litter_size', 'max_foxes'),
+}
+
+
+_fonts = {}
+
+
+def get_font(size=FONT_SIZE):
+    """Fuente Arial cargada la primera vez que se usa (SysFont es lento y no hace falta sin ventana)"""
+    font = _fonts.get(size)
+    if font is None:
+        pygame.font.init()
+        font = _fonts[size] = pygame.font.SysFont('Arial', size)
+    return font
 
 
 # Enums para mejor organización
@@ -46,6 +78,16 @@ class Season(Enum):
     WINTER = 4
 
 
+class Behaviour(Enum):
+    """Comportamiento elegido por un animal en su último update"""
+    RANDOM = 0
+    SEEK_MATE = 1
+    SEEK_FOOD = 2
+    FLEE = 3
+    HUNT = 4
+    HUNT_WEAK = 5
+
+
 @dataclass
 class SimulationParams:
     rabbit_speed: float = 1.5
@@ -68,22 +110,46 @@ class SimulationParams:
     initial_food: int = 100
     day_length: int = 300  # frames
     season_length: int = 1200  # frames
+    world_width: int = WIDTH  # Tamaño del mundo, independiente de la ventana
+    world_height: int = HEIGHT
+    middle_square_seed: int = 84930271  # Semilla (8 cifras) de las posiciones de la comida
+    rng_backend: str = "legacy"  # "legacy" (lista del LCG), "lcg", "middlesquare" o "pcg64"
+    rng_substreams: bool = False  # Un subflujo independiente por animal
+    neighbour_lists: bool = True  # Listas de vecinos de Verlet en lugar de recorrer todos los grupos
+    neighbour_skin: int = 30  # Margen extra de las listas (px)
+    neighbour_max_age: int = 50  # Ticks máximos entre reconstrucciones
+    behaviour_engine: str = "objects"  # "objects" (Rabbit/Fox.update) o "batched" (behaviour.py)
+    update_mode: str = "sequential"  # "sequential" (en el lugar) o "double_buffered" (buffered.py)
+    update_workers: int = 1  # Hilos para los bloques de animales en modo double_buffered
+    quality_governor: bool = True  # Bajar detalles de dibujo para mantener el tiempo por frame
+    target_frame_ms: float = 1000 / FPS
+
+    @classmethod
+    def from_dict(cls, values=None):
+        """Crea los parámetros por defecto sobrescribiendo los que vengan en el diccionario"""
+        params = cls()
+        if values:
+            for param, value in values.items():
+                if hasattr(params, param):
+                    setattr(params, param, value)
+        return params
 
 
 class Food(pygame.sprite.Sprite):
-    def __init__(self, x=None, y=None, ms_rng=None):
+    species = 2  # Códigos de especie de trajectory.py / events.py
+    events = None
+    _images = {}
+
+    def __init__(self, x=None, y=None, ms_rng=None, params=None):
         super().__init__()
+        world_width = params.world_width if params else WIDTH
+        world_height = params.world_height if params else HEIGHT
         self.size = random.randint(3, 8)
         self.nutrition = self.size * 2
-        self.image = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
 
-        food_color = random.choice([
-            (0, 200, 0),
-            (50, 150, 50),
-            (100, 200, 100),
-            (150, 200, 150)
-        ])
-        pygame.draw.circle(self.image, food_color, (self.size // 2, self.size // 2), self.size // 2)
+        food_color = random.choice(FOOD_COLORS)
+        self.image = Food.image_for(self.size, food_color)
+        self.color = food_color
 
         if x is None or y is None:
             x_data = ms_rng.pop_last()
@@ -92,22 +158,49 @@ class Food(pygame.sprite.Sprite):
             if x_data and y_data:
                 _, norm_x = x_data
                 _, norm_y = y_data
-                x = int(norm_x * WIDTH)
-                y = int(norm_y * HEIGHT)
+                x = int(norm_x * world_width)
+                y = int(norm_y * world_height)
             else:
-                x = random.randint(0, WIDTH)
-                y = random.randint(0, HEIGHT)
+                x = random.randint(0, world_width)
+                y = random.randint(0, world_height)
         self.rect = self.image.get_rect(center=(x, y))
         self.age = 0
         self.lifespan = random.randint(500, 1000)
 
+    @staticmethod
+    def image_for(size, color):
+        """Imagen compartida por tamaño y color (ningún sprite la modifica)"""
+        image = Food._images.get((size, color))
+        if image is None:
+            image = Food._images[(size, color)] = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(image, color, (size // 2, size // 2), size // 2)
+        return image
+
     def update(self):
         self.age += 1
         if self.age > self.lifespan:
+            if self.events is not None:
+                self.events.record(EXPIRED, self.species, self)
             self.kill()
 
+    def eaten(self):
+        if self.events is not None:
+            self.events.record(EATEN, self.species, self)
+        self.kill()
+
 
 class Animal(pygame.sprite.Sprite):
+    # Imágenes rotadas para dibujar, compartidas por especie, sexo y ángulo redondeado
+    _rotations = {}
+    _images = {}
+    # Muertes diferidas durante una fase con doble búfer (ver buffered.py)
+    pending_kills = None
+    # Fuente de random() del animal; en modo double_buffered, la de su propio subflujo
+    chance = random.random
+    # Contadores demográficos de la simulación y causa de la muerte (ver events.py)
+    events = None
+    death_cause = None
+
     def __init__(self, x, y, gender, color_male, color_female, size, speed, params, rng):
         super().__init__()
         self.gender = gender
@@ -124,20 +217,44 @@ class Animal(pygame.sprite.Sprite):
         self.memory = deque(maxlen=5)
         self.fear = 0
         self.reproduction_cooldown = 0
+        self.behaviour = Behaviour.RANDOM
         self.rng = rng
 
-        # Crear imagen con forma más orgánica
-        self.image = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
         color = color_male if gender == Gender.MALE else color_female
-        pygame.draw.ellipse(self.image, color, (0, 0, size * 2, size * 1.5))
-
-        # Ojos
-        eye_color = (255, 255, 255)
-        pygame.draw.circle(self.image, eye_color, (size // 1.5, size // 2), size // 4)
-        pygame.draw.circle(self.image, (0, 0, 0), (size // 1.5, size // 2), size // 8)
-
+        self.image = self.original_image = Animal.base_image(color, size)
         self.rect = self.image.get_rect(center=(x, y))
-        self.original_image = self.image.copy()
+
+    @staticmethod
+    def base_image(color, size):
+        """Imagen sin rotar, compartida por color y tamaño (ningún sprite la modifica)"""
+        image = Animal._images.get((color, size))
+        if image is None:
+            # Crear imagen con forma más orgánica
+            image = Animal._images[(color, size)] = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            pygame.draw.ellipse(image, color, (0, 0, size * 2, size * 1.5))
+
+            # Ojos
+            eye_color = (255, 255, 255)
+            pygame.draw.circle(image, eye_color, (size // 1.5, size // 2), size // 4)
+            pygame.draw.circle(image, (0, 0, 0), (size // 1.5, size // 2), size // 8)
+        return image
+
+    def die(self, cause):
+        """Muerte con causa: se cuenta al sacar al animal de sus grupos"""
+        self.death_cause = cause
+        self.kill()
+
+    def eaten(self):
+        self.die(PREDATION)
+
+    def kill(self):
+        pending = Animal.pending_kills
+        if pending is not None:
+            pending.append(self)  # Se saca de los grupos al terminar la fase
+            return
+        if self.death_cause is not None and self.events is not None and self.alive():
+            self.events.record(self.death_cause, self.species, self)
+        super().kill()
 
     @property
     def speed(self):
@@ -150,11 +267,27 @@ class Animal(pygame.sprite.Sprite):
             return self.base_speed * 0.95  # 95% de velocidad
         return self.base_speed  # 100% de velocidad
 
-    def rotate_towards_direction(self):
-        if self.direction[0] != 0 or self.direction[1] != 0:
-            angle = math.degrees(math.atan2(-self.direction[1], self.direction[0])) - 90
-            self.image = pygame.transform.rotate(self.original_image, angle)
-            self.rect = self.image.get_rect(center=self.rect.center)
+    def rotated_image(self, step=0):
+        """
+        Imagen orientada hacia la dirección, para dibujarla centrada en el rect. El rect
+        sale siempre de la imagen sin rotar: rotar no cambia contactos ni bordes.
+        `step`: 0 = ángulo exacto, N = grados redondeados a múltiplos de N, None = sin rotar.
+        """
+        dx, dy = self.direction
+        if step is None or (dx == 0 and dy == 0):
+            return self.original_image
+        angle = math.degrees(math.atan2(-dy, dx)) - 90
+        if step:
+            key = (type(self), self.gender, int(round(angle / step)) * step % 360)
+            image = Animal._rotations.get(key)
+            if image is None:
+                image = Animal._rotations[key] = pygame.transform.rotate(self.original_image, key[2])
+            return image
+        # Ángulo exacto: se guarda la última para no rotar de nuevo mientras no gire
+        drawn = self.__dict__.get('_drawn')
+        if drawn is None or drawn[0] != angle:
+            drawn = self._drawn = (angle, pygame.transform.rotate(self.original_image, angle))
+        return drawn[1]
 
     def update_health(self):
         """Actualiza el estado de salud del animal"""
@@ -162,7 +295,7 @@ class Animal(pygame.sprite.Sprite):
         if self.sick:
             self.health -= 0.5  # Reducir la cantidad para que no sea tan drástico
             # 20% de probabilidad de curarse cada frame
-            if random.random() < 0.2:
+            if self.chance() < 0.2:
                 self.sick = False
 
         # Pérdida de salud gradual por no comer
@@ -177,7 +310,7 @@ class Animal(pygame.sprite.Sprite):
 
         # Si la salud llega a cero, muere
         if self.health <= 0:
-            self.kill()
+            self.die(DISEASE)
             return False
         return True
 
@@ -188,9 +321,9 @@ class Animal(pygame.sprite.Sprite):
         pop_result = self.rng.pop_last()  # puede ser (ni, ri, xi) o (original, normalized)
 
         # Si no hay números disponibles, usamos random como respaldo
-        rand_val = pop_result[2] if pop_result else random.random()
+        rand_val = pop_result[2] if pop_result else self.chance()
 
-        if self.change_dir_timer > 30 or random.random() < 0.05:
+        if self.change_dir_timer > 30 or self.chance() < 0.05:
             # Otro par de valores para dirección, o fallback
             dx = self.rng.pop_last()
             dy = self.rng.pop_last()
@@ -210,19 +343,19 @@ class Animal(pygame.sprite.Sprite):
 
         # Movimiento con inercia (usamos otro número como factor aleatorio)
         inertia_factor = self.rng.pop_last()
-        inertia = 1 + 0.5 * (inertia_factor[1] if inertia_factor else random.random())
+        inertia = 1 + 0.5 * (inertia_factor[1] if inertia_factor else self.chance())
 
         self.rect.x += int(self.direction[0] * self.speed * inertia)
         self.rect.y += int(self.direction[1] * self.speed * inertia)
 
-        # Rebote en bordes
-        if self.rect.left < 0 or self.rect.right > WIDTH:
+        # Rebote en bordes del mundo
+        world_width, world_height = self.params.world_width, self.params.world_height
+        if self.rect.left < 0 or self.rect.right > world_width:
             self.direction[0] *= -1
-        if self.rect.top < 0 or self.rect.bottom > HEIGHT:
+        if self.rect.top < 0 or self.rect.bottom > world_height:
             self.direction[1] *= -1
 
-        self.rect.clamp_ip(pygame.Rect(0, 0, WIDTH, HEIGHT))
-        self.rotate_towards_direction()
+        self.rect.clamp_ip(pygame.Rect(0, 0, world_width, world_height))
 
     def move_towards(self, target):
         dx = target.rect.centerx - self.rect.centerx
@@ -241,7 +374,6 @@ class Animal(pygame.sprite.Sprite):
 
         self.rect.x += int(self.direction[0] * self.speed)
         self.rect.y += int(self.direction[1] * self.speed)
-        self.rotate_towards_direction()
 
     def avoid(self, targets, safe_distance=50):
         avg_x, avg_y = 0, 0
@@ -262,7 +394,6 @@ class Animal(pygame.sprite.Sprite):
             self.direction[1] = avg_y / length
             self.rect.x += int(self.direction[0] * self.speed * 1.5)
             self.rect.y += int(self.direction[1] * self.speed * 1.5)
-            self.rotate_towards_direction()
             return True
         return False
 
@@ -273,7 +404,7 @@ class Animal(pygame.sprite.Sprite):
         self.energy -= energy_loss
         self.time_since_food += 1  # Esto ya está bien
         if self.energy <= 0:
-            self.kill()
+            self.die(STARVATION)
             return False
         return True
 
@@ -284,10 +415,13 @@ class Animal(pygame.sprite.Sprite):
 
 
 class Rabbit(Animal):
+    species = 0
+    nutrition = 30  # Energía que gana el zorro que lo caza
+
     def __init__(self, x=None, y=None, gender=None, params=None, rng=None):
         gender = gender or random.choice(list(Gender))
-        x = x or random.randint(0, WIDTH)
-        y = y or random.randint(0, HEIGHT)
+        x = x or random.randint(0, params.world_width)
+        y = y or random.randint(0, params.world_height)
         color_male = (255, 255, 150)
         color_female = (255, 220, 150)
         super().__init__(x, y, gender, color_male, color_female, 8, params.rabbit_speed, params, rng)
@@ -303,11 +437,15 @@ class Rabbit(Animal):
 
         # Comportamiento basado en salud
         if self.health > 70 and self.age >= self.maturity_age and self.reproduction_cooldown == 0:
+            self.behaviour = Behaviour.SEEK_MATE
             self.seek_mate(all_rabbits)
         elif self.health > 30:
             self.seek_food(foods, foxes)
         else:
-            if not self.avoid_danger(foxes):
+            if self.avoid_danger(foxes):
+                self.behaviour = Behaviour.FLEE
+            else:
+                self.behaviour = Behaviour.RANDOM
                 self.move_randomly()
 
     def seek_mate(self, rabbits):
@@ -338,7 +476,9 @@ class Rabbit(Animal):
         """Busca comida mientras evita peligros"""
         # Primero verificar peligros cercanos
         if self.avoid_danger(foxes):
+            self.behaviour = Behaviour.FLEE
             return
+        self.behaviour = Behaviour.SEEK_FOOD
 
         # Buscar comida
         closest_food = None
@@ -370,10 +510,12 @@ class Rabbit(Animal):
 
 
 class Fox(Animal):
+    species = 1
+
     def __init__(self, x=None, y=None, gender=None, params=None, rng=None):
         gender = gender or random.choice(list(Gender))
-        x = x or random.randint(0, WIDTH)
-        y = y or random.randint(0, HEIGHT)
+        x = x or random.randint(0, params.world_width)
+        y = y or random.randint(0, params.world_height)
         color_male = (200, 50, 50)
         color_female = (150, 50, 50)
         super().__init__(x, y, gender, color_male, color_female, 12, params.fox_speed, params, rng)
@@ -388,10 +530,13 @@ class Fox(Animal):
 
         # Comportamiento basado en salud
         if self.health > 70 and self.age >= self.maturity_age and self.reproduction_cooldown == 0:
+            self.behaviour = Behaviour.SEEK_MATE
             self.seek_mate(all_foxes)
         elif self.health > 40:
+            self.behaviour = Behaviour.HUNT
             self.hunt(rabbits)
         else:
+            self.behaviour = Behaviour.HUNT_WEAK
             self.hunt_weak_prey(rabbits)
 
     def seek_mate(self, foxes):
@@ -459,119 +604,274 @@ class Fox(Animal):
 
 
 class Simulation:
-    def __init__(self, initial_params=None):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    def __init__(self, initial_params=None, headless=False, seed=None):
+        # En modo headless no se abre ventana: solo se simula
+        self.headless = headless
+        if not headless:
+            pygame.init()
+        self.screen = None if headless else pygame.display.set_mode((WIDTH, HEIGHT))
         self.clock = pygame.time.Clock()
+        if seed is not None:
+            random.seed(seed)
         self.rng = random_generator.LCG(1664525, random.randint(0, 2 ** 32 - 1), 2 ** 32, 1013904223, 0, 1)
-        self.ms_rng = random_generator.MiddleSquare(number=84930271, digits=8, count=10000)
         self.data = self.rng.ri_list.copy()
-        self.datams_rng = self.ms_rng.normalized_list.copy()
         self.running = True
         self.paused = False
         self.show_stats = True
+        self.frame = 0
+        self._overlay_surface = None
+        self._graph_surface = None
         self.day_night_cycle = 0
         self.season = Season.SPRING
         self.season_timer = 0
+        self.tick = 0
+        self.phase_times = {}  # Milisegundos por fase del último tick
+        self.tick_rate = 0.0
+        self._last_tick_time = None
+        self.telemetry = None
+        self.capture = None
+        self.recorder = None
+        self.heatmap = None
+        self.show_heatmap = False
+        self.events = DemographicEvents(self.entity_uid)
+        self._events_surface = None
+        # Pruebas estadísticas en segundo plano
+        self.test_executor = None
+        self.test_future = None
+        self.test_method = None
+        self.test_results = None
+        self.test_panel_rect = None
         # Inicializar parámetros con valores por defecto o los proporcionados
-        self.params = SimulationParams()
-        if initial_params:
-            for param, value in initial_params.items():
-                if hasattr(self.params, param):
-                    setattr(self.params, param, value)
-
-        # Grupos de sprites
-        self.all_sprites = pygame.sprite.LayeredUpdates()
-        self.rabbits = pygame.sprite.Group()
-        self.foxes = pygame.sprite.Group()
-        self.foods = pygame.sprite.Group()
+        self.params = SimulationParams.from_dict(initial_params)
+        self.ms_rng = random_generator.MiddleSquare(number=self.params.middle_square_seed, digits=8, count=10000)
+        self.datams_rng = self.ms_rng.normalized_list.copy()
+
+        # Con doble búfer cada animal necesita su propio subflujo para no depender del orden
+        if self.params.update_mode == "double_buffered":
+            if self.params.rng_backend == "legacy":
+                self.params.rng_backend = "lcg"  # El mismo LCG, como backend con subflujos
+            self.params.rng_substreams = True
+        elif self.params.update_mode != "sequential":
+            raise ValueError(f"Modo de actualización desconocido: {self.params.update_mode}")
+
+        # Generador de los animales: la lista del LCG original o un backend por lotes
+        self.rng_backend = None
+        if self.params.rng_backend != "legacy":
+            from rng_backends import make_backend
+            self.rng_backend = make_backend(self.params.rng_backend, seed)
+            self.agent_stream = self.rng_backend.stream()
+
+        # Motor por lotes: decide y mueve a cada especie con arreglos de NumPy
+        self.behaviour = None
+        if self.params.behaviour_engine == "batched":
+            from behaviour import BatchedBehaviour
+            self.behaviour = BatchedBehaviour(self.params, random.getrandbits(64))
+        elif self.params.behaviour_engine != "objects":
+            raise ValueError(f"Motor de comportamiento desconocido: {self.params.behaviour_engine}")
+
+        # Doble búfer: instantánea del tick anterior y bloques de animales en hilos
+        self.buffered = None
+        if self.params.update_mode == "double_buffered":
+            if self.behaviour is not None:
+                raise ValueError("El modo double_buffered requiere el motor por objetos")
+            from buffered import DoubleBufferedUpdate
+            self.buffered = DoubleBufferedUpdate(self.params, self.params.update_workers)
+
+        # Listas de vecinos para las consultas de comportamiento (motor por objetos)
+        self.neighbours = None
+        if self.params.neighbour_lists and self.behaviour is None and self.buffered is None:
+            self.neighbours = NeighbourLists(self.params, self.params.neighbour_skin,
+                                             self.params.neighbour_max_age)
+
+        # Cámara: la ventana muestra solo una parte del mundo
+        self.camera = Camera(WIDTH, HEIGHT, self.params.world_width, self.params.world_height)
+
+        # Un almacén denso por especie; el registro se recorre entero para dibujar
+        self.registry = EntityRegistry()
+        self.rabbits = self.registry.rabbits
+        self.foxes = self.registry.foxes
+        self.foods = self.registry.foods
+        self.all_sprites = self.registry
 
         # Historial para gráficos
-        self.rabbit_pop_history = []
-        self.fox_pop_history = []
-        self.food_pop_history = []
+        self.history = PopulationHistory()
+        self.graph_span_index = 0
+        self.graph_rect = pygame.Rect(WIDTH - GRAPH_WIDTH - 20 - GRAPH_MARGIN, 10,
+                                      GRAPH_WIDTH + GRAPH_MARGIN, GRAPH_HEIGHT + 20)
+
+        # Gobernador de calidad (solo tiene sentido con ventana); solo cambia el dibujado
+        self.quality = None
+        self.rotation_step = 0  # Paso de rotación de las imágenes (ver Animal.rotated_image)
+        if not headless and self.params.quality_governor:
+            from quality import QualityGovernor
+            self.quality = QualityGovernor(self.params.target_frame_ms)
+
+        # Posiciones y sexos de las tandas de spawn_*, derivado de la semilla de random
+        self.spawn_rng = np.random.default_rng(random.getrandbits(64))
 
         # Inicializar población
         self.initialize_population()
 
     def run_statistical_tests(self, method):
-        import tkinter as tk
-        from tkinter import ttk
-        from proofs import ChiSquare, KS
+        """Lanza las pruebas en un proceso aparte; el resultado se dibuja al terminar"""
+        if self.test_future is not None and not self.test_future.done():
+            return  # Ya hay pruebas en curso
+        if self.test_executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self.test_executor = ProcessPoolExecutor(max_workers=1,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+        from proofs import run_uniformity_tests
 
         # Extraer datos del generador
         if method == 'LCG':
             data = self.data
         elif method == 'MiddleSquare':
             data = self.datams_rng
-        # Ejecutar pruebas
-        chi = ChiSquare(data)
-        chi.create_intervals()
-        chi.calculate_frequence()
-        chi.calculate_squ_chi()
-
-        ks = KS(data)
-        ks.create_intervals()
-        ks.calculate_frequence_obtained()
-        ks.calculate_frequence_obtained_acumulated()
-        ks.calculate_dm()
-
-        chi_passed = chi.squ_chi < chi.squ_chi_critic
-        ks_passed = ks.dm_calculated < ks.dm_critic
-
-        # Crear ventana de resultados con Tkinter
-        result_window = tk.Tk()
-        result_window.title("Resultados Pruebas Estadísticas")
-        result_window.geometry("500x300")
-        result_window.resizable(False, False)
-
-        # Texto de resultados
-        results = [
-            "RESULTADOS DE LAS PRUEBAS",
-            "",
-            f"Chi-Cuadrado: {chi.squ_chi:.4f} (crítico: {chi.squ_chi_critic:.4f})",
-            "✔️ Aceptado" if chi_passed else "❌ Rechazado",
-            "",
-            f"KS DM: {ks.dm_calculated:.4f} (crítico: {ks.dm_critic:.4f})",
-            "✔️ Aceptado" if ks_passed else "❌ Rechazado",
-            "",
-            "Cierra esta ventana para continuar..."
-        ]
-
-        # Crear etiquetas
-        for line in results:
-            label = ttk.Label(result_window, text=line, font=("Arial", 12))
-            label.pack(pady=2)
-
-        # Ejecutar ventana
-        result_window.mainloop()
+        self.test_method = method
+        self.test_results = None
+        self.test_future = self.test_executor.submit(run_uniformity_tests, data)
+
+    def poll_statistical_tests(self):
+        """Recoge el resultado de las pruebas si ya terminaron (no bloquea)"""
+        if self.test_future is not None and self.test_future.done():
+            try:
+                self.test_results = self.test_future.result()
+            except Exception as e:
+                self.test_results = {"error": str(e)}
+            self.test_future = None
+
+    def draw_test_panel(self):
+        """Panel con los resultados de las pruebas dibujado sobre la simulación"""
+        if self.test_future is not None:
+            lines = [f"Ejecutando pruebas {self.test_method}..."]
+        elif self.test_results is not None:
+            res = self.test_results
+            if "error" in res:
+                lines = ["ERROR EN LAS PRUEBAS", "", res["error"]]
+            else:
+                lines = [
+                    f"RESULTADOS DE LAS PRUEBAS ({self.test_method}, n={res['size']})",
+                    "",
+                    f"Chi-Cuadrado: {res['chi']:.4f} (crítico: {res['chi_critic']:.4f})",
+                    "Aceptado" if res["chi_passed"] else "Rechazado",
+                    "",
+                    f"KS DM: {res['ks']:.4f} (crítico: {res['ks_critic']:.4f})",
+                    "Aceptado" if res["ks_passed"] else "Rechazado",
+                ]
+            lines += ["", "Click o [ESC] para cerrar"]
+        else:
+            return
 
-    def add_food(self, x=None, y=None):  # Añadir este método si falta
-        food = Food(x, y, self.ms_rng)
-        self.foods.add(food)
-        self.all_sprites.add(food)
+        width, height = 500, 40 + len(lines) * 22
+        self.test_panel_rect = pygame.Rect((WIDTH - width) // 2, (HEIGHT - height) // 2, width, height)
+        s = pygame.Surface((width, height), pygame.SRCALPHA)
+        s.fill((0, 0, 0, 200))
+        self.screen.blit(s, self.test_panel_rect.topleft)
+        pygame.draw.rect(self.screen, WHITE, self.test_panel_rect, 1)
+        for i, line in enumerate(lines):
+            color = GREEN if line == "Aceptado" else RED if line == "Rechazado" else WHITE
+            text_surface = get_font().render(line, True, color)
+            self.screen.blit(text_surface, (self.test_panel_rect.x + 20, self.test_panel_rect.y + 20 + i * 22))
+
+    def add_food(self, x=None, y=None, uid=None):  # Añadir este método si falta
+        food = Food(x, y, self.ms_rng, self.params)
+        food.events = self.events
+        if uid is not None:
+            food.uid = uid
+        self._insert('food', self.foods, (food,))
         return food
 
-    def add_rabbit(self, x=None, y=None, gender=None):
-        rabbit = Rabbit(x, y, gender, self.params, self.rng)  # Asegurar que pasamos self.params
-        self.rabbits.add(rabbit)
-        self.all_sprites.add(rabbit)
+    def agent_rng(self):
+        """Generador que recibe cada animal nuevo"""
+        if self.rng_backend is None:
+            return self.rng
+        if self.params.rng_substreams:
+            return self.rng_backend.spawn(1)[0].stream()
+        return self.agent_stream
+
+    def _new_animal(self, cls, x, y, gender, uid=None):
+        animal = cls(x, y, gender, self.params, self.agent_rng())  # Asegurar que pasamos self.params
+        if self.buffered is not None:
+            animal.chance = animal.rng.random
+        animal.events = self.events
+        if uid is not None:
+            animal.uid = uid  # Conserva el suyo (p. ej. al migrar entre teselas)
+        return animal
+
+    def _insert(self, kind, group, entities):
+        """Añade una tanda de entidades a su almacén del registro de una vez"""
+        group.add(entities)
+        if self.neighbours is not None:
+            for entity in entities:
+                self.neighbours.added(kind, entity)
+
+    def add_rabbit(self, x=None, y=None, gender=None, uid=None):
+        rabbit = self._new_animal(Rabbit, x, y, gender, uid)
+        self._insert('rabbit', self.rabbits, (rabbit,))
         return rabbit
 
-    def add_fox(self, x=None, y=None, gender=None):
-        fox = Fox(x, y, gender, self.params, self.rng)  # Asegurar que pasamos self.params
-        self.foxes.add(fox)
-        self.all_sprites.add(fox)
+    def add_fox(self, x=None, y=None, gender=None, uid=None):
+        fox = self._new_animal(Fox, x, y, gender, uid)
+        self._insert('fox', self.foxes, (fox,))
         return fox
 
-    def initialize_population(self):
-        for _ in range(self.params.initial_rabbits):
-            self.add_rabbit()
-
-        for _ in range(self.params.initial_foxes):
-            self.add_fox()
+    def random_positions(self, n):
+        """(n, 2) posiciones enteras uniformes en el mundo, bordes incluidos como randint"""
+        xs = self.spawn_rng.integers(0, self.params.world_width, n, endpoint=True)
+        ys = self.spawn_rng.integers(0, self.params.world_height, n, endpoint=True)
+        return np.column_stack((xs, ys))
+
+    def _spawn_positions(self, n, positions):
+        if positions is None:
+            return self.random_positions(n)
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        if len(positions) != n:
+            raise ValueError(f"Se esperaban {n} posiciones y llegaron {len(positions)}")
+        return positions
+
+    def _spawn_animals(self, cls, kind, group, n, positions, genders):
+        positions = self._spawn_positions(n, positions)
+        if genders is None:
+            choices = list(Gender)
+            genders = [choices[i] for i in self.spawn_rng.integers(0, len(choices), n).tolist()]
+        animals = [self._new_animal(cls, x, y, gender)
+                   for (x, y), gender in zip(positions.tolist(), genders)]
+        self._insert(kind, group, animals)
+        return animals
+
+    def spawn_rabbits(self, n, positions=None, genders=None):
+        """Añade n conejos de una vez (posiciones y sexos al azar en un solo sorteo si no se dan)"""
+        return self._spawn_animals(Rabbit, 'rabbit', self.rabbits, n, positions, genders)
+
+    def spawn_foxes(self, n, positions=None, genders=None):
+        """Añade n zorros de una vez (ver spawn_rabbits)"""
+        return self._spawn_animals(Fox, 'fox', self.foxes, n, positions, genders)
+
+    def spawn_foods(self, n, positions=None):
+        """
+        Añade n comidas de una vez. Sin posiciones salen del MiddleSquare, como en
+        add_food (dos valores por comida), y al agotarse se completan al azar.
+        """
+        if positions is None:
+            values = np.array(self.ms_rng.pop_many(2 * n))
+            pairs = len(values) // 2
+            positions = np.empty((n, 2), dtype=np.int64)
+            positions[:pairs, 0] = values[0:2 * pairs:2] * self.params.world_width
+            positions[:pairs, 1] = values[1:2 * pairs:2] * self.params.world_height
+            positions[pairs:] = self.random_positions(n - pairs)
+        else:
+            positions = self._spawn_positions(n, positions)
+        foods = [Food(x, y, None, self.params) for x, y in positions.tolist()]
+        for food in foods:
+            food.events = self.events
+        self._insert('food', self.foods, foods)
+        return foods
 
-        for _ in range(self.params.initial_food):
-            self.add_food()  # Usar add_food en lugar de crear Food directamente
+    def initialize_population(self):
+        self.spawn_rabbits(self.params.initial_rabbits)
+        self.spawn_foxes(self.params.initial_foxes)
+        self.spawn_foods(self.params.initial_food)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -582,6 +882,11 @@ class Simulation:
                     self.paused = not self.paused
                 elif event.key == pygame.K_s:
                     self.show_stats = not self.show_stats
+                elif event.key == pygame.K_h:
+                    if self.heatmap is None:
+                        self.enable_heatmap()
+                    else:
+                        self.show_heatmap = not self.show_heatmap
                 elif event.key == pygame.K_r:
                     self.reset_simulation()
                 elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
@@ -590,31 +895,55 @@ class Simulation:
                 elif event.key == pygame.K_MINUS:
                     self.params.rabbit_speed = max(0.5, self.params.rabbit_speed - 0.1)
                     self.params.fox_speed = max(0.5, self.params.fox_speed - 0.1)
+                elif event.key == pygame.K_HOME:
+                    self.camera.fit_world()
+                elif event.key == pygame.K_ESCAPE:
+                    self.test_results = None
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_pos = pygame.mouse.get_pos()
+                if self.show_stats and self.graph_rect.collidepoint(mouse_pos):
+                    self.zoom_graph(event.y)  # Sobre el gráfico: cambiar el rango de ticks
+                else:
+                    # Rueda del ratón - zoom centrado en el cursor
+                    self.camera.zoom_at(1.1 ** event.y, mouse_pos)
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                if (self.test_results is not None and self.test_panel_rect is not None and
+                        self.test_panel_rect.collidepoint(event.pos)):
+                    self.test_results = None  # Cerrar el panel de resultados
+                    continue
+                world_pos = self.camera.screen_to_world(event.pos)
                 if event.button == 1:  # Click izquierdo - añadir conejo
-                    self.add_rabbit(*event.pos)
+                    self.add_rabbit(*world_pos)
                     if self.lcg_button_rect.collidepoint(event.pos):
                         self.run_statistical_tests("LCG")
                     elif self.msq_button_rect.collidepoint(event.pos):
                         self.run_statistical_tests("MiddleSquare")
                     else:
-                        self.add_rabbit(*event.pos)
+                        self.add_rabbit(*world_pos)
                 elif event.button == 3:  # Click derecho - añadir zorro
-                    self.add_fox(*event.pos)
+                    self.add_fox(*world_pos)
                 elif event.button == 2:  # Click medio - añadir comida
-                    self.add_food(*event.pos)
+                    self.add_food(*world_pos)
+
+        # Flechas - desplazar la cámara
+        keys = pygame.key.get_pressed()
+        pan_speed = 15
+        pan_x = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * pan_speed
+        pan_y = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * pan_speed
+        if pan_x or pan_y:
+            self.camera.pan(pan_x, pan_y)
 
     def reset_simulation(self):
-        self.all_sprites.empty()
-        self.rabbits.empty()
-        self.foxes.empty()
-        self.foods.empty()
-        self.rabbit_pop_history = []
-        self.fox_pop_history = []
-        self.food_pop_history = []
+        self.registry.empty()
+        self.history.clear()
+        self.events.reset()
+        if self.heatmap is not None:
+            self.heatmap.clear()
         self.day_night_cycle = 0
         self.season = Season.SPRING
         self.season_timer = 0
+        if self.neighbours is not None:
+            self.neighbours.reset()
         self.initialize_population()
 
     def attempt_reproduction(self, animal1, animal2):
@@ -643,6 +972,7 @@ class Simulation:
                         new_animal = self.add_rabbit(x, y, gender)
                     else:
                         new_animal = self.add_fox(x, y, gender)
+                    self.events.record(BIRTH, new_animal.species, new_animal)
 
                     # Heredar enfermedad si alguno de los padres está enfermo
                     if animal1.sick or animal2.sick:
@@ -698,6 +1028,7 @@ class Simulation:
                                 y = (rabbit1.rect.centery + rabbit2.rect.centery) // 2 + random.randint(-10, 10)
                                 gender = random.choice(list(Gender))
                                 new_rabbit = self.add_rabbit(x, y, gender)
+                                self.events.record(BIRTH, new_rabbit.species, new_rabbit)
                                 # Los hijos heredan la enfermedad de los padres
                                 if rabbit1.sick or rabbit2.sick:
                                     new_rabbit.sick = True
@@ -758,203 +1089,216 @@ class Simulation:
         self.day_night_cycle = (self.day_night_cycle + 0.5) % 360
         night_light = max(0.3, math.sin(math.radians(self.day_night_cycle)) * 0.7 + 0.3)
 
-    def handle_reproduction(self):
-        # Reproducción de conejos
-        reproduced_pairs = set()
-        rabbits_list = list(self.rabbits)
-
-        for i, rabbit1 in enumerate(rabbits_list):
-            if (rabbit1.age < rabbit1.maturity_age or rabbit1.reproduction_cooldown > 0 or
-                    rabbit1.energy < 60 or len(self.rabbits) >= self.params.max_rabbits):
-                continue
+    def group(self, species):
+        """Grupo de una especie por su nombre en interactions.INTERACTIONS"""
+        return {'rabbit': self.rabbits, 'fox': self.foxes, 'food': self.foods}[species]
 
-            for j, rabbit2 in enumerate(rabbits_list[i + 1:], i + 1):
-                if (rabbit2.age < rabbit2.maturity_age or rabbit2.reproduction_cooldown > 0 or
-                        rabbit2.energy < 60 or rabbit1.gender == rabbit2.gender):
-                    continue
-
-                pair = frozenset({id(rabbit1), id(rabbit2)})
-                if pair in reproduced_pairs:
-                    continue
-
-                dist_sq = (rabbit1.rect.centerx - rabbit2.rect.centerx) ** 2 + (
-                        rabbit1.rect.centery - rabbit2.rect.centery) ** 2
-                if dist_sq < self.params.reproduce_distance ** 2:
-                    if random.random() < self.params.rabbit_reproduce_prob:
-                        litter_size = random.randint(*self.params.rabbit_litter_size)
-                        for _ in range(litter_size):
-                            if len(self.rabbits) < self.params.max_rabbits:
-                                x = (rabbit1.rect.centerx + rabbit2.rect.centerx) // 2 + random.randint(-10, 10)
-                                y = (rabbit1.rect.centery + rabbit2.rect.centery) // 2 + random.randint(-10, 10)
-                                gender = random.choice(list(Gender))
-                                self.add_rabbit(x, y, gender)
-
-                        rabbit1.reproduction_cooldown = 100
-                        rabbit2.reproduction_cooldown = 100
-                        rabbit1.energy -= 20
-                        rabbit2.energy -= 20
-                        reproduced_pairs.add(pair)
-                        break
-
-        # Reproducción de zorros
+    def handle_reproduction(self):
+        # Una pasada por cada fila MATES de la tabla de interacciones (conejos y luego zorros)
+        for row in rows(MATES):
+            self.reproduce(row.actor)
+
+    def reproduce(self, species):
+        min_energy, cost, cooldown, prob_field, litter_field, max_field = MATING_RULES[species]
+        group = self.group(species)
+        add = self.add_rabbit if species == 'rabbit' else self.add_fox
+        params = self.params
         reproduced_pairs = set()
-        foxes_list = list(self.foxes)
+        animals = list(group)
 
-        for i, fox1 in enumerate(foxes_list):
-            if (fox1.age < fox1.maturity_age or fox1.reproduction_cooldown > 0 or
-                    fox1.energy < 70 or len(self.foxes) >= self.params.max_foxes):
+        for i, animal1 in enumerate(animals):
+            if (animal1.age < animal1.maturity_age or animal1.reproduction_cooldown > 0 or
+                    animal1.energy < min_energy or len(group) >= getattr(params, max_field)):
                 continue
 
-            for j, fox2 in enumerate(foxes_list[i + 1:], i + 1):
-                if (fox2.age < fox2.maturity_age or fox2.reproduction_cooldown > 0 or
-                        fox2.energy < 70 or fox1.gender == fox2.gender):
+            for animal2 in animals[i + 1:]:
+                if (animal2.age < animal2.maturity_age or animal2.reproduction_cooldown > 0 or
+                        animal2.energy < min_energy or animal1.gender == animal2.gender):
                     continue
 
-                pair = frozenset({id(fox1), id(fox2)})
+                pair = frozenset({id(animal1), id(animal2)})
                 if pair in reproduced_pairs:
                     continue
 
-                dist_sq = (fox1.rect.centerx - fox2.rect.centerx) ** 2 + (fox1.rect.centery - fox2.rect.centery) ** 2
-                if dist_sq < self.params.reproduce_distance ** 2:
-                    if random.random() < self.params.fox_reproduce_prob:
-                        litter_size = random.randint(*self.params.fox_litter_size)
+                dist_sq = (animal1.rect.centerx - animal2.rect.centerx) ** 2 + (
+                        animal1.rect.centery - animal2.rect.centery) ** 2
+                if dist_sq < params.reproduce_distance ** 2:
+                    if random.random() < getattr(params, prob_field):
+                        litter_size = random.randint(*getattr(params, litter_field))
                         for _ in range(litter_size):
-                            if len(self.foxes) < self.params.max_foxes:
-                                x = (fox1.rect.centerx + fox2.rect.centerx) // 2 + random.randint(-10, 10)
-                                y = (fox1.rect.centery + fox2.rect.centery) // 2 + random.randint(-10, 10)
+                            if len(group) < getattr(params, max_field):
+                                x = (animal1.rect.centerx + animal2.rect.centerx) // 2 + random.randint(-10, 10)
+                                y = (animal1.rect.centery + animal2.rect.centery) // 2 + random.randint(-10, 10)
                                 gender = random.choice(list(Gender))
-                                self.add_fox(x, y, gender)
+                                child = add(x, y, gender)
+                                self.events.record(BIRTH, child.species, child)
 
-                        fox1.reproduction_cooldown = 200
-                        fox2.reproduction_cooldown = 200
-                        fox1.energy -= 30
-                        fox2.energy -= 30
+                        animal1.reproduction_cooldown = cooldown
+                        animal2.reproduction_cooldown = cooldown
+                        animal1.energy -= cost
+                        animal2.energy -= cost
                         reproduced_pairs.add(pair)
                         break
 
     def handle_feeding(self):
-        # Zorros comen conejos
-        for fox in self.foxes:
-            for rabbit in pygame.sprite.spritecollide(fox, self.rabbits, dokill=False):
-                if rabbit.rect.colliderect(fox.rect.inflate(-5, -5)):
-                    rabbit.kill()
-                    fox.energy = min(100, fox.energy + 30)
-                    fox.time_since_food = 0
-
-        # Conejos comen comida
-        for rabbit in self.rabbits:
-            for food in pygame.sprite.spritecollide(rabbit, self.foods, dokill=False):
-                if food.rect.colliderect(rabbit.rect.inflate(-5, -5)):
-                    rabbit.energy = min(100, rabbit.energy + food.nutrition)
-                    rabbit.time_since_food = 0
-                    food.kill()
+        # Una pasada por cada fila EATS de la tabla, los depredadores antes que sus presas.
+        # Contactos con una rejilla del tamaño de los sprites; si dos cazadores alcanzan
+        # la misma presa gana el más cercano y, a igual distancia, el primero del grupo
+        for row in feeding_order():
+            for hunter, prey in resolve_contacts(self.group(row.actor), self.group(row.target)):
+                hunter.energy = min(100, hunter.energy + prey.nutrition)
+                hunter.time_since_food = 0
+                prey.eaten()
 
     def spawn_food(self):
         if random.random() < self.params.food_respawn_rate / 100:
             # Añadir comida en grupos durante la primavera/verano
             if self.season in (Season.SPRING, Season.SUMMER) and random.random() < 0.3:
                 cluster_size = random.randint(3, 10)
-                center_x, center_y = random.randint(50, WIDTH - 50), random.randint(50, HEIGHT - 50)
+                world_width, world_height = self.params.world_width, self.params.world_height
+                # Margen de 50 px, o la mitad del mundo si es más pequeño
+                margin_x, margin_y = min(50, world_width // 2), min(50, world_height // 2)
+                center_x = random.randint(margin_x, world_width - margin_x)
+                center_y = random.randint(margin_y, world_height - margin_y)
                 for _ in range(cluster_size):
                     x = center_x + random.randint(-40, 40)
                     y = center_y + random.randint(-40, 40)
-                    if 0 <= x <= WIDTH and 0 <= y <= HEIGHT:
+                    if 0 <= x <= world_width and 0 <= y <= world_height:
                         self.add_food(x, y)
             else:
                 self.add_food()
 
     def update_stats(self):
-        self.rabbit_pop_history.append(len(self.rabbits))
-        self.fox_pop_history.append(len(self.foxes))
-        self.food_pop_history.append(len(self.foods))
+        self.history.append((len(self.rabbits), len(self.foxes), len(self.foods)))
 
-        # Mantener un tamaño razonable para el historial
-        if len(self.rabbit_pop_history) > 500:
-            self.rabbit_pop_history.pop(0)
-            self.fox_pop_history.pop(0)
-            self.food_pop_history.pop(0)
+    def zoom_graph(self, direction):
+        """Rueda hacia arriba: rango más corto; hacia abajo: más largo (hasta toda la corrida)"""
+        index = min(max(self.graph_span_index - direction, 0), len(GRAPH_SPANS) - 1)
+        if index != self.graph_span_index:
+            self.graph_span_index = index
+            self._graph_surface = None
 
     def draw_stats(self):
+        level = self.quality.level if self.quality is not None else None
+
         # Fondo semitransparente para los textos
-        s = pygame.Surface((300, 280), pygame.SRCALPHA)
+        s = pygame.Surface((300, 300), pygame.SRCALPHA)
         s.fill((0, 0, 0, 128))
         self.screen.blit(s, (10, 10))
 
-        # Textos informativos
-        texts = [
-            f"Conejos: {len(self.rabbits)}",
-            f"Zorros: {len(self.foxes)}",
-            f"Comida: {len(self.foods)}",
-            f"Estación: {self.season.name}",
-            f"Día/Noche: {'Día' if math.sin(math.radians(self.day_night_cycle)) > 0 else 'Noche'}",
-            f"Velocidad: {self.params.rabbit_speed:.1f}/{self.params.fox_speed:.1f}",
-            "[ESPACIO] Pausa  [S] Estadísticas",
-            "[R] Reiniciar  [+/-] Velocidad",
-            "Click: Añadir conejo/zorro/comida"
-        ]
+        # Textos informativos (con calidad reducida se renderizan cada pocos frames)
+        text_interval = level.text_interval if level else 1
+        if self._overlay_surface is None or self.frame % text_interval == 0:
+            self._overlay_surface = self.render_overlay_text(level is None or level.full_text)
+        self.screen.blit(self._overlay_surface, (20, 20))
 
-        for i, text in enumerate(texts):
-            text_surface = FONT.render(text, True, WHITE)
-            self.screen.blit(text_surface, (20, 20 + i * 20))
-
-        self.lcg_button_rect = pygame.Rect(20, 200, 200, 40)
-        self.msq_button_rect = pygame.Rect(20, 240, 200, 40)
+        self.lcg_button_rect = pygame.Rect(20, 220, 200, 40)
+        self.msq_button_rect = pygame.Rect(20, 260, 200, 40)
 
         # Botón para pruebas LCG
         pygame.draw.rect(self.screen, (70, 180, 70), self.lcg_button_rect)
-        lcg_text = FONT.render("Pruebas LCG", True, WHITE)
+        lcg_text = get_font().render("Pruebas LCG", True, WHITE)
         self.screen.blit(lcg_text, (self.lcg_button_rect.x + 10, self.lcg_button_rect.y + 10))
 
         # Botón para pruebas MiddleSquare
         pygame.draw.rect(self.screen, (180, 70, 70), self.msq_button_rect)
-        msq_text = FONT.render("Pruebas MiddleSquare", True, WHITE)
+        msq_text = get_font().render("Pruebas MiddleSquare", True, WHITE)
         self.screen.blit(msq_text, (self.msq_button_rect.x + 10, self.msq_button_rect.y + 10))
 
         # Gráfico de población
-        if len(self.rabbit_pop_history) > 10:
-            graph_width, graph_height = 280, 100
-            graph_x, graph_y = WIDTH - graph_width - 20, 20
-
-            # Fondo del gráfico
-            s = pygame.Surface((graph_width, graph_height), pygame.SRCALPHA)
-            s.fill((0, 0, 0, 128))
-            self.screen.blit(s, (graph_x, graph_y))
-
-            max_pop = max(max(self.rabbit_pop_history), max(self.fox_pop_history), max(self.food_pop_history), 1)
-
-            for i in range(0, max_pop + 1, max(1, max_pop // 5)):
-                y_pos = graph_y + graph_height - (i / max_pop) * graph_height
-                pygame.draw.line(self.screen, (100, 100, 100, 150),
-                                 (graph_x, y_pos), (graph_x + graph_width, y_pos), 1)
-                text = FONT.render(str(i), True, WHITE)
-                self.screen.blit(text, (graph_x - 25, y_pos - 8))
-
-            points_r = []
-            points_f = []
-            points_food = []
-
-            for i in range(len(self.rabbit_pop_history)):
-                x = graph_x + (i / len(self.rabbit_pop_history)) * graph_width
-                y_r = graph_y + graph_height - (self.rabbit_pop_history[i] / max_pop) * graph_height
-                y_f = graph_y + graph_height - (self.fox_pop_history[i] / max_pop) * graph_height
-                y_food = graph_y + graph_height - (self.food_pop_history[i] / max_pop) * graph_height
-
-                points_r.append((x, y_r))
-                points_f.append((x, y_f))
-                points_food.append((x, y_food))
-
-            if len(points_r) > 1:
-                pygame.draw.lines(self.screen, YELLOW, False, points_r, 2)
-                pygame.draw.lines(self.screen, RED, False, points_f, 2)
-                pygame.draw.lines(self.screen, GREEN, False, points_food, 2)
-
-            pygame.draw.rect(self.screen, YELLOW, (graph_x + 10, graph_y + 10, 10, 10))
-            pygame.draw.rect(self.screen, RED, (graph_x + 10, graph_y + 30, 10, 10))
-            pygame.draw.rect(self.screen, GREEN, (graph_x + 10, graph_y + 50, 10, 10))
-
-            self.screen.blit(FONT.render("Conejos", True, WHITE), (graph_x + 25, graph_y + 8))
-            self.screen.blit(FONT.render("Zorros", True, WHITE), (graph_x + 25, graph_y + 28))
-            self.screen.blit(FONT.render("Comida", True, WHITE), (graph_x + 25, graph_y + 48))
+        if len(self.history) > 10:
+            graph_interval = level.graph_interval if level else 1
+            if self._graph_surface is None or self.frame % graph_interval == 0:
+                self._graph_surface = self.render_population_graph()
+            self.screen.blit(self._graph_surface, self.graph_rect.topleft)
+
+        # Nacimientos y muertes por causa (conejos/zorros), bajo el gráfico
+        if self.events is not None:
+            if self._events_surface is None or self.frame % text_interval == 0:
+                text = get_font().render(self.events.summary(), True, WHITE)
+                self._events_surface = pygame.Surface((text.get_width() + 8, text.get_height() + 4),
+                                                      pygame.SRCALPHA)
+                self._events_surface.fill((0, 0, 0, 128))
+                self._events_surface.blit(text, (4, 2))
+            self.screen.blit(self._events_surface,
+                             (self.graph_rect.right - self._events_surface.get_width(), self.graph_rect.bottom + 4))
+
+    def render_overlay_text(self, full=True):
+        texts = [
+            f"Conejos: {len(self.rabbits)}",
+            f"Zorros: {len(self.foxes)}",
+            f"Comida: {len(self.foods)}",
+        ]
+        if full:
+            texts += [
+                f"Estación: {self.season.name}",
+                f"Día/Noche: {'Día' if math.sin(math.radians(self.day_night_cycle)) > 0 else 'Noche'}",
+                f"Velocidad: {self.params.rabbit_speed:.1f}/{self.params.fox_speed:.1f}",
+                "[ESPACIO] Pausa  [S] Estadísticas  [H] Calor",
+                "[R] Reiniciar  [+/-] Velocidad",
+                "Click: Añadir conejo/zorro/comida",
+                "[Flechas/Rueda] Cámara  [Inicio] Ver todo"
+            ]
+        if self.quality is not None:
+            texts.append(self.quality.status())
+
+        surface = pygame.Surface((280, 200), pygame.SRCALPHA)
+        for i, text in enumerate(texts):
+            text_surface = get_font().render(text, True, WHITE)
+            surface.blit(text_surface, (0, i * 18))
+        return surface
+
+    def render_population_graph(self):
+        """
+        Gráfico de población en una superficie propia (con margen a la izquierda para las
+        etiquetas). Dibuja como mucho GRAPH_WIDTH columnas sea cual sea el rango: la
+        media como línea y, si cada columna resume varios ticks, el mínimo y el máximo
+        como banda.
+        """
+        graph_width, graph_height = GRAPH_WIDTH, GRAPH_HEIGHT
+        surface = pygame.Surface((graph_width + GRAPH_MARGIN, graph_height + 20), pygame.SRCALPHA)
+        graph_x, graph_y = GRAPH_MARGIN, 10
+
+        # Fondo del gráfico
+        surface.fill((0, 0, 0, 128), (graph_x, graph_y, graph_width, graph_height))
+
+        span = GRAPH_SPANS[self.graph_span_index]
+        covered, mins, maxs, means = self.history.window(span, graph_width)
+        columns = len(means)
+        max_pop = max(int(maxs.max()) if columns else 0, 1)
+
+        for i in range(0, max_pop + 1, max(1, max_pop // 5)):
+            y_pos = graph_y + graph_height - (i / max_pop) * graph_height
+            pygame.draw.line(surface, (100, 100, 100),
+                             (graph_x, y_pos), (graph_x + graph_width, y_pos), 1)
+            text = get_font().render(str(i), True, WHITE)
+            surface.blit(text, (graph_x - 25, y_pos - 8))
+
+        if columns > 1:
+            xs = [graph_x + (i / (columns - 1)) * graph_width for i in range(columns)]
+            scale = graph_height / max_pop
+            bottom = graph_y + graph_height
+            banded = covered > columns
+            for series, color in enumerate((YELLOW, RED, GREEN)):
+                if banded:
+                    upper = [(x, bottom - v * scale) for x, v in zip(xs, maxs[:, series].tolist())]
+                    lower = [(x, bottom - v * scale) for x, v in zip(xs, mins[:, series].tolist())]
+                    pygame.draw.polygon(surface, (*color, 90), upper + lower[::-1])
+                points = [(x, bottom - v * scale) for x, v in zip(xs, means[:, series].tolist())]
+                pygame.draw.lines(surface, color, False, points, 2)
+
+        pygame.draw.rect(surface, YELLOW, (graph_x + 10, graph_y + 10, 10, 10))
+        pygame.draw.rect(surface, RED, (graph_x + 10, graph_y + 30, 10, 10))
+        pygame.draw.rect(surface, GREEN, (graph_x + 10, graph_y + 50, 10, 10))
+
+        surface.blit(get_font().render("Conejos", True, WHITE), (graph_x + 25, graph_y + 8))
+        surface.blit(get_font().render("Zorros", True, WHITE), (graph_x + 25, graph_y + 28))
+        surface.blit(get_font().render("Comida", True, WHITE), (graph_x + 25, graph_y + 48))
+
+        label = "Toda la corrida" if span is None else f"Últimos {span:,} ticks"
+        label = get_font().render(f"{label} ({covered:,})  [rueda: zoom]", True, WHITE)
+        surface.blit(label, (graph_x + graph_width - label.get_width() - 4, graph_y + graph_height - 16))
+        return surface
 
     def draw_environment(self):
         # Fondo con gradiente según la estación
@@ -976,46 +1320,205 @@ class Simulation:
         top_color = tuple(int(c * night_factor) for c in top_color)
         bottom_color = tuple(int(c * night_factor) for c in bottom_color)
 
-        # Dibujar gradiente vertical
-        for y in range(HEIGHT):
+        # Dibujar gradiente vertical (en franjas o plano si el gobernador bajó la calidad)
+        band = self.quality.level.gradient_band if self.quality is not None else 1
+        if band == 0:
+            self.screen.fill(tuple((t + b) // 2 for t, b in zip(top_color, bottom_color)))
+            return
+        for y in range(0, HEIGHT, band):
             ratio = y / HEIGHT
             r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
             g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
             b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
-
-    def run(self):
+            if band == 1:
+                pygame.draw.line(self.screen, (r, g, b), (0, y), (WIDTH, y))
+            else:
+                self.screen.fill((r, g, b), (0, y, WIDTH, band))
+
+    def step(self):
+        """Avanza la simulación un tick (sin dibujar)"""
+        clock = time.perf_counter
+        t0 = clock()
+        self.events.tick = self.tick + 1  # Los eventos de este paso llevan el tick que produce
+        self.update_day_night_cycle()
+        self.update_season()
+
+        neighbours = self.neighbours
+        if self.behaviour is not None:
+            # Decisiones con máscaras y un núcleo por comportamiento
+            self.behaviour.update_rabbits(self.rabbits, self.foxes, self.foods)
+            t1 = clock()
+            self.behaviour.update_foxes(self.rabbits, self.foxes)
+            t2 = clock()
+        elif self.buffered is not None:
+            # Todos leen la instantánea del inicio del tick, también los zorros
+            self.buffered.prepare(self.rabbits, self.foxes, self.foods)
+            self.buffered.update_rabbits()
+            t1 = clock()
+            self.buffered.update_foxes()
+            t2 = clock()
+        elif neighbours is not None:
+            # Cada animal solo recorre sus listas de vecinos en caché
+            neighbours.prepare(self.tick, self.rabbits, self.foxes, self.foods)
+            for rabbit in self.rabbits:
+                rabbit.update(*neighbours.for_rabbit(rabbit))
+            t1 = clock()
+            for fox in self.foxes:
+                fox.update(*neighbours.for_fox(fox))
+            t2 = clock()
+        else:
+            # Las consultas leen las listas densas sin copiarlas; el bucle externo recorre
+            # una copia porque un animal que muere sale de la lista durante el recorrido
+            rabbits, foxes, foods = self.rabbits.view(), self.foxes.view(), self.foods.view()
+            # Actualizar conejos con 3 parámetros
+            for rabbit in self.rabbits:
+                rabbit.update(foods, foxes, rabbits)
+            t1 = clock()
+
+            # Actualizar zorros con 2 parámetros
+            for fox in self.foxes:
+                fox.update(rabbits, foxes)
+            t2 = clock()
+
+        self.foods.update()
+        self.handle_feeding()
+        t3 = clock()
+        self.handle_reproduction()
+        t4 = clock()
+        self.spawn_food()
+        self.update_stats()
+        t5 = clock()
+        self.tick += 1
+        self.events.tick = self.tick
+        if self.recorder is not None:
+            self.recorder.record(self.tick, self.rabbits, self.foxes, self.foods,
+                                 self.season.value, self.day_night_cycle)
+        if self.heatmap is not None:
+            self.heatmap.accumulate(self.tick, self.rabbits, self.foxes, self.foods)
+
+        phase_times = self.phase_times
+        phase_times['rabbits'] = (t1 - t0) * 1000
+        phase_times['foxes'] = (t2 - t1) * 1000
+        phase_times['feeding'] = (t3 - t2) * 1000
+        phase_times['reproduction'] = (t4 - t3) * 1000
+        phase_times['spawn_stats'] = (t5 - t4) * 1000
+        if self._last_tick_time is not None and t5 > self._last_tick_time:
+            # Media móvil exponencial de ticks por segundo
+            self.tick_rate = self.tick_rate * 0.9 + 0.1 / (t5 - self._last_tick_time)
+        self._last_tick_time = t5
+        if self.telemetry is not None:
+            self.telemetry.publish(self.snapshot())
+
+    def snapshot(self):
+        """Estado resumido del tick actual (diccionario nuevo, no se modifica después)"""
+        return {
+            "tick": self.tick,
+            "rabbits": len(self.rabbits),
+            "foxes": len(self.foxes),
+            "food": len(self.foods),
+            "season": self.season.name,
+            "tick_rate": round(self.tick_rate, 2),
+            "phase_ms": {name: round(ms, 3) for name, ms in self.phase_times.items()},
+            "neighbour_rebuild_rate": round(self.neighbours.rebuild_rate, 4) if self.neighbours else None,
+            "events": self.events.totals(),
+        }
+
+    def enable_telemetry(self, host="127.0.0.1", port=8765):
+        """Arranca el servidor de telemetría en un hilo aparte"""
+        from telemetry import TelemetryServer
+        self.telemetry = TelemetryServer(host, port)
+        self.telemetry.start()
+        self.telemetry.publish(self.snapshot())
+        return self.telemetry
+
+    def enable_recording(self, path, stride=1):
+        """Graba las trayectorias de todos los agentes cada `stride` ticks (ver trajectory.py)"""
+        from trajectory import TrajectoryRecorder
+        self.recorder = TrajectoryRecorder(path, stride,
+                                           world=(self.params.world_width, self.params.world_height),
+                                           uid=self.entity_uid)
+        self.recorder.record(self.tick, self.rabbits, self.foxes, self.foods,
+                             self.season.value, self.day_night_cycle)
+        return self.recorder
+
+    def entity_uid(self, entity):
+        """Identificador estable de una entidad (lo asigna el registro al insertarla)"""
+        return self.registry.assign(entity)
+
+    def enable_event_log(self, path=None, capacity=1 << 16):
+        """Registra cada nacimiento y muerte (ver events.py); sin ruta solo se guardan los últimos"""
+        return self.events.enable_log(path, capacity)
+
+    def enable_heatmap(self, **options):
+        """Empieza a acumular el mapa de calor de densidad y lo muestra (ver heatmap.py)"""
+        from heatmap import DensityHeatmap
+        self.heatmap = DensityHeatmap(self.params.world_width, self.params.world_height, **options)
+        self.show_heatmap = True
+        return self.heatmap
+
+    def enable_capture(self, path, every=1, fmt="png", queue_size=32):
+        """Guarda uno de cada `every` frames en `path` desde un hilo escritor"""
+        from capture import FrameCapture
+        if self.screen is None:
+            # Sin ventana se dibuja en una superficie fuera de pantalla
+            self.screen = pygame.Surface((WIDTH, HEIGHT))
+        self.capture = FrameCapture(path, every, fmt, queue_size, fps=FPS)
+        return self.capture
+
+    def render(self):
+        # Dibujar (solo los sprites dentro de la vista de la cámara)
+        self.draw_environment()
+        if self.quality is None or self.quality.level.food_sprites:
+            self.camera.draw(self.screen, self.foods)
+        else:
+            # Comida como rectángulos de color debajo de los animales
+            self.camera.draw_rects(self.screen, self.foods)
+        step = self.rotation_step
+        rotated = lambda animal: animal.rotated_image(step)
+        self.camera.draw(self.screen, self.rabbits, rotated)
+        self.camera.draw(self.screen, self.foxes, rotated)
+        if self.show_heatmap and self.heatmap is not None:
+            self.heatmap.draw(self.screen, self.camera, self.tick)
+        self.camera.draw_world_border(self.screen, BLACK)
+
+        if self.show_stats:
+            self.draw_stats()
+
+        self.poll_statistical_tests()
+        self.draw_test_panel()
+
+    def run_headless(self, ticks):
+        """Simula un número fijo de ticks sin ventana ni límite de FPS"""
+        for _ in range(ticks):
+            self.step()
+            if self.capture is not None and self.tick % self.capture.every == 0:
+                self.render()
+                self.capture.capture(self.screen, self.tick)
+
+    def run(self, max_ticks=None):
         while self.running:
             self.handle_events()
 
             if not self.paused:
-                self.update_day_night_cycle()
-                self.update_season()
-
-                # Actualizar conejos con 3 parámetros
-                for rabbit in self.rabbits:
-                    rabbit.update(self.foods, self.foxes, self.rabbits)
-
-                # Actualizar zorros con 2 parámetros
-                for fox in self.foxes:
-                    fox.update(self.rabbits, self.foxes)
-
-                self.foods.update()
-                self.handle_feeding()
-                self.handle_reproduction()
-                self.spawn_food()
-                self.update_stats()
-
-            # Dibujar
-            self.draw_environment()
-            self.all_sprites.draw(self.screen)
-
-            if self.show_stats:
-                self.draw_stats()
-
+                self.step()
+                if max_ticks is not None and self.tick >= max_ticks:
+                    self.running = False
+
+            render_start = time.perf_counter()
+            self.render()
+            if self.capture is not None and not self.paused:
+                self.capture.capture(self.screen, self.tick)
             pygame.display.flip()
+            self.phase_times['render'] = (time.perf_counter() - render_start) * 1000
+            self.frame += 1
+            if self.quality is not None and self.quality.record(self.phase_times):
+                self.rotation_step = self.quality.level.rotation_step
             self.clock.tick(FPS)
 
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.test_executor is not None:
+            self.test_executor.shutdown(wait=False, cancel_futures=True)
         pygame.quit()
 
 
@@ -0,0 +1,355 @@
+import math
+from collections import defaultdict
+
+import pygame
+
+
+def resolve_contacts(hunters, prey, shrink=5):
+    """
+    Pares (cazador, presa) en contacto: el rect de la presa toca el del cazador encogido
+    `shrink` píxeles (la misma prueba que handle_feeding hacía con spritecollide).
+    Las presas se indexan en una rejilla con celdas del tamaño del sprite más grande,
+    así que cada cazador solo mira unas pocas cubetas.
+
+    Si varios cazadores alcanzan la misma presa en el mismo tick se la queda el de
+    centro más cercano; a igual distancia, el primero en el orden de `hunters`.
+    Los pares se devuelven ordenados por cazador y luego por presa.
+    """
+    prey = list(prey)
+    hunters = list(hunters)
+    if not prey or not hunters:
+        return []
+    cell = max(max(p.rect.width, p.rect.height) for p in prey)
+    cell = max(cell, max(max(h.rect.width, h.rect.height) for h in hunters), 1)
+    grid = defaultdict(list)
+    for order, target in enumerate(prey):
+        rect = target.rect
+        for gx in range(rect.left // cell, (rect.right - 1) // cell + 1):
+            for gy in range(rect.top // cell, (rect.bottom - 1) // cell + 1):
+                grid[(gx, gy)].append(order)
+
+    winners = {}
+    for h_order, hunter in enumerate(hunters):
+        mouth = hunter.rect.inflate(-shrink, -shrink)
+        hx, hy = hunter.rect.center
+        seen = set()
+        for gx in range(mouth.left // cell, (mouth.right - 1) // cell + 1):
+            for gy in range(mouth.top // cell, (mouth.bottom - 1) // cell + 1):
+                for p_order in grid.get((gx, gy), ()):
+                    if p_order in seen:
+                        continue
+                    seen.add(p_order)
+                    target = prey[p_order]
+                    if not target.rect.colliderect(mouth):
+                        continue
+                    px, py = target.rect.center
+                    key = ((hx - px) ** 2 + (hy - py) ** 2, h_order)
+                    best = winners.get(p_order)
+                    if best is None or key < best:
+                        winners[p_order] = key
+    pairs = sorted((h_order, p_order) for p_order, (_, h_order) in winners.items())
+    return [(hunters[h_order], prey[p_order]) for h_order, p_order in pairs]
+
+
+def neighbour_pairs(qx, qy, tx, ty, radius):
+    """
+    Versión vectorizada de la rejilla: todos los pares (i, j) con el punto de consulta i
+    a distancia < radius del objetivo j. Devuelve (i, j, distancia²) como arreglos.
+    Los objetivos se ordenan por celda y cada consulta busca en sus 9 celdas vecinas
+    con searchsorted, así que el coste es O((Q + T) log T + pares).
+    """
+    import numpy as np  # Solo la necesitan los motores por lotes
+
+    qx = np.asarray(qx, dtype=np.int64)
+    qy = np.asarray(qy, dtype=np.int64)
+    tx = np.asarray(tx, dtype=np.int64)
+    ty = np.asarray(ty, dtype=np.int64)
+    empty = np.empty(0, dtype=np.int64)
+    if len(qx) == 0 or len(tx) == 0:
+        return empty, empty, empty
+
+    cell = max(1, int(math.ceil(radius)))
+    tcx, tcy = tx // cell, ty // cell
+    origin_x, origin_y = tcx.min() - 1, tcy.min() - 1
+    span = int(tcy.max() - origin_y) + 2
+    keys = (tcx - origin_x) * span + (tcy - origin_y)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    qcx, qcy = qx // cell, qy // cell
+    queries = np.arange(len(qx))
+    found_q, found_t = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            row = qcy + dy - origin_y
+            k = (qcx + dx - origin_x) * span + row
+            lo = np.searchsorted(sorted_keys, k, 'left')
+            hi = np.searchsorted(sorted_keys, k, 'right')
+            counts = np.where((row >= 0) & (row < span), hi - lo, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expande cada rango [lo, hi) en índices consecutivos
+            offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            found_q.append(np.repeat(queries, counts))
+            found_t.append(order[np.arange(total) + offsets])
+    if not found_q:
+        return empty, empty, empty
+
+    qi = np.concatenate(found_q)
+    tj = np.concatenate(found_t)
+    d2 = (qx[qi] - tx[tj]) ** 2 + (qy[qi] - ty[tj]) ** 2
+    close = d2 < radius * radius
+    return qi[close], tj[close], d2[close]
+
+
+class CellIndex:
+    """
+    El índice de neighbour_pairs construido una vez para varias consultas: los puntos
+    de todos los grupos (p. ej. especies) se ordenan juntos por (grupo, celda) y cada
+    consulta busca solo en un grupo, en tantas celdas alrededor como pida su radio.
+    """
+    def __init__(self, xs, ys, groups, cell):
+        import numpy as np
+
+        self.cell = max(1, int(math.ceil(cell)))
+        self.xs = np.asarray(xs, dtype=np.int64)
+        self.ys = np.asarray(ys, dtype=np.int64)
+        groups = np.asarray(groups, dtype=np.int64)
+        if not len(self.xs):
+            self.order = self.sorted_keys = np.empty(0, dtype=np.int64)
+            return
+        cx, cy = self.xs // self.cell, self.ys // self.cell
+        self.origin_x, self.origin_y = cx.min(), cy.min()
+        self.span = int(cy.max() - self.origin_y) + 1
+        self.columns = int(cx.max() - self.origin_x) + 1
+        keys = (groups * self.columns + (cx - self.origin_x)) * self.span + (cy - self.origin_y)
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def pairs(self, qx, qy, group, radius):
+        """Como neighbour_pairs contra los puntos del grupo `group` (índices de los puntos originales)"""
+        import numpy as np
+
+        qx = np.asarray(qx, dtype=np.int64)
+        qy = np.asarray(qy, dtype=np.int64)
+        empty = np.empty(0, dtype=np.int64)
+        if len(qx) == 0 or len(self.order) == 0:
+            return empty, empty, empty
+
+        reach = int(math.ceil(radius / self.cell))
+        qcx, qcy = qx // self.cell - self.origin_x, qy // self.cell - self.origin_y
+        # Las celdas de una columna tienen claves consecutivas: una búsqueda por franja
+        first_row = np.clip(qcy - reach, 0, self.span - 1)
+        last_row = np.clip(qcy + reach, 0, self.span - 1)
+        rows_inside = (qcy + reach >= 0) & (qcy - reach < self.span)
+        queries = np.arange(len(qx))
+        found_q, found_t = [], []
+        for dx in range(-reach, reach + 1):
+            col = qcx + dx
+            base = (group * self.columns + col) * self.span
+            lo = np.searchsorted(self.sorted_keys, base + first_row, 'left')
+            hi = np.searchsorted(self.sorted_keys, base + last_row, 'right')
+            counts = np.where(rows_inside & (col >= 0) & (col < self.columns), hi - lo, 0)
+            total = int(counts.sum())
+            if not total:
+                continue
+            # Expande cada rango [lo, hi) en índices consecutivos
+            offsets = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            found_q.append(np.repeat(queries, counts))
+            found_t.append(self.order[np.arange(total) + offsets])
+        if not found_q:
+            return empty, empty, empty
+
+        qi = np.concatenate(found_q)
+        tj = np.concatenate(found_t)
+        d2 = (qx[qi] - self.xs[tj]) ** 2 + (qy[qi] - self.ys[tj]) ** 2
+        close = d2 < radius * radius
+        return qi[close], tj[close], d2[close]
+
+
+class NeighbourLists:
+    """
+    Listas de vecinos de Verlet. Cada animal guarda los candidatos (comida, zorros,
+    conejos) dentro de su radio de interacción + `skin`. Al reconstruir, todas las
+    especies van a un único CellIndex y las listas de todos los animales salen de una
+    consulta por fila de la tabla de interacciones (interactions.INTERACTIONS).
+    Mientras ningún animal se haya desplazado más de skin/2 desde la construcción
+    las listas siguen conteniendo a todos los vecinos reales, así que las consultas
+    de comportamiento solo recorren esas listas cortas.
+
+    Un animal fuera del mundo (al huir o perseguir no se recorta su posición) puede
+    saltar al borde en su siguiente move_randomly, así que se ancla en dos puntos:
+    su centro y el centro recortado al mundo.
+
+    Las entidades creadas después de la última construcción se añaden a todas
+    las consultas hasta la siguiente reconstrucción. El resultado conserva el orden
+    del grupo de sprites, de modo que los empates se resuelven igual que en el
+    recorrido completo; si el grupo movió entidades de posición desde la
+    construcción (el swap-remove de registry.SpeciesStore), se reordena por la
+    posición actual.
+    """
+    KINDS = ('food', 'fox', 'rabbit')
+
+    def __init__(self, params, skin=30, max_age=50, max_pending=256):
+        self.params = params
+        self.skin = skin
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.index = None
+        self.pending = {kind: [] for kind in self.KINDS}
+        self.groups = {}
+        self.moves = {}
+        self.build_id = 0
+        self.built_tick = None
+        self.ticks = 0
+        self.rebuilds = 0
+
+    @property
+    def rebuild_rate(self):
+        """Fracción de ticks en los que hubo que reconstruir las listas"""
+        return self.rebuilds / self.ticks if self.ticks else 0.0
+
+    def reset(self):
+        self.index = None
+        self.pending = {kind: [] for kind in self.KINDS}
+        self.built_tick = None
+
+    def added(self, kind, entity):
+        self.pending[kind].append(entity)
+
+    def _update_queries(self):
+        """(especie, radio) de las consultas de cada actor según la tabla de interacciones"""
+        from interactions import queries_for, vision_radius  # interactions.py importa este módulo
+        self.vision = vision_radius(self.params)
+        self.queries = {actor: queries_for(actor, self.params) for actor in ('rabbit', 'fox')}
+
+    def _max_step(self):
+        """Desplazamiento máximo de un animal dentro de un mismo tick (sin contar el recorte al mundo)"""
+        speed = max(self.params.rabbit_speed, self.params.fox_speed)
+        return speed * 1.5 + 2
+
+    def _world(self):
+        return pygame.Rect(0, 0, self.params.world_width, self.params.world_height)
+
+    def _anchors(self, entity, world):
+        rect = entity.rect
+        if world.contains(rect):
+            return (rect.center,)
+        return rect.center, rect.clamp(world).center
+
+    def prepare(self, tick, rabbits, foxes, foods):
+        """Se llama al inicio de cada tick: reconstruye las listas si ya no son válidas"""
+        self.ticks += 1
+        self._update_queries()
+        if self._needs_rebuild(tick, rabbits, foxes):
+            self._rebuild(tick, rabbits, foxes, foods)
+
+    def _needs_rebuild(self, tick, rabbits, foxes):
+        if self.built_tick is None or tick - self.built_tick >= self.max_age:
+            return True
+        if sum(len(p) for p in self.pending.values()) > self.max_pending:
+            return True
+        # Margen para el movimiento del propio tick, que ocurre antes de la siguiente comprobación
+        limit = self.skin / 2 - self._max_step()
+        limit_sq = max(limit, 0) ** 2
+        build_id = self.build_id
+        world = self._world()
+        for group in (rabbits, foxes):
+            for animal in group:
+                ref = animal.__dict__.get('_verlet')
+                if ref is None or ref[0] != build_id:
+                    continue
+                anchors = ref[1]
+                for x, y in self._anchors(animal, world):
+                    if all((x - ax) ** 2 + (y - ay) ** 2 > limit_sq for ax, ay in anchors):
+                        return True
+        return False
+
+    def _rebuild(self, tick, rabbits, foxes, foods):
+        import numpy as np
+
+        world = self._world()
+        self.groups = {'food': foods, 'fox': foxes, 'rabbit': rabbits}
+        # Orden de cada entidad en su grupo al construir (el orden de los resultados)
+        self.entities = {kind: list(group) for kind, group in self.groups.items()}
+        xs, ys, kinds, orders = [], [], [], []
+        for code, kind in enumerate(self.KINDS):
+            for order, entity in enumerate(self.entities[kind]):
+                # La comida se indexa por su centro; los animales por sus anclas
+                points = (entity.rect.center,) if kind == 'food' else self._anchors(entity, world)
+                for x, y in points:
+                    xs.append(x)
+                    ys.append(y)
+                    kinds.append(code)
+                    orders.append(order)
+        self.index = CellIndex(xs, ys, kinds, self.vision + self.skin)
+        self.orders = np.asarray(orders, dtype=np.int64)
+        self.pending = {kind: [] for kind in self.KINDS}
+        self.moves = {kind: getattr(group, 'moves', 0) for kind, group in self.groups.items()}
+        self.build_id += 1
+        self.built_tick = tick
+        self.rebuilds += 1
+
+        # Las listas de todos los animales de una vez: una consulta por fila de la tabla
+        for actor in ('rabbit', 'fox'):
+            animals = self.entities[actor]
+            anchors = [self._anchors(animal, world) for animal in animals]
+            owner = np.repeat(np.arange(len(animals)), [len(a) for a in anchors])
+            qx = [x for points in anchors for x, _ in points]
+            qy = [y for points in anchors for _, y in points]
+            columns = [self._batch(owner, qx, qy, kind, radius + self.skin, len(animals))
+                       for kind, radius in self.queries[actor]]
+            for i, animal in enumerate(animals):
+                animal._verlet = (self.build_id, anchors[i], tuple(column[i] for column in columns))
+
+    def _batch(self, owner, qx, qy, kind, radius, n):
+        """Para cada uno de los n animales, las entidades de `kind` a menos de radius de alguna de sus anclas"""
+        import numpy as np
+
+        targets = self.entities[kind]
+        qi, tj, _ = self.index.pairs(qx, qy, self.KINDS.index(kind), radius)
+        # Una entidad vista desde dos anclas (o por dos de sus anclas) cuenta una vez
+        keys = np.unique(owner[qi] * max(len(targets), 1) + self.orders[tj])
+        bounds = np.searchsorted(keys, np.arange(n + 1) * max(len(targets), 1)).tolist()
+        found = (keys % max(len(targets), 1)).tolist()
+        return [[targets[j] for j in found[bounds[i]:bounds[i + 1]]] for i in range(n)]
+
+    def _query(self, kind, anchors, radius):
+        import numpy as np
+
+        return self._batch(np.zeros(len(anchors), dtype=np.int64), [x for x, _ in anchors],
+                           [y for _, y in anchors], kind, radius, 1)[0]
+
+    def _lists(self, animal, queries):
+        """Listas en caché del animal (las de los nacidos tras la reconstrucción se construyen al pedirlas)"""
+        ref = animal.__dict__.get('_verlet')
+        if ref is None or ref[0] != self.build_id:
+            anchors = self._anchors(animal, self._world())
+            lists = tuple(self._query(kind, anchors, radius + self.skin) for kind, radius in queries)
+            ref = animal._verlet = (self.build_id, anchors, lists)
+        return ref[2]
+
+    def _current(self, cached, kind):
+        result = [entity for entity in cached if entity.alive()]
+        pending = self.pending[kind]
+        if pending:
+            result.extend(entity for entity in pending if entity.alive())
+        group = self.groups[kind]
+        if getattr(group, 'moves', 0) != self.moves[kind]:
+            result.sort(key=group.slot_of)
+        return result
+
+    def for_actor(self, actor, animal):
+        """Argumentos del update del animal: una lista de vecinos por fila de la tabla"""
+        queries = self.queries[actor]
+        lists = self._lists(animal, queries)
+        return tuple(self._current(cached, kind) for cached, (kind, _) in zip(lists, queries))
+
+    def for_rabbit(self, rabbit):
+        """Argumentos de Rabbit.update: (comida, zorros, conejos) cercanos"""
+        return self.for_actor('rabbit', rabbit)
+
+    def for_fox(self, fox):
+        """Argumentos de Fox.update: (conejos, zorros) cercanos"""
+        return self.for_actor('fox', fox)
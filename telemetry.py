@@ -0,0 +1,154 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class TelemetryServer:
+    """
+    Servidor local (asyncio en un hilo en segundo plano) que expone el último
+    resumen de la simulación como JSON por HTTP (GET /stats) y lo envía en vivo
+    por WebSocket (GET /ws).
+
+    La simulación llama a publish() una vez por tick: solo reemplaza una
+    referencia, así que el bucle principal nunca espera a los clientes.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, push_interval=0.1):
+        self.host = host
+        self.port = port
+        self.push_interval = push_interval
+        self._snapshot = {}
+        self._sequence = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def publish(self, snapshot):
+        """Publica un resumen nuevo. El diccionario no debe modificarse después"""
+        self._snapshot = snapshot
+        self._sequence += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name="telemetry", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_client, self.host, self.port))
+        # Si se pidió el puerto 0 se guarda el que asignó el sistema
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    async def _handle_client(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            elif path in ("/", "/stats"):
+                self._respond(writer, "200 OK", json.dumps(self._snapshot).encode())
+            else:
+                self._respond(writer, "404 Not Found", b'{"error": "not found"}')
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, body):
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: application/json\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body)
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+        await writer.drain()
+
+        # Se lee en paralelo para detectar el cierre del cliente
+        closed = asyncio.ensure_future(self._wait_for_close(reader))
+        last_sequence = -1
+        try:
+            while not closed.done():
+                if self._sequence != last_sequence:
+                    last_sequence = self._sequence
+                    writer.write(self._text_frame(json.dumps(self._snapshot)))
+                    await writer.drain()
+                await asyncio.sleep(self.push_interval)
+        finally:
+            closed.cancel()
+
+    @staticmethod
+    async def _wait_for_close(reader):
+        """Consume las tramas del cliente hasta que cierre la conexión"""
+        try:
+            await TelemetryServer._read_frames(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+    @staticmethod
+    async def _read_frames(reader):
+        while True:
+            header = await reader.readexactly(2)
+            opcode = header[0] & 0x0F
+            length = header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", await reader.readexactly(8))[0]
+            if header[1] & 0x80:
+                await reader.readexactly(4)  # Máscara
+            await reader.readexactly(length)
+            if opcode == 0x8:
+                return
+
+    @staticmethod
+    def _text_frame(text):
+        payload = text.encode()
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x81, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, length)
+        return header + payload
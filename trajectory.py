@@ -0,0 +1,223 @@
+"""
+Grabación de trayectorias por agente en archivos memory-mapped.
+
+Cada muestra es un registro de ancho fijo (RECORD_DTYPE) en `<ruta>.traj`, que crece
+por bloques de `chunk_records` registros. El índice `<ruta>.traj.idx` guarda, por
+cada tick muestreado, dónde empiezan sus registros y cuántos son (más la estación y
+el ciclo día/noche), así que cualquier rango de ticks se lee como una vista del
+memmap sin cargar el archivo completo. El índice también lleva la población de cada
+especie, así que las series de población no necesitan recorrer los registros.
+`<ruta>.traj.json` describe el formato.
+"""
+import json
+import os
+
+import numpy as np
+
+SPECIES_RABBIT, SPECIES_FOX, SPECIES_FOOD = 0, 1, 2
+SPECIES_NAMES = ("rabbit", "fox", "food")
+
+RECORD_DTYPE = np.dtype([
+    ("tick", "<u4"),
+    ("id", "<u4"),
+    ("species", "u1"),
+    ("behaviour", "u1"),  # Para la comida: su color, índice en simulation.FOOD_COLORS
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("energy", "<f4"),  # Para la comida: su valor nutritivo
+    ("health", "<f4"),
+])
+
+INDEX_DTYPE = np.dtype([
+    ("tick", "<i8"),
+    ("start", "<i8"),
+    ("count", "<i8"),
+    ("season", "<i2"),
+    ("day_night", "<f4"),
+    ("rabbits", "<i4"),
+    ("foxes", "<i4"),
+    ("food", "<i4"),
+])
+
+
+def _paths(path):
+    base = path if path.endswith(".traj") else path + ".traj"
+    return base, base + ".idx", base + ".json"
+
+
+class TrajectoryRecorder:
+    """
+    `record(tick, rabbits, foxes, foods)` añade una muestra cada `stride` ticks.
+    Los agentes reciben un `uid` estable la primera vez que se graban (la misma
+    convención que usan las teselas de parallel.py); `uid` permite compartir la
+    numeración con otro registro (los eventos de Simulation).
+    """
+    def __init__(self, path, stride=1, chunk_records=1 << 18, record_food=True, world=None, uid=None):
+        self.path, self.index_path, self.meta_path = _paths(path)
+        self.stride = max(1, stride)
+        self.world = world
+        self.chunk_records = chunk_records
+        self.record_food = record_food
+        self.count = 0
+        self.samples = 0
+        self.next_uid = 0
+        self.assign_uid = uid if uid is not None else self._uid
+        self.capacity = 0
+        self._data = None
+        open(self.path, "wb").close()
+        self._index = open(self.index_path, "wb")
+        self._grow(chunk_records)
+
+    def _grow(self, needed):
+        """Amplía el archivo al siguiente múltiplo de chunk_records y vuelve a mapearlo"""
+        capacity = -(-needed // self.chunk_records) * self.chunk_records
+        if self._data is not None:
+            self._data.flush()
+            del self._data
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * RECORD_DTYPE.itemsize)
+        self._data = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def _uid(self, entity):
+        uid = getattr(entity, "uid", None)
+        if uid is None:
+            uid = entity.uid = self.next_uid
+            self.next_uid += 1
+        return uid
+
+    def record(self, tick, rabbits, foxes, foods=(), season=0, day_night=0.0):
+        if tick % self.stride:
+            return False
+        groups = [(SPECIES_RABBIT, list(rabbits)), (SPECIES_FOX, list(foxes))]
+        if self.record_food:
+            groups.append((SPECIES_FOOD, list(foods)))
+        total = sum(len(entities) for _, entities in groups)
+        if self.count + total > self.capacity:
+            self._grow(self.count + total)
+
+        start = self.count
+        block = self._data[start:start + total]
+        block["tick"] = tick
+        offset = 0
+        for species, entities in groups:
+            n = len(entities)
+            if not n:
+                continue
+            rows = block[offset:offset + n]
+            rows["species"] = species
+            rows["id"] = np.fromiter((self.assign_uid(e) for e in entities), np.uint32, n)
+            rows["x"] = np.fromiter((e.rect.centerx for e in entities), np.int32, n)
+            rows["y"] = np.fromiter((e.rect.centery for e in entities), np.int32, n)
+            if species == SPECIES_FOOD:
+                from simulation import FOOD_COLORS
+
+                colors = {color: i for i, color in enumerate(FOOD_COLORS)}
+                rows["energy"] = np.fromiter((e.nutrition for e in entities), np.float32, n)
+                rows["health"] = 0
+                rows["behaviour"] = np.fromiter((colors.get(tuple(e.color), 0) for e in entities), np.uint8, n)
+            else:
+                rows["energy"] = np.fromiter((e.energy for e in entities), np.float32, n)
+                rows["health"] = np.fromiter((e.health for e in entities), np.float32, n)
+                rows["behaviour"] = np.fromiter((e.behaviour.value for e in entities), np.uint8, n)
+            offset += n
+
+        counts = [len(entities) for _, entities in groups] + [0] * (3 - len(groups))
+        entry = np.array([(tick, start, total, season, day_night, *counts)], dtype=INDEX_DTYPE)
+        self._index.write(entry.tobytes())
+        self.count += total
+        self.samples += 1
+        return True
+
+    def close(self):
+        """Recorta el archivo a los registros escritos y guarda la descripción del formato"""
+        if self._data is None:
+            return
+        self._data.flush()
+        del self._data
+        self._data = None
+        self._index.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.count * RECORD_DTYPE.itemsize)
+        from simulation import Behaviour
+        meta = {
+            "records": self.count,
+            "samples": self.samples,
+            "stride": self.stride,
+            "record_dtype": RECORD_DTYPE.descr,
+            "index_dtype": INDEX_DTYPE.descr,
+            "species": list(SPECIES_NAMES),
+            "behaviours": [b.name for b in Behaviour],
+        }
+        if self.world is not None:
+            meta["world_width"], meta["world_height"] = self.world
+        with open(self.meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """Acceso de solo lectura: los registros y el índice se mapean, no se cargan"""
+    def __init__(self, path):
+        self.path, self.index_path, self.meta_path = _paths(path)
+        self.index = (np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r")
+                      if os.path.getsize(self.index_path) else np.zeros(0, dtype=INDEX_DTYPE))
+        count = int(self.index["start"][-1] + self.index["count"][-1]) if len(self.index) else 0
+        self.records = (np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+                        if count else np.zeros(0, dtype=RECORD_DTYPE))
+        self.ticks = self.index["tick"]
+        self.meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+
+    def __len__(self):
+        """Número de ticks muestreados"""
+        return len(self.index)
+
+    def populations(self):
+        """Arreglo (muestras, 3) con conejos, zorros y comida de cada muestra"""
+        return np.stack([self.index["rabbits"], self.index["foxes"], self.index["food"]], axis=1)
+
+    def sample(self, position):
+        """Registros de la muestra número `position` (vista del memmap)"""
+        entry = self.index[position]
+        return self.records[entry["start"]:entry["start"] + entry["count"]]
+
+    def position_of(self, tick):
+        """Muestra más reciente con tick <= `tick` (0 si es anterior a la primera)"""
+        return max(0, int(np.searchsorted(self.ticks, tick, side="right")) - 1)
+
+    def at(self, tick):
+        return self.sample(self.position_of(tick))
+
+    def tick_range(self, start, stop):
+        """Registros de los ticks en [start, stop) como una sola vista contigua"""
+        first = int(np.searchsorted(self.ticks, start, side="left"))
+        last = int(np.searchsorted(self.ticks, stop, side="left"))
+        if first >= last:
+            return self.records[0:0]
+        begin = self.index["start"][first]
+        end = self.index["start"][last - 1] + self.index["count"][last - 1]
+        return self.records[begin:end]
+
+    def agent(self, uid, start=0, stop=None):
+        """Trayectoria de un agente en [start, stop)"""
+        rows = self.tick_range(start, stop if stop is not None else int(self.ticks[-1]) + 1)
+        return rows[rows["id"] == uid]
+
+
+if __name__ == "__main__":
+    import sys
+
+    reader = TrajectoryReader(sys.argv[1])
+    print(f"{len(reader)} muestras, {len(reader.records)} registros")
+    if len(reader):
+        last = reader.sample(len(reader) - 1)
+        for code, name in enumerate(SPECIES_NAMES):
+            print(f"  {name}: {int((last['species'] == code).sum())} en el tick {int(reader.ticks[-1])}")